@@ -0,0 +1,46 @@
+"""add_key_point_prerequisite_tables
+
+Revision ID: 0a2b4c6d8e1f
+Revises: f1a3c5e7b9d2
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a2b4c6d8e1f'
+down_revision = 'f1a3c5e7b9d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('key_point_prerequisites',
+    sa.Column('key_point_id', sa.BigInteger(), nullable=False),
+    sa.Column('prerequisite_id', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('key_point_id <> prerequisite_id', name='ck_key_point_prerequisites_not_self'),
+    sa.ForeignKeyConstraint(['key_point_id'], ['key_points.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['prerequisite_id'], ['key_points.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('key_point_id', 'prerequisite_id')
+    )
+    op.create_index('ix_key_point_prerequisites_prerequisite_id', 'key_point_prerequisites', ['prerequisite_id'], unique=False)
+
+    op.create_table('key_point_prerequisite_closure',
+    sa.Column('key_point_id', sa.BigInteger(), nullable=False),
+    sa.Column('prerequisite_id', sa.BigInteger(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['key_point_id'], ['key_points.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['prerequisite_id'], ['key_points.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('key_point_id', 'prerequisite_id')
+    )
+    op.create_index('ix_key_point_prerequisite_closure_prerequisite_id_key_point_id', 'key_point_prerequisite_closure', ['prerequisite_id', 'key_point_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_key_point_prerequisite_closure_prerequisite_id_key_point_id', table_name='key_point_prerequisite_closure')
+    op.drop_table('key_point_prerequisite_closure')
+    op.drop_index('ix_key_point_prerequisites_prerequisite_id', table_name='key_point_prerequisites')
+    op.drop_table('key_point_prerequisites')
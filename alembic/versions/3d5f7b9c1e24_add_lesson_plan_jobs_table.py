@@ -0,0 +1,40 @@
+"""add_lesson_plan_jobs_table
+
+Revision ID: 3d5f7b9c1e24
+Revises: 2c4e6a8b0d13
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3d5f7b9c1e24'
+down_revision = '2c4e6a8b0d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('lesson_plan_jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('owner', sa.String(length=255), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lesson_plan_jobs_id'), 'lesson_plan_jobs', ['id'], unique=False)
+    op.create_index('ix_lesson_plan_jobs_status_updated_at', 'lesson_plan_jobs', ['status', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_lesson_plan_jobs_status_updated_at', table_name='lesson_plan_jobs')
+    op.drop_index(op.f('ix_lesson_plan_jobs_id'), table_name='lesson_plan_jobs')
+    op.drop_table('lesson_plan_jobs')
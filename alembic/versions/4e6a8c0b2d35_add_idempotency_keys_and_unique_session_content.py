@@ -0,0 +1,63 @@
+"""add_idempotency_keys_and_unique_session_content
+
+Revision ID: 4e6a8c0b2d35
+Revises: 3d5f7b9c1e24
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4e6a8c0b2d35'
+down_revision = '3d5f7b9c1e24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep one content row per session: the one with detailed content if any, else the oldest
+    # (content stored as None is a JSON null rather than SQL NULL)
+    op.execute("""
+        DELETE FROM lesson_plan_session_content
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY session_id
+                    ORDER BY (session_content IS NOT NULL AND session_content <> 'null'::jsonb) DESC, id
+                ) AS rn
+                FROM lesson_plan_session_content
+            ) ranked
+            WHERE rn > 1
+        )
+    """)
+    op.drop_index('ix_lesson_plan_session_content_session_id', table_name='lesson_plan_session_content')
+    op.create_index('ix_lesson_plan_session_content_session_id', 'lesson_plan_session_content', ['session_id'], unique=True)
+
+    op.create_table('idempotency_keys',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('client', sa.String(length=255), nullable=False),
+    sa.Column('endpoint', sa.String(length=255), nullable=False),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('response_status', sa.Integer(), nullable=True),
+    sa.Column('response_body', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('client', 'endpoint', 'key', name='uq_idempotency_keys_client_endpoint_key')
+    )
+    op.create_index(op.f('ix_idempotency_keys_id'), 'idempotency_keys', ['id'], unique=False)
+    op.create_index(op.f('ix_idempotency_keys_created_at'), 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_idempotency_keys_created_at'), table_name='idempotency_keys')
+    op.drop_index(op.f('ix_idempotency_keys_id'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
+
+    op.drop_index('ix_lesson_plan_session_content_session_id', table_name='lesson_plan_session_content')
+    op.create_index('ix_lesson_plan_session_content_session_id', 'lesson_plan_session_content', ['session_id'], unique=False)
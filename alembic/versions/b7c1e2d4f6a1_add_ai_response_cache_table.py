@@ -0,0 +1,46 @@
+"""add_ai_response_cache_table
+
+Revision ID: b7c1e2d4f6a1
+Revises: 1659473e3b21
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b7c1e2d4f6a1'
+down_revision = '1659473e3b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_response_cache',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('request_hash', sa.Text(), nullable=False),
+    sa.Column('endpoint', sa.String(length=255), nullable=False),
+    sa.Column('response_json', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('response_bytes', sa.Integer(), nullable=False),
+    sa.Column('model_version', sa.String(length=50), nullable=True),
+    sa.Column('prompt_version', sa.String(length=50), nullable=True),
+    sa.Column('hit_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ai_response_cache_id'), 'ai_response_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_response_cache_request_hash'), 'ai_response_cache', ['request_hash'], unique=True)
+    op.create_index(op.f('ix_ai_response_cache_endpoint'), 'ai_response_cache', ['endpoint'], unique=False)
+    op.create_index(op.f('ix_ai_response_cache_model_version'), 'ai_response_cache', ['model_version'], unique=False)
+    op.create_index(op.f('ix_ai_response_cache_prompt_version'), 'ai_response_cache', ['prompt_version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ai_response_cache_prompt_version'), table_name='ai_response_cache')
+    op.drop_index(op.f('ix_ai_response_cache_model_version'), table_name='ai_response_cache')
+    op.drop_index(op.f('ix_ai_response_cache_endpoint'), table_name='ai_response_cache')
+    op.drop_index(op.f('ix_ai_response_cache_request_hash'), table_name='ai_response_cache')
+    op.drop_index(op.f('ix_ai_response_cache_id'), table_name='ai_response_cache')
+    op.drop_table('ai_response_cache')
@@ -0,0 +1,24 @@
+"""add_kp_fingerprint_to_lesson_plan_inputs
+
+Revision ID: c3d9a4e8b2f7
+Revises: b7c1e2d4f6a1
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9a4e8b2f7'
+down_revision = 'b7c1e2d4f6a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('lesson_plan_inputs', sa.Column('kp_fingerprint', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('lesson_plan_inputs', 'kp_fingerprint')
@@ -0,0 +1,28 @@
+"""add_kp_digests_to_lesson_plan_inputs
+
+Revision ID: d5e2f1a7c9b3
+Revises: c3d9a4e8b2f7
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e2f1a7c9b3'
+down_revision = 'c3d9a4e8b2f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('lesson_plan_inputs', sa.Column('kp_digests', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    # Fingerprints recorded before per-KP digests existed use a different
+    # formula; clear them so they are re-adopted on the next lookup
+    op.execute("UPDATE lesson_plan_inputs SET kp_fingerprint = NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('lesson_plan_inputs', 'kp_digests')
@@ -0,0 +1,43 @@
+"""add_session_key_point_table
+
+Revision ID: e8f4b6c2d1a9
+Revises: d5e2f1a7c9b3
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f4b6c2d1a9'
+down_revision = 'd5e2f1a7c9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('session_key_point',
+    sa.Column('session_map_id', sa.BigInteger(), nullable=False),
+    sa.Column('key_point_id', sa.BigInteger(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['session_map_id'], ['lesson_plan_session_map.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['key_point_id'], ['key_points.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('session_map_id', 'key_point_id')
+    )
+    op.create_index('ix_session_key_point_key_point_id_session_map_id', 'session_key_point', ['key_point_id', 'session_map_id'], unique=False)
+
+    # Backfill from the JSONB kp_ids arrays, skipping ids of key points that no longer exist
+    op.execute("""
+        INSERT INTO session_key_point (session_map_id, key_point_id, position)
+        SELECT m.id, kp.id, MIN(e.ordinality) - 1
+        FROM lesson_plan_session_map m
+        CROSS JOIN LATERAL jsonb_array_elements_text(m.kp_ids) WITH ORDINALITY AS e(value, ordinality)
+        JOIN key_points kp ON kp.id = CASE WHEN e.value ~ '^[0-9]+$' THEN e.value::bigint END
+        GROUP BY m.id, kp.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_session_key_point_key_point_id_session_map_id', table_name='session_key_point')
+    op.drop_table('session_key_point')
@@ -0,0 +1,24 @@
+"""add_grouping_source_to_lesson_plan_inputs
+
+Revision ID: f1a3c5e7b9d2
+Revises: e8f4b6c2d1a9
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a3c5e7b9d2'
+down_revision = 'e8f4b6c2d1a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('lesson_plan_inputs', sa.Column('grouping_source', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('lesson_plan_inputs', 'grouping_source')
@@ -0,0 +1,69 @@
+"""
+Database instrumentation: statement timing per request and connection pool metrics.
+"""
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.db import query_counter, slow_query_log
+from app.utils import load_signals, metrics, request_context
+
+# Execution option for session housekeeping (e.g. SET LOCAL statement_timeout):
+# such statements are not timed, counted against query budgets or slow-logged
+SKIP_OPTION = "skip_instrumentation"
+
+
+def instrument_engine(engine: Engine, pool_name: str = "primary") -> None:
+    """
+    Time every statement on `engine` (attributed to the current request), feed
+    the slow query log and export the connection pool state.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        if context is not None and context.execution_options.get(SKIP_OPTION):
+            return
+        metrics.DB_QUERY_DURATION.observe(elapsed, pool=pool_name)
+
+        stats = request_context.current()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+
+        query_counter.record(statement, elapsed)
+        slow_query_log.after_execute(engine, statement, parameters, context, elapsed, pool_name)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+    def pool_state():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return {}
+        return {
+            (pool_name, "checked_out"): pool.checkedout(),
+            (pool_name, "idle"): pool.checkedin(),
+            (pool_name, "overflow"): max(0, pool.overflow()),
+            (pool_name, "size"): pool.size(),
+        }
+
+    metrics.DB_POOL_CONNECTIONS.add_callback(pool_state)
+
+
+def observe_checkout(started: float, pool_name: str = "primary") -> None:
+    """
+    Record how long acquiring a pooled connection took (from `started`, a perf_counter value).
+    """
+    waited = time.perf_counter() - started
+    metrics.DB_POOL_CHECKOUT_DURATION.observe(waited, pool=pool_name)
+    if pool_name == "primary":
+        load_signals.POOL_WAIT.observe(waited)
@@ -0,0 +1,154 @@
+"""
+Connection pool configuration, liveness checks and stats.
+
+Pool sizing comes from DB_POOL_* settings. Instead of `pool_pre_ping` (a
+round trip on every checkout) a background thread pings one pooled
+connection every DB_POOL_LIVENESS_INTERVAL seconds: when the ping finds the
+server gone, SQLAlchemy invalidates every connection opened before it, so
+requests reconnect instead of failing on stale connections.
+
+DB_POOL_MODE=transaction is for running behind PgBouncer in transaction
+pooling mode, where consecutive transactions may use different server
+connections: server-side prepared statements are disabled and session state
+must not be relied upon (statement timeouts use SET LOCAL).
+"""
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy.engine import Engine, make_url
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+POOL_MODES = ("session", "transaction")
+
+
+def engine_options(
+    url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_recycle: int,
+    pre_ping: bool,
+    mode: str,
+) -> Dict[str, Any]:
+    """
+    Keyword arguments for `create_engine` from the pool settings.
+    """
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {POOL_MODES}, got {mode!r}")
+
+    options: Dict[str, Any] = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pre_ping,
+    }
+    if mode == "transaction" and make_url(url).get_driver_name() == "psycopg":
+        # psycopg 3 prepares statements executed repeatedly; prepared statements
+        # live on a server connection PgBouncer may not hand back. psycopg2 never
+        # prepares, so it needs no option.
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
+@dataclass
+class LivenessState:
+    checked_at: Optional[datetime] = None
+    ok: Optional[bool] = None
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class PoolLivenessChecker:
+    """
+    Background thread pinging each engine's pool every `interval` seconds.
+    """
+
+    def __init__(self, engines: Dict[str, Engine], interval: float):
+        self.engines = engines
+        self.interval = interval
+        self.states: Dict[str, LivenessState] = {name: LivenessState() for name in engines}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-pool-liveness", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for name, engine in self.engines.items():
+                self.check(name, engine)
+
+    def check(self, name: str, engine: Engine) -> bool:
+        started = time.perf_counter()
+        state = self.states[name]
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+            state.ok, state.error = True, None
+        except Exception as e:
+            # A disconnect error has already invalidated the pool's older connections
+            state.ok, state.error = False, str(e).splitlines()[0][:200]
+            metrics.DB_POOL_LIVENESS_FAILURES.inc(pool=name)
+            logger.warning("Liveness check of the %s pool failed: %s", name, state.error)
+        state.checked_at = datetime.now(timezone.utc)
+        state.seconds = time.perf_counter() - started
+        return state.ok
+
+
+def pool_stats(name: str, engine: Engine, liveness: Optional[LivenessState] = None) -> Dict[str, Any]:
+    """
+    Current state of an engine's pool with its checkout wait histogram.
+    """
+    pool = engine.pool
+    buckets, count, total = metrics.DB_POOL_CHECKOUT_DURATION.snapshot(pool=name)
+    stats: Dict[str, Any] = {
+        "pool": name,
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "checked_out": None,
+        "idle": None,
+        "overflow": None,
+        "max_overflow": None,
+        "timeout": None,
+        "recycle": getattr(pool, "_recycle", None),
+        "pre_ping": bool(getattr(pool, "_pre_ping", False)),
+        "checkout_count": count,
+        "checkout_wait_seconds_total": total,
+        # le=None is the +Inf bucket
+        "checkout_wait_buckets": [
+            {"le": None if math.isinf(bound) else bound, "count": cumulative} for bound, cumulative in buckets
+        ],
+        "checkout_timeouts": int(metrics.DB_POOL_CHECKOUT_TIMEOUTS.value(pool=name)),
+        "liveness": liveness,
+    }
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=getattr(pool, "_max_overflow", None),
+            timeout=pool.timeout(),
+        )
+    return stats
+
+
+def all_pool_stats(engines: Dict[str, Engine], checker: PoolLivenessChecker, mode: str) -> List[Dict[str, Any]]:
+    return [dict(pool_stats(name, engine, checker.states.get(name)), mode=mode) for name, engine in engines.items()]
@@ -0,0 +1,106 @@
+"""
+Query counting and N+1 detection.
+
+`count_queries()` counts the statements issued in a block (including thread
+pool work started from it), grouped by statement shape. With QUERY_CHECK_MODE
+set to `log` or `raise`, QueryCheckMiddleware counts every request and flags
+
+- N+1 patterns: one statement shape repeated N_PLUS_ONE_THRESHOLD times or more
+- endpoints exceeding the query budget declared with `@query_budget(n)`
+
+In `raise` mode a violation fails the request with QueryCheckError before the
+response is sent, so tests calling the API (FastAPI's TestClient re-raises
+server errors) fail on a regression to per-row querying.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from app.db.slow_query_log import normalize
+
+QUERY_BUDGET_ATTRIBUTE = "query_budget"
+
+
+class QueryCheckError(Exception):
+    """
+    Raised when a request repeats a statement shape too often or exceeds its query budget.
+    """
+    pass
+
+
+@dataclass
+class QueryCount:
+    count: int = 0
+    seconds: float = 0.0
+    # Normalized statement -> executions
+    shapes: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Statement shapes executed at least `threshold` times, most repeated first.
+        """
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_active: ContextVar[Tuple[QueryCount, ...]] = ContextVar("query_counts", default=())
+
+
+def record(statement: str, elapsed: float) -> None:
+    """
+    Called by the engine instrumentation after every statement.
+    """
+    counts = _active.get()
+    if not counts:
+        return
+    shape = normalize(statement)
+    for counted in counts:
+        with counted._lock:
+            counted.count += 1
+            counted.seconds += elapsed
+            counted.shapes[shape] += 1
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """
+    Count the statements issued in this context; blocks may be nested.
+    """
+    counted = QueryCount()
+    token = _active.set(_active.get() + (counted,))
+    try:
+        yield counted
+    finally:
+        _active.reset(token)
+
+
+def query_budget(max_queries: int) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Declare the most statements a route may issue per request (checked by QueryCheckMiddleware).
+
+        @router.get("/chapter/{chapter_id}")
+        @query_budget(3)
+        async def get_key_points_by_chapter(...):
+    """
+    def decorator(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        setattr(endpoint, QUERY_BUDGET_ATTRIBUTE, max_queries)
+        return endpoint
+    return decorator
+
+
+def get_query_budget(endpoint: Optional[Callable[..., Any]]) -> Optional[int]:
+    return getattr(endpoint, QUERY_BUDGET_ATTRIBUTE, None)
+
+
+def check(counted: QueryCount, budget: Optional[int], repeat_threshold: int) -> List[str]:
+    """
+    Describe every query budget or N+1 violation of one request (empty if there is none).
+    """
+    problems = []
+    if budget is not None and counted.count > budget:
+        problems.append(f"{counted.count} queries exceed the budget of {budget}")
+    for shape, n in counted.repeated(repeat_threshold):
+        problems.append(f"possible N+1: {n} x {shape[:200]}")
+    return problems
@@ -0,0 +1,100 @@
+"""
+Routing of read-only requests between the primary and a read replica.
+
+`get_read_db` (app.db.session) sends a read to the replica unless
+
+- no replica is configured (DATABASE_REPLICA_URL),
+- the client wrote recently (read-your-writes: its reads stay on the primary
+  for READ_YOUR_WRITES_SECONDS after a successful write), or
+- the replica lags more than REPLICA_MAX_LAG_SECONDS behind the primary, or
+  cannot be reached (checked at most every REPLICA_LAG_CHECK_INTERVAL seconds).
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+# (pg_last_xact_replay_timestamp alone would report an idle primary as lag)
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# Cookie carrying the read-your-writes deadline, so pinning also holds across worker processes
+PIN_COOKIE = "read_primary_until"
+
+
+class ReplicaLagMonitor:
+    """
+    Cached replica lag check, run on the thread resolving the read dependency.
+    """
+
+    def __init__(self, engine: Engine, max_lag: float, check_interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _check(self) -> Optional[float]:
+        try:
+            with self.engine.connect() as conn:
+                return float(conn.execute(REPLICA_LAG_QUERY).scalar() or 0)
+        except Exception:
+            logger.warning("Replica lag check failed; reading from the primary", exc_info=True)
+            return None
+
+    def is_usable(self) -> bool:
+        """
+        Whether the replica is reachable and within the allowed lag.
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            # One thread refreshes; the others use the previous result meanwhile
+            try:
+                self.lag = self._check()
+                self._checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+
+class ReadYourWrites:
+    """
+    Per-client deadlines until which reads go to the primary.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._pinned_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def pin(self, client_id: str) -> float:
+        """
+        Pin a client to the primary after a write; returns the deadline (epoch seconds).
+        """
+        until = time.time() + self.window
+        with self._lock:
+            self._pinned_until[client_id] = until
+            if len(self._pinned_until) > 10000:
+                now = time.time()
+                self._pinned_until = {c: t for c, t in self._pinned_until.items() if t > now}
+        return until
+
+    def is_pinned(self, client_id: str, cookie_value: Optional[str] = None) -> bool:
+        now = time.time()
+        if cookie_value:
+            try:
+                if float(cookie_value) > now:
+                    return True
+            except ValueError:
+                pass
+        return self._pinned_until.get(client_id, 0.0) > now
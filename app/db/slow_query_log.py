@@ -0,0 +1,211 @@
+"""
+Slow query log.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged with their bound
+parameters, the route and the service function that issued them, and
+aggregated by statement shape (literals and IN lists normalized) so the most
+frequent offenders can be read from GET /admin/slow-queries.
+
+A sample of slow SELECTs (SLOW_QUERY_EXPLAIN_SAMPLE_RATE) is re-run as
+`EXPLAIN (ANALYZE, BUFFERS)` on a background thread and the plan is kept with
+the shape. EXPLAIN ANALYZE executes the query again, so keep the rate low;
+locking SELECTs (FOR UPDATE / FOR SHARE) are never re-run.
+"""
+import logging
+import random
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy.engine import Engine
+from app.utils import metrics, request_context
+
+logger = logging.getLogger(__name__)
+
+# Execution option marking the EXPLAIN statements themselves, which are never logged
+SKIP_OPTION = "skip_slow_query_log"
+MAX_SHAPES = 500
+MAX_PARAMS_LENGTH = 500
+MAX_PENDING_EXPLAINS = 2
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_WHITESPACE = re.compile(r"\s+")
+# Row locking clauses: EXPLAIN ANALYZE would take the locks again
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+
+
+@dataclass
+class SlowQueryShape:
+    shape: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_statement: str = ""
+    last_parameters: str = ""
+    last_seen_at: Optional[datetime] = None
+    routes: Dict[str, int] = field(default_factory=dict)
+    functions: Dict[str, int] = field(default_factory=dict)
+    explain: Optional[str] = None
+    explained_at: Optional[datetime] = None
+
+
+_threshold_seconds: Optional[float] = None
+_explain_sample_rate = 0.0
+_shapes: Dict[str, SlowQueryShape] = {}
+_lock = threading.Lock()
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_pending_explains = 0
+
+
+def configure(threshold_ms: float, explain_sample_rate: float = 0.0) -> None:
+    """
+    Set the slow query threshold (0 or less disables the log) and the EXPLAIN sample rate.
+    """
+    global _threshold_seconds, _explain_sample_rate
+    _threshold_seconds = threshold_ms / 1000 if threshold_ms > 0 else None
+    _explain_sample_rate = min(max(explain_sample_rate, 0.0), 1.0)
+
+
+def normalize(statement: str) -> str:
+    """
+    The shape of a statement: literals and IN lists replaced, whitespace collapsed.
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _POSTCOMPILE.sub("(?)", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _calling_function() -> str:
+    """
+    The innermost application function (outside app.db) on the current stack.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and not module.startswith("app.db."):
+            return f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+def _format_parameters(parameters: Any) -> str:
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMS_LENGTH else text[:MAX_PARAMS_LENGTH] + "..."
+
+
+def _is_explainable(statement: str) -> bool:
+    head = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return (
+        head in ("SELECT", "WITH")
+        and not re.search(r"\b(INSERT|UPDATE|DELETE)\b", statement, re.IGNORECASE)
+        and not _LOCKING_CLAUSE.search(statement)
+    )
+
+
+def after_execute(engine: Engine, statement: str, parameters: Any, context: Any, elapsed: float, pool_name: str) -> None:
+    """
+    Called by the engine instrumentation after every statement.
+    """
+    if _threshold_seconds is None or elapsed < _threshold_seconds:
+        return
+    if context is not None and context.execution_options.get(SKIP_OPTION):
+        return
+
+    stats = request_context.current()
+    route = f"{stats.method} {stats.route or stats.path}" if stats is not None else "<background>"
+    function = _calling_function()
+    params = _format_parameters(parameters)
+    shape = normalize(statement)
+    metrics.DB_SLOW_QUERIES.inc(pool=pool_name)
+    logger.warning(
+        "Slow query (%.0f ms) from %s in %s: %s | params: %s",
+        elapsed * 1000, route, function, _WHITESPACE.sub(" ", statement), params
+    )
+
+    with _lock:
+        entry = _shapes.get(shape)
+        if entry is None:
+            if len(_shapes) >= MAX_SHAPES:
+                # Make room by dropping the least frequent shape
+                del _shapes[min(_shapes.values(), key=lambda s: (s.count, s.last_seen_at)).shape]
+            entry = _shapes[shape] = SlowQueryShape(shape=shape)
+        entry.count += 1
+        entry.total_seconds += elapsed
+        entry.max_seconds = max(entry.max_seconds, elapsed)
+        entry.last_statement = statement
+        entry.last_parameters = params
+        entry.last_seen_at = datetime.now(timezone.utc)
+        entry.routes[route] = entry.routes.get(route, 0) + 1
+        entry.functions[function] = entry.functions.get(function, 0) + 1
+
+    if (
+        _explain_sample_rate > 0
+        and engine.dialect.name == "postgresql"
+        and not isinstance(parameters, list)
+        and _is_explainable(statement)
+        and random.random() < _explain_sample_rate
+    ):
+        _schedule_explain(engine, shape, statement, parameters)
+
+
+def _schedule_explain(engine: Engine, shape: str, statement: str, parameters: Any) -> None:
+    global _pending_explains
+    with _lock:
+        # Never queue up EXPLAINs behind each other during a burst of slow queries
+        if _pending_explains >= MAX_PENDING_EXPLAINS:
+            return
+        _pending_explains += 1
+    _explain_executor.submit(_explain, engine, shape, statement, parameters)
+
+
+def _explain(engine: Engine, shape: str, statement: str, parameters: Any) -> None:
+    global _pending_explains
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(**{SKIP_OPTION: True}).exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters or ()
+            )
+            plan = "\n".join(row[0] for row in result)
+            conn.rollback()
+        with _lock:
+            entry = _shapes.get(shape)
+            if entry is not None:
+                entry.explain = plan
+                entry.explained_at = datetime.now(timezone.utc)
+    except Exception:
+        logger.warning("EXPLAIN of slow query failed: %s", shape, exc_info=True)
+    finally:
+        with _lock:
+            _pending_explains -= 1
+
+
+def get_top_shapes(limit: int = 20, order_by: str = "count") -> List[SlowQueryShape]:
+    """
+    The slow query shapes seen by this process, most frequent (or slowest in total) first.
+    """
+    key = {
+        "count": lambda s: s.count,
+        "total": lambda s: s.total_seconds,
+        "max": lambda s: s.max_seconds,
+    }[order_by]
+    with _lock:
+        shapes = sorted(_shapes.values(), key=key, reverse=True)
+    return shapes[:limit]
+
+
+def reset() -> int:
+    """
+    Forget all recorded shapes; returns how many there were.
+    """
+    with _lock:
+        count = len(_shapes)
+        _shapes.clear()
+        return count
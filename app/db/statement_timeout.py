@@ -0,0 +1,76 @@
+"""
+Per-request statement timeouts.
+
+Request sessions (`get_db`, `get_read_db`) run every transaction under
+`SET LOCAL statement_timeout`, so PostgreSQL cancels a runaway statement
+instead of letting it hold a pooled connection. The timeout is the route's
+own, declared with `@statement_timeout(ms)`, or DB_READ_STATEMENT_TIMEOUT_MS
+for GET/HEAD requests and DB_WRITE_STATEMENT_TIMEOUT_MS otherwise.
+
+`SET LOCAL` ends with the transaction, so it is safe behind PgBouncer in
+transaction mode. The SET itself is not counted by the instrumentation (query
+budgets, Server-Timing, slow query log). A cancelled statement raises
+StatementTimeoutError, which the application answers with 503.
+"""
+from typing import Any, Callable, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.db.instrumentation import SKIP_OPTION
+
+STATEMENT_TIMEOUT_ATTRIBUTE = "statement_timeout_ms"
+# Session.info key holding the timeout of a request session
+SESSION_INFO_KEY = "statement_timeout_ms"
+# SQLSTATE query_canceled (statement_timeout or pg_cancel_backend)
+QUERY_CANCELED = "57014"
+
+
+class StatementTimeoutError(Exception):
+    """
+    Raised when PostgreSQL cancels a statement that exceeded the request's statement timeout.
+    """
+    pass
+
+
+def statement_timeout(timeout_ms: int) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Declare a route's statement timeout in milliseconds (0 disables it).
+
+        @router.get("/chapters/{chapter_id}")
+        @statement_timeout(2000)
+        async def get_questions_by_chapter(...):
+    """
+    def decorator(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        setattr(endpoint, STATEMENT_TIMEOUT_ATTRIBUTE, timeout_ms)
+        return endpoint
+    return decorator
+
+
+def get_statement_timeout(endpoint: Optional[Callable[..., Any]], method: str, read_ms: int, write_ms: int) -> int:
+    declared = getattr(endpoint, STATEMENT_TIMEOUT_ATTRIBUTE, None)
+    if declared is not None:
+        return declared
+    return read_ms if method in ("GET", "HEAD") else write_ms
+
+
+def install(session_factory: sessionmaker, engine: Engine) -> None:
+    """
+    Apply the session's timeout at the start of each transaction and turn
+    cancellations on `engine` into StatementTimeoutError.
+    """
+
+    @event.listens_for(session_factory, "after_begin")
+    def _set_timeout(session: Session, transaction, connection):
+        timeout_ms = session.info.get(SESSION_INFO_KEY)
+        if timeout_ms and connection.dialect.name == "postgresql":
+            connection.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {int(timeout_ms)}",
+                execution_options={SKIP_OPTION: True}
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _translate_cancel(exception_context):
+        if getattr(exception_context.original_exception, "pgcode", None) == QUERY_CANCELED:
+            return StatementTimeoutError(
+                f"Database statement timed out: {exception_context.original_exception}".strip()
+            )
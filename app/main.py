@@ -1,6 +1,19 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import logging
 import os
+from app.db.statement_timeout import StatementTimeoutError
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.metrics import MetricsMiddleware, route_template
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.query_check import QueryCheckMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.middleware.server_timing import ServerTimingMiddleware
+from app.db.session import pool_liveness, settings
+from app.services import lesson_plan_job_service
+from app.utils import loop_monitor, metrics
 from app.routers import (
     boards,
     states,
@@ -9,16 +22,36 @@ from app.routers import (
     chapters,
     key_points,
     questions,
-    lesson_plans
+    lesson_plans,
+    admin
 )
 
+logger = logging.getLogger(__name__)
+
 # Get environment
 environment = os.getenv("ENVIRONMENT", "development")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor.start()
+    pool_liveness.start()
+    # Generations interrupted by the previous shutdown (or a crash) continue in the background
+    lesson_plan_job_service.resume_pending()
+    try:
+        yield
+    finally:
+        # Uvicorn has stopped accepting connections; let in-flight AI work finish or save it
+        await lesson_plan_job_service.drain(settings.shutdown_grace_seconds)
+        pool_liveness.stop()
+        await loop_monitor.stop()
+
+
 app = FastAPI(
     title="Content Service API",
     description="Microservice for managing educational content across multiple boards, states, and universities",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration - restrict origins in production
@@ -33,14 +66,40 @@ else:
     # Development: allow all origins
     allowed_origins = ["*"]
 
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryCheckMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+# Rejects overload and rate-limited requests before any other work
+app.add_middleware(AdmissionMiddleware)
+
+# Outside admission, so 429/503 responses carry CORS headers and preflights
+# are answered without using rate limit tokens
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
 
+# Outermost, so latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(StatementTimeoutError)
+async def statement_timeout_handler(request: Request, exc: StatementTimeoutError):
+    # PostgreSQL cancelled the statement, so the connection is free again; a retry may succeed
+    metrics.DB_STATEMENT_TIMEOUTS.inc(method=request.method, route=route_template(request.scope))
+    logger.warning("%s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database statement timed out"},
+        headers={"Retry-After": "1"}
+    )
+
+
 # Include routers
 app.include_router(boards.router)
 app.include_router(states.router)
@@ -50,6 +109,7 @@ app.include_router(chapters.router)
 app.include_router(key_points.router)
 app.include_router(questions.router)
 app.include_router(lesson_plans.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -65,3 +125,7 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,68 @@
+"""
+Admission control: load shedding and the general per-client rate limit.
+
+Requests are rejected before any routing or database work when
+
+- the process is overloaded (503): the recent pool checkout wait exceeds
+  SHED_POOL_WAIT_MS or the event loop lag exceeds SHED_LOOP_LAG_MS, so new
+  requests would only queue behind the ones already running; or
+- the client has used up its general bucket (429, see app.utils.rate_limit).
+
+Health checks, metrics and admin endpoints are always admitted.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.db.session import settings
+from app.utils import load_signals, metrics, rate_limit
+from app.utils.client_identity import client_address
+
+EXEMPT_PATHS = ("/health", "/metrics", "/admin/")
+
+
+def overload_reason() -> str:
+    """
+    Why new requests should be shed right now, or "" when they should not.
+    """
+    if settings.shed_pool_wait_ms > 0 and load_signals.POOL_WAIT.current() * 1000 > settings.shed_pool_wait_ms:
+        return "pool_wait"
+    if settings.shed_loop_lag_ms > 0 and load_signals.LOOP_LAG.current() * 1000 > settings.shed_loop_lag_ms:
+        return "loop_lag"
+    return ""
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        reason = overload_reason()
+        if reason:
+            metrics.REQUESTS_SHED.inc(reason=reason)
+            response = JSONResponse(
+                {"detail": "Service overloaded, retry shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        decision = await rate_limit.check(
+            "general",
+            client_address(scope, settings.trusted_proxy_count),
+            settings.rate_limit_per_minute,
+            settings.rate_limit_burst
+        )
+        if not decision.allowed:
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"},
+                status_code=429,
+                headers=rate_limit.retry_after_header(decision)
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,56 @@
+"""
+Request metrics middleware.
+
+Starts the per-request stats that database and AI instrumentation report
+into, and records latency, status and database usage per route template
+once the response has been sent.
+"""
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils import metrics, request_context
+
+# Route label for requests that matched no route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """
+    The path template of the route that handled the request, e.g. /key-points/{key_point_id}.
+    """
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        token = request_context.start(scope["method"], scope["path"])
+        stats = request_context.current()
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_context.finish(token)
+
+            method = scope["method"]
+            route = route_template(scope)
+            status = str(status_code)
+            metrics.HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            metrics.HTTP_REQUEST_DURATION.observe(elapsed, method=method, route=route, status=status)
+            metrics.HTTP_REQUEST_DB_QUERIES.observe(stats.db_queries, method=method, route=route)
+            metrics.HTTP_REQUEST_DB_DURATION.observe(stats.db_seconds, method=method, route=route)
@@ -0,0 +1,73 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it sends `X-Profile: 1` (or `?profile=1`) together
+with a valid `X-Admin-Token`, or when it matches a runtime target added through
+POST /admin/profiling/targets. The profile name is returned in the
+`X-Profile-Id` response header; list and download profiles under /admin/profiles.
+"""
+import time
+from urllib.parse import parse_qs
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.metrics import route_template
+from app.utils import profiler, request_context
+from app.utils.admin_auth import is_admin_token
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+
+def _requested(scope: Scope) -> bool:
+    headers = dict(scope["headers"])
+    flagged = headers.get(PROFILE_HEADER) == b"1" or (
+        parse_qs(scope.get("query_string", b"").decode("latin-1")).get(PROFILE_QUERY_PARAM) == ["1"]
+    )
+    if not flagged:
+        return False
+    token = headers.get(ADMIN_TOKEN_HEADER)
+    return is_admin_token(token.decode("latin-1") if token else None)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = request_context.current()
+        method, path = scope["method"], scope["path"]
+        if stats is None or not (_requested(scope) or profiler.claim_target(method, path)):
+            await self.app(scope, receive, send)
+            return
+
+        name = profiler.new_profile_name(method, path)
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", name.encode())]}
+            await send(message)
+
+        request_profiler = profiler.RequestProfiler(stats, profiler.interval_seconds())
+        started = time.perf_counter()
+        request_profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            request_profiler.stop()
+            metadata = {
+                "method": method,
+                "path": path,
+                "route": route_template(scope),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "db_queries": stats.db_queries,
+            }
+            await run_in_threadpool(profiler.save_profile, name, request_profiler, metadata)
@@ -0,0 +1,39 @@
+"""
+Per-request N+1 and query budget checks (QUERY_CHECK_MODE=log|raise).
+
+Meant for development, CI and tests; leave it off in production, where it
+would only add the cost of normalizing every statement.
+"""
+import logging
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db import query_counter
+from app.db.session import settings
+from app.middleware.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCheckMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or settings.query_check_mode not in ("log", "raise"):
+            await self.app(scope, receive, send)
+            return
+
+        with query_counter.count_queries() as counted:
+            async def send_checked(message: Message) -> None:
+                # The response is complete (serialization included) once it starts
+                if message["type"] == "http.response.start":
+                    route = scope.get("route")
+                    budget = query_counter.get_query_budget(getattr(route, "endpoint", None))
+                    problems = query_counter.check(counted, budget, settings.n_plus_one_threshold)
+                    if problems:
+                        description = f"{scope['method']} {route_template(scope)}: " + "; ".join(problems)
+                        if settings.query_check_mode == "raise":
+                            raise query_counter.QueryCheckError(description)
+                        logger.warning("Query check failed for %s", description)
+                await send(message)
+
+            await self.app(scope, receive, send_checked)
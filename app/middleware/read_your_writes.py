@@ -0,0 +1,35 @@
+"""
+Read-your-writes pinning: after a successful write, the client's reads go to
+the primary for READ_YOUR_WRITES_SECONDS so they see it even while the
+replica catches up (see app.db.read_routing).
+"""
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db.read_routing import PIN_COOKIE
+from app.db.session import read_your_writes, replica_engine, settings
+from app.utils.client_identity import client_id
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or replica_engine is None or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_pinned(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = read_your_writes.pin(client_id(scope, settings.trusted_proxy_count))
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{PIN_COOKIE}={until:.3f}; Max-Age={int(read_your_writes.window) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_pinned)
@@ -0,0 +1,146 @@
+"""
+Server-Timing header with a per-request phase breakdown.
+
+Every response carries e.g.
+
+    Server-Timing: db;dur=12.4;desc="7 queries", ai;dur=1520.0, cache;dur=3.1, serialize;dur=1.8, total;dur=1541.2
+
+so browser devtools show where a slow request spent its time. Phases are
+marked with `request_context.phase(...)` by the services; `db` comes from the
+engine instrumentation and `serialize` from `TimedRoute`.
+
+With SERVER_TIMING_DEBUG enabled, requests sending `X-Server-Timing-Debug: 1`
+also get every SQL statement (truncated) with its duration.
+"""
+import asyncio
+import functools
+import threading
+import time
+from typing import Any, Callable, List
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db.session import settings
+from app.utils import request_context
+
+DEBUG_HEADER = b"x-server-timing-debug"
+# Statements beyond this many are left out of the debug header
+MAX_DEBUG_STATEMENTS = 50
+MAX_STATEMENT_LENGTH = 120
+
+
+def _quote(text: str) -> str:
+    return '"' + " ".join(text.split()).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _metric(name: str, seconds: float, description: str = "") -> str:
+    entry = f"{name};dur={seconds * 1000:.1f}"
+    return f"{entry};desc={_quote(description)}" if description else entry
+
+
+def build_header(stats: request_context.RequestStats, total_seconds: float) -> str:
+    entries: List[str] = [_metric("db", stats.db_seconds, f"{stats.db_queries} queries")]
+    for name, seconds in stats.phases.items():
+        count = stats.phase_counts.get(name, 1)
+        entries.append(_metric(name, seconds, f"{count} calls" if count > 1 else ""))
+    if stats.statements:
+        for index, (statement, seconds) in enumerate(stats.statements[:MAX_DEBUG_STATEMENTS], start=1):
+            entries.append(_metric(f"sql-{index}", seconds, statement[:MAX_STATEMENT_LENGTH]))
+    entries.append(_metric("total", total_seconds))
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        if request_context.current() is None:
+            token = request_context.start(scope["method"], scope["path"])
+        stats = request_context.current()
+        if settings.server_timing_debug and dict(scope["headers"]).get(DEBUG_HEADER) == b"1":
+            stats.statements = []
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header = build_header(stats, time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode("latin-1", "replace"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if token is not None:
+                request_context.finish(token)
+
+
+def _mark_return(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap a route endpoint to note when it returned, keeping its signature for FastAPI.
+    """
+    # include_router() builds new routes from already wrapped endpoints
+    if getattr(endpoint, "_marks_return", False):
+        return endpoint
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _note_return()
+        async_wrapper._marks_return = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        # Sync endpoints run in the thread pool; the profiler samples these threads
+        stats = request_context.current()
+        thread_id = threading.get_ident()
+        if stats is not None:
+            stats.thread_ids.add(thread_id)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if stats is not None:
+                stats.thread_ids.discard(thread_id)
+            _note_return()
+    wrapper._marks_return = True
+    return wrapper
+
+
+def _note_return() -> None:
+    stats = request_context.current()
+    if stats is not None:
+        stats.endpoint_returned_at = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """
+    Route class recording response validation and serialization as the `serialize` phase.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _mark_return(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            stats = request_context.current()
+            if stats is not None:
+                stats.route = self.path_format
+            response = await handler(request)
+            if stats is not None and stats.endpoint_returned_at is not None:
+                stats.add_phase("serialize", time.perf_counter() - stats.endpoint_returned_at)
+                stats.endpoint_returned_at = None
+            return response
+
+        return timed_handler
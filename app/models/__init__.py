@@ -10,6 +10,12 @@ from app.models.answer import Answer
 from app.models.lesson_plan_input import LessonPlanInput
 from app.models.lesson_plan_session_map import LessonPlanSessionMap
 from app.models.lesson_plan_session_content import LessonPlanSessionContent
+from app.models.ai_response_cache import AIResponseCache
+from app.models.session_key_point import SessionKeyPoint
+from app.models.key_point_prerequisite import KeyPointPrerequisite, KeyPointPrerequisiteClosure
+from app.models.rate_limit_bucket import RateLimitBucket
+from app.models.lesson_plan_job import LessonPlanJob
+from app.models.idempotency_key import IdempotencyKey
 
 __all__ = [
     "Board",
@@ -24,5 +30,12 @@ __all__ = [
     "LessonPlanInput",
     "LessonPlanSessionMap",
     "LessonPlanSessionContent",
+    "AIResponseCache",
+    "SessionKeyPoint",
+    "KeyPointPrerequisite",
+    "KeyPointPrerequisiteClosure",
+    "RateLimitBucket",
+    "LessonPlanJob",
+    "IdempotencyKey",
 ]
 
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class AIResponseCache(Base):
+    """
+    Content-addressed cache of AI service responses.
+
+    Rows are keyed by a canonical hash of the outbound request (endpoint +
+    normalized payload + model/prompt versions), so identical payloads coming
+    from different boards, inputs or regenerated sessions share one response.
+    """
+    __tablename__ = "ai_response_cache"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    request_hash = Column(Text, unique=True, nullable=False, index=True)
+    endpoint = Column(String(255), nullable=False, index=True)
+    response_json = Column(JSONB, nullable=False)
+    response_bytes = Column(Integer, nullable=False, default=0)
+    model_version = Column(String(50), nullable=True, index=True)
+    prompt_version = Column(String(50), nullable=True, index=True)
+    hit_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a request sent with an Idempotency-Key header.
+
+    The row is inserted "in_progress" when the request starts and completed
+    with its response, which retries with the same key are answered with;
+    see idempotency_service.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    key = Column(String(255), nullable=False)
+    client = Column(String(255), nullable=False)  # client_id of the caller the key belongs to
+    endpoint = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    status = Column(String(20), nullable=False, default="in_progress")  # "in_progress" or "completed"
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("client", "endpoint", "key", name="uq_idempotency_keys_client_endpoint_key"),
+    )
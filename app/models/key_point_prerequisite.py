@@ -0,0 +1,38 @@
+from sqlalchemy import Column, BigInteger, Integer, ForeignKey, TIMESTAMP, CheckConstraint, Index
+from datetime import datetime
+from app.db.base import Base
+
+
+class KeyPointPrerequisite(Base):
+    """
+    Direct prerequisite edge: `key_point_id` requires `prerequisite_id` to be taught first.
+    """
+    __tablename__ = "key_point_prerequisites"
+
+    key_point_id = Column(BigInteger, ForeignKey("key_points.id", ondelete="CASCADE"), primary_key=True)
+    prerequisite_id = Column(BigInteger, ForeignKey("key_points.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow, server_default="now()")
+
+    __table_args__ = (
+        CheckConstraint("key_point_id <> prerequisite_id", name="ck_key_point_prerequisites_not_self"),
+        Index("ix_key_point_prerequisites_prerequisite_id", "prerequisite_id"),
+    )
+
+
+class KeyPointPrerequisiteClosure(Base):
+    """
+    Precomputed transitive closure of `key_point_prerequisites`.
+
+    One row per (key point, direct or indirect prerequisite) with the length
+    of the shortest prerequisite path, maintained on every edge change so
+    ordering and "what must come first" queries are plain index lookups.
+    """
+    __tablename__ = "key_point_prerequisite_closure"
+
+    key_point_id = Column(BigInteger, ForeignKey("key_points.id", ondelete="CASCADE"), primary_key=True)
+    prerequisite_id = Column(BigInteger, ForeignKey("key_points.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_key_point_prerequisite_closure_prerequisite_id_key_point_id", "prerequisite_id", "key_point_id"),
+    )
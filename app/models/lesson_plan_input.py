@@ -1,4 +1,5 @@
 from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -14,6 +15,9 @@ class LessonPlanInput(Base):
     chapter_id = Column(Integer, ForeignKey("chapters.id"), nullable=False, index=True)
     planned_sessions = Column(Integer, nullable=False)
     input_hash = Column(Text, unique=True, nullable=False, index=True)
+    kp_fingerprint = Column(Text, nullable=True)  # Chapter KP digest the session maps were built from
+    kp_digests = Column(JSONB, nullable=True)  # Per-KP digests ({kp_id: digest}) behind kp_fingerprint
+    grouping_source = Column(String(20), nullable=True)  # "ai" (or NULL), "local" or "local_fallback"
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     # Relationships
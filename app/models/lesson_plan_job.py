@@ -0,0 +1,29 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class LessonPlanJob(Base):
+    """
+    Lesson plan generation that has started but not finished.
+
+    A row is written when a generation starts and deleted when it completes.
+    Rows left behind by a shutdown ("pending") or a crashed worker (stale
+    "running") are resumed at startup; see lesson_plan_job_service.
+    """
+    __tablename__ = "lesson_plan_jobs"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # "group_sessions", "refresh_input", "session_summary", "detailed_content"
+    params = Column(JSONB, nullable=False)
+    status = Column(String(20), nullable=False, default="running")  # "running", "pending" or "failed"
+    owner = Column(String(255), nullable=True)  # host:pid of the worker running it
+    attempts = Column(Integer, nullable=False, default=1, server_default="1")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_lesson_plan_jobs_status_updated_at", "status", "updated_at"),
+    )
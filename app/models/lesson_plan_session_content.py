@@ -9,7 +9,7 @@ class LessonPlanSessionContent(Base):
     __tablename__ = "lesson_plan_session_content"
 
     id = Column(BigInteger, primary_key=True, index=True)
-    session_id = Column(BigInteger, ForeignKey("lesson_plan_session_map.id"), nullable=False, index=True)
+    session_id = Column(BigInteger, ForeignKey("lesson_plan_session_map.id"), nullable=False, unique=True, index=True)
     session_summary = Column(JSONB, nullable=False)
     session_content = Column(JSONB, nullable=True)
     version = Column(String(50), nullable=True)
@@ -19,3 +19,4 @@ class LessonPlanSessionMap(Base):
 
     # Relationships
     lesson_input = relationship("LessonPlanInput", back_populates="session_maps")
+    key_point_links = relationship("SessionKeyPoint", back_populates="session_map", cascade="all, delete-orphan")
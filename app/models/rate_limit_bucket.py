@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Float, DateTime, Text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Token bucket shared by all application processes (RATE_LIMIT_BACKEND=postgres).
+
+    Tokens are refilled lazily from the database clock when the bucket is next
+    used, so a bucket costs one row and one statement per request.
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(Text, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, BigInteger, Integer, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+
+
+class SessionKeyPoint(Base):
+    """
+    Normalized reverse index of `LessonPlanSessionMap.kp_ids`.
+
+    The primary key serves session -> key point lookups and the secondary
+    index serves key point -> session lookups (impact analysis), so neither
+    direction needs to scan or GIN-search the JSONB array.
+    """
+    __tablename__ = "session_key_point"
+
+    session_map_id = Column(
+        BigInteger,
+        ForeignKey("lesson_plan_session_map.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    key_point_id = Column(
+        BigInteger,
+        ForeignKey("key_points.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    position = Column(Integer, nullable=False, default=0)  # Order within the session's kp_ids
+
+    __table_args__ = (
+        Index("ix_session_key_point_key_point_id_session_map_id", "key_point_id", "session_map_id"),
+    )
+
+    # Relationships
+    session_map = relationship("LessonPlanSessionMap", back_populates="key_point_links")
+    key_point = relationship("KeyPoint")
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import List, Literal
+from app.db import pool, slow_query_log
+from app.db.session import engines, pool_liveness, settings
+from app.middleware.server_timing import TimedRoute
+from app.schemas.db_pool import PoolStatsResponse
+from app.schemas.event_loop import BlockingEventResponse
+from app.schemas.profiling import ProfileSummary, ProfileTargetCreate, ProfileTargetResponse
+from app.schemas.slow_query import SlowQueryShapeResponse, SlowQueryResetResponse
+from app.utils import loop_monitor, profiler
+from app.utils.admin_auth import require_admin_token
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+    route_class=TimedRoute
+)
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """List recent request profiles, newest first"""
+    return profiler.list_profiles(limit)
+
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """Download a profile in collapsed-stack format (flamegraph.pl, speedscope, inferno)"""
+    path = profiler.get_profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@router.get("/profiling/targets", response_model=List[ProfileTargetResponse])
+def list_profiling_targets():
+    """List active runtime profiling targets"""
+    return profiler.list_targets()
+
+
+@router.post("/profiling/targets", response_model=ProfileTargetResponse, status_code=201)
+def add_profiling_target(target: ProfileTargetCreate):
+    """Profile the next requests matching a path pattern, e.g. /lesson-plans/* or /key-points/chapter/*"""
+    return profiler.add_target(target.path_pattern, target.count, target.method)
+
+
+@router.delete("/profiling/targets/{target_id}", status_code=204)
+def remove_profiling_target(target_id: int):
+    """Remove a runtime profiling target"""
+    if not profiler.remove_target(target_id):
+        raise HTTPException(status_code=404, detail="Profiling target not found")
+
+
+@router.get("/slow-queries", response_model=List[SlowQueryShapeResponse])
+def list_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    order_by: Literal["count", "total", "max"] = "count"
+):
+    """Most frequent (or slowest) slow query shapes seen by this process, with sampled EXPLAIN plans"""
+    return slow_query_log.get_top_shapes(limit, order_by)
+
+
+@router.delete("/slow-queries", response_model=SlowQueryResetResponse)
+def reset_slow_queries():
+    """Clear the slow query log of this process"""
+    return SlowQueryResetResponse(deleted=slow_query_log.reset())
+
+
+@router.get("/event-loop/blocks", response_model=List[BlockingEventResponse])
+def list_event_loop_blocks():
+    """Recent event loop blocking episodes of this process, newest first, with the blocking stack"""
+    return loop_monitor.get_blocking_events()
+
+
+@router.get("/db/pools", response_model=List[PoolStatsResponse])
+def get_pool_stats():
+    """Connection pool state of this process: checked out, overflow, checkout waits and liveness"""
+    return pool.all_pool_stats(engines, pool_liveness, settings.db_pool_mode)
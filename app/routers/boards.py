@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.query_counter import query_budget
+from app.db.session import get_db, get_read_db
+from app.middleware.server_timing import TimedRoute
 from app.schemas.board import BoardCreate, BoardResponse, BoardUpdate
 from app.services import board_service, state_service
 
-router = APIRouter(prefix="/boards", tags=["boards"])
+router = APIRouter(prefix="/boards", tags=["boards"], route_class=TimedRoute)
 
 
 @router.post("", response_model=BoardResponse, status_code=201)
@@ -25,12 +27,13 @@ async def create_board(board: BoardCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[BoardResponse])
-async def get_boards(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@query_budget(1)
+async def get_boards(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     return board_service.get_boards(db, skip=skip, limit=limit)
 
 
 @router.get("/{board_id}", response_model=BoardResponse)
-async def get_board(board_id: int, db: Session = Depends(get_db)):
+async def get_board(board_id: int, db: Session = Depends(get_read_db)):
     board = board_service.get_board_by_id(db, board_id)
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.middleware.server_timing import TimedRoute
 from app.schemas.chapter import ChapterCreate, ChapterResponse, ChapterUpdate
 from app.services import chapter_service, subject_service
 
-router = APIRouter(prefix="/chapters", tags=["chapters"])
+router = APIRouter(prefix="/chapters", tags=["chapters"], route_class=TimedRoute)
 
 
 @router.post("", response_model=ChapterResponse, status_code=201)
@@ -19,12 +20,12 @@ async def create_chapter(chapter: ChapterCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/subjects/{subject_id}", response_model=List[ChapterResponse])
-async def get_chapters_by_subject(subject_id: int, db: Session = Depends(get_db)):
+async def get_chapters_by_subject(subject_id: int, db: Session = Depends(get_read_db)):
     return chapter_service.get_chapters_by_subject(db, subject_id)
 
 
 @router.get("/{chapter_id}", response_model=ChapterResponse)
-async def get_chapter(chapter_id: int, db: Session = Depends(get_db)):
+async def get_chapter(chapter_id: int, db: Session = Depends(get_read_db)):
     chapter = chapter_service.get_chapter_by_id(db, chapter_id)
     if not chapter:
         raise HTTPException(status_code=404, detail="Chapter not found")
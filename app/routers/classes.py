@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.middleware.server_timing import TimedRoute
 from app.schemas.class_model import ClassCreate, ClassResponse, ClassUpdate
 from app.services import class_service
 
-router = APIRouter(prefix="/classes", tags=["classes"])
+router = APIRouter(prefix="/classes", tags=["classes"], route_class=TimedRoute)
 
 
 @router.post("", response_model=ClassResponse, status_code=201)
@@ -29,5 +30,5 @@ async def delete_class(class_id: int, db: Session = Depends(get_db)):
     return None
 
 @router.get("/{board_id}", response_model=List[ClassResponse])
-async def get_classes_by_board(board_id: int, db: Session = Depends(get_db)):
+async def get_classes_by_board(board_id: int, db: Session = Depends(get_read_db)):
     return class_service.get_classes_by_board(db, board_id)
\ No newline at end of file
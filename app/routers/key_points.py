@@ -1,26 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.session import get_db
-from app.schemas.key_point import KeyPointCreate, KeyPointResponse, KeyPointUpdate
-from app.services import key_point_service
+from typing import List, Optional
+from app.db.query_counter import query_budget
+from app.db.session import get_db, get_read_db
+from app.middleware.server_timing import TimedRoute
+from app.schemas.key_point import KEY_POINT_FIELDS, KeyPointCreate, KeyPointResponse, KeyPointUpdate
+from app.schemas.key_point_prerequisite import (
+    KeyPointPrerequisiteCreate,
+    KeyPointPrerequisiteResponse,
+    KeyPointOrderResponse
+)
+from app.services import key_point_service, key_point_prerequisite_service, chapter_service
+from app.services.key_point_prerequisite_service import PrerequisiteCycleError
 
 router = APIRouter(
     prefix="/key-points",
-    tags=["Key Points"]
+    tags=["Key Points"],
+    route_class=TimedRoute
 )
 
 
 @router.post("/", response_model=List[KeyPointResponse], status_code=status.HTTP_201_CREATED)
+@query_budget(4)
 async def create_key_point(
     key_points: List[KeyPointCreate],
     db: Session = Depends(get_db)
 ):
     """Create one or more key points (with associated content records)"""
     # Check if any codes already exist
+    existing_codes = set(key_point_service.get_existing_codes(db, [kp.code for kp in key_points]))
     for key_point in key_points:
-        existing = key_point_service.get_key_point_by_code(db, key_point.code)
-        if existing:
+        if key_point.code in existing_codes:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Key point with code '{key_point.code}' already exists"
@@ -32,7 +44,7 @@ async def create_key_point(
 @router.get("/{key_point_id}", response_model=KeyPointResponse)
 async def get_key_point(
     key_point_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a key point by ID"""
     key_point = key_point_service.get_key_point_by_id(db, key_point_id)
@@ -48,19 +60,155 @@ async def get_key_point(
 async def get_key_points(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all key points with pagination"""
     return key_point_service.get_all_key_points(db, skip=skip, limit=limit)
 
 
+def _selected_fields(fields: Optional[str], include_content: bool) -> Optional[List[str]]:
+    """
+    Parse a sparse fieldset into KEY_POINT_FIELDS names (None: every field).
+    """
+    if fields is None:
+        return None if include_content else [f for f in KEY_POINT_FIELDS if f != "content"]
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(KEY_POINT_FIELDS)
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown key point fields: {', '.join(sorted(unknown)) or '(none given)'}. "
+                   f"Allowed: {', '.join(KEY_POINT_FIELDS)}"
+        )
+    if not include_content:
+        requested.discard("content")
+    # The id is always returned
+    return [f for f in KEY_POINT_FIELDS if f in requested or f == "id"]
+
+
 @router.get("/chapter/{chapter_id}", response_model=List[KeyPointResponse])
+@query_budget(1)
 async def get_key_points_by_chapter(
     chapter_id: int,
+    fields: Optional[str] = None,
+    include_content: bool = True,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get all key points for a specific chapter
+    
+    Query parameters:
+    - fields: Comma-separated fields to return, e.g. `code,title,difficulty_level`
+      (`id` is always included). Only those columns are selected from the database
+    - include_content: `false` leaves out `content` without reading key_point_content
+    """
+    selected = _selected_fields(fields, include_content)
+    key_points = key_point_service.get_key_points_by_chapter(db, chapter_id, fields=selected)
+    if selected is None:
+        return key_points
+    # Sparse rows do not match KeyPointResponse, so they bypass response validation
+    return JSONResponse(jsonable_encoder([{f: getattr(kp, f) for f in selected} for kp in key_points]))
+
+
+@router.get("/chapter/{chapter_id}/order", response_model=List[KeyPointOrderResponse])
+async def get_key_point_order_by_chapter(
+    chapter_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """Get a chapter's key points in teaching order (every prerequisite before its dependents)"""
+    chapter = chapter_service.get_chapter_by_id(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+    
+    ordered = key_point_prerequisite_service.get_chapter_topological_order(db, chapter_id)
+    return [
+        KeyPointOrderResponse(
+            id=kp.id,
+            code=kp.code,
+            title=kp.title,
+            position=position,
+            prerequisite_count=prerequisite_count
+        )
+        for position, (kp, prerequisite_count) in enumerate(ordered, start=1)
+    ]
+
+
+@router.post(
+    "/{key_point_id}/prerequisites",
+    response_model=List[KeyPointPrerequisiteResponse],
+    status_code=status.HTTP_201_CREATED
+)
+async def add_key_point_prerequisites(
+    key_point_id: int,
+    prerequisites: KeyPointPrerequisiteCreate,
+    db: Session = Depends(get_db)
+):
+    """Add direct prerequisites to a key point (rejected if they would create a cycle)"""
+    key_point = key_point_service.get_key_point_by_id(db, key_point_id)
+    if not key_point:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Key point not found"
+        )
+    
+    for prerequisite_id in prerequisites.prerequisite_ids:
+        if not key_point_service.get_key_point_by_id(db, prerequisite_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Prerequisite key point {prerequisite_id} not found"
+            )
+    
+    try:
+        key_point_prerequisite_service.add_prerequisites(db, key_point_id, prerequisites.prerequisite_ids)
+    except PrerequisiteCycleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return [
+        KeyPointPrerequisiteResponse(prerequisite_id=kp.id, code=kp.code, title=kp.title, depth=depth)
+        for kp, depth in key_point_prerequisite_service.get_prerequisites(db, key_point_id)
+    ]
+
+
+@router.get("/{key_point_id}/prerequisites", response_model=List[KeyPointPrerequisiteResponse])
+async def get_key_point_prerequisites(
+    key_point_id: int,
+    transitive: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """Get the prerequisites of a key point; with transitive=true, everything that must come first, in order"""
+    key_point = key_point_service.get_key_point_by_id(db, key_point_id)
+    if not key_point:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Key point not found"
+        )
+    
+    return [
+        KeyPointPrerequisiteResponse(prerequisite_id=kp.id, code=kp.code, title=kp.title, depth=depth)
+        for kp, depth in key_point_prerequisite_service.get_prerequisites(db, key_point_id, transitive=transitive)
+    ]
+
+
+@router.delete("/{key_point_id}/prerequisites/{prerequisite_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_key_point_prerequisite(
+    key_point_id: int,
+    prerequisite_id: int,
     db: Session = Depends(get_db)
 ):
-    """Get all key points for a specific chapter"""
-    return key_point_service.get_key_points_by_chapter(db, chapter_id)
+    """Remove a direct prerequisite from a key point"""
+    success = key_point_prerequisite_service.remove_prerequisite(db, key_point_id, prerequisite_id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Prerequisite not found"
+        )
+    return None
 
 
 @router.put("/{key_point_id}", response_model=KeyPointResponse)
@@ -1,29 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from typing import List, Optional
+from app.db.session import get_db, get_read_db
+from app.db.statement_timeout import StatementTimeoutError
+from app.middleware.server_timing import TimedRoute
 from app.schemas.lesson_plan_input import LessonPlanRequest
-from app.schemas.lesson_plan_session_map import GroupKpsResponse, SessionData, SessionMetadata
+from app.schemas.lesson_plan_session_map import (
+    GroupKpsResponse,
+    SessionData,
+    SessionMetadata,
+    KeyPointRegenerateRequest,
+    KeyPointRegenerateResponse,
+    RegeneratedSession,
+    SessionImpact,
+    KeyPointImpactResponse,
+    KeyPointInvalidateRequest,
+    KeyPointInvalidateResponse
+)
 from app.schemas.lesson_plan_session_content import (
     SessionSummaryRequest, 
     SessionSummaryResponse,
     SessionDetailedRequest,
     SessionDetailedResponse,
-    SessionDetailedData
+    SessionDetailedData,
+    SessionContentFragment,
+    SessionContentFragmentsResponse
 )
-from app.services import lesson_plan_service
+from app.schemas.ai_response_cache import AIResponseCacheStats, AIResponseCacheInvalidateResponse
+from app.schemas.summary_prefetch import SummaryPrefetchStats
+from app.services import lesson_plan_service, ai_cache_service, idempotency_service, summary_prefetch_service
+from app.services.idempotency_service import IdempotencyScope, idempotency_scope
+from app.services.lesson_plan_job_service import ShuttingDownError
+from app.utils.admin_auth import require_admin_token
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.hash_utils import generate_etag
+from app.utils.rate_limit import ai_rate_limit
+
+router = APIRouter(prefix="/lesson-plans", tags=["lesson-plans"], route_class=TimedRoute)
 
-router = APIRouter(prefix="/lesson-plans", tags=["lesson-plans"])
+# Sections and paths one detailed content fragments request may ask for
+MAX_CONTENT_FRAGMENTS = 20
 
 
-@router.post("/group-kps-into-sessions", response_model=GroupKpsResponse)
-async def group_kps_into_sessions(request: LessonPlanRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/group-kps-into-sessions",
+    response_model=GroupKpsResponse,
+    dependencies=[Depends(ai_rate_limit)]
+)
+async def group_kps_into_sessions(
+    request: LessonPlanRequest,
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyScope = Depends(idempotency_scope)
+):
     """
     Group key points into sessions or retrieve from cache.
     
     This endpoint:
     1. Generates a hash from the request parameters
     2. Checks if cached session maps exist
-    3. If cached, returns them with from_cache=True
+    3. If cached, returns them with from_cache=True. If the chapter's key points
+       changed since the sessions were built, the cached sessions are still
+       returned (is_stale=True) while a regeneration runs in the background
     4. If not cached:
        - Fetches subject, class, chapter, and board details from the database
        - Calls the external AI service to group KPs into sessions
@@ -36,15 +73,31 @@ async def group_kps_into_sessions(request: LessonPlanRequest, db: Session = Depe
     - subject_id: Subject identifier
     - chapter_id: Chapter identifier
     - planned_sessions: Number of sessions (used for hash generation)
+    - grouping_mode: "ai" (default) or "local" to group in-process without the AI service.
+      In "ai" mode the local engine is used automatically while the AI service is unavailable
+    
+    Headers:
+    - Idempotency-Key: Optional. Retries with the same key get the first response
+      (Idempotent-Replayed: true) instead of generating again; see DEPLOYMENT.md
     
     Response:
     - from_cache: Boolean indicating if the result was retrieved from cache
+    - is_stale: Boolean indicating the cached result predates key point edits and is being regenerated
     - sessions: List of session objects with session_number, session_title, and kp_ids
     - metadata: Information about chapter, subject, class, total sessions and KPs
     - success: Boolean indicating success
     """
+    return await idempotency_service.run(
+        idempotency,
+        "group-kps-into-sessions",
+        request.model_dump(mode="json"),
+        lambda: _group_kps_into_sessions(request, db)
+    )
+
+
+async def _group_kps_into_sessions(request: LessonPlanRequest, db: Session) -> GroupKpsResponse:
     try:
-        from_cache, sessions, metadata = await lesson_plan_service.group_kps_into_sessions(db, request)
+        from_cache, sessions, metadata, is_stale = await lesson_plan_service.group_kps_into_sessions(db, request)
         
         # Convert to Pydantic models
         session_data_list = [SessionData(**session) for session in sessions]
@@ -52,11 +105,21 @@ async def group_kps_into_sessions(request: LessonPlanRequest, db: Session = Depe
         
         return GroupKpsResponse(
             from_cache=from_cache,
+            is_stale=is_stale,
             sessions=session_data_list,
             metadata=metadata_obj,
             success=True
         )
     
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    except ShuttingDownError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    except StatementTimeoutError:
+        raise
+    
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     
@@ -64,11 +127,22 @@ async def group_kps_into_sessions(request: LessonPlanRequest, db: Session = Depe
         raise HTTPException(status_code=500, detail=f"Failed to group KPs into sessions: {str(e)}")
 
 
-@router.post("/generate-session-summary", response_model=SessionSummaryResponse)
-async def generate_session_summary(request: SessionSummaryRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/generate-session-summary",
+    response_model=SessionSummaryResponse,
+    dependencies=[Depends(ai_rate_limit)]
+)
+async def generate_session_summary(
+    request: SessionSummaryRequest,
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyScope = Depends(idempotency_scope)
+):
     """
     Generate session summary and objectives using AI service.
     
+    A summary is generated at most once per session; if one is already stored
+    it is returned without calling the AI service.
+    
     This endpoint:
     1. Retrieves the session map using session_map_id
     2. Queries lesson plan input, board, class, subject, and chapter details
@@ -80,6 +154,10 @@ async def generate_session_summary(request: SessionSummaryRequest, db: Session =
     Request body:
     - session_map_id: ID of the session map from lesson_plan_session_map table
     
+    Headers:
+    - Idempotency-Key: Optional. Retries with the same key get the first response
+      (Idempotent-Replayed: true) instead of generating again; see DEPLOYMENT.md
+    
     Response:
     - success: Boolean indicating success
     - session_number: Session number
@@ -87,6 +165,15 @@ async def generate_session_summary(request: SessionSummaryRequest, db: Session =
     - summary: Generated session summary
     - objectives: List of session objectives
     """
+    return await idempotency_service.run(
+        idempotency,
+        "generate-session-summary",
+        request.model_dump(mode="json"),
+        lambda: _generate_session_summary(request, db)
+    )
+
+
+async def _generate_session_summary(request: SessionSummaryRequest, db: Session) -> SessionSummaryResponse:
     try:
         session_number, session_title, summary, objectives = await lesson_plan_service.generate_session_summary(
             db, request.session_map_id
@@ -100,6 +187,15 @@ async def generate_session_summary(request: SessionSummaryRequest, db: Session =
             objectives=objectives
         )
     
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    except ShuttingDownError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    except StatementTimeoutError:
+        raise
+    
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     
@@ -107,8 +203,16 @@ async def generate_session_summary(request: SessionSummaryRequest, db: Session =
         raise HTTPException(status_code=500, detail=f"Failed to generate session summary: {str(e)}")
 
 
-@router.post("/get-session-detailed-content", response_model=SessionDetailedResponse)
-async def get_session_detailed_content(request: SessionDetailedRequest, db: Session = Depends(get_db)):
+@router.post(
+    "/get-session-detailed-content",
+    response_model=SessionDetailedResponse,
+    dependencies=[Depends(ai_rate_limit)]
+)
+async def get_session_detailed_content(
+    request: SessionDetailedRequest,
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyScope = Depends(idempotency_scope)
+):
     """
     Get or generate detailed session content.
     
@@ -124,6 +228,10 @@ async def get_session_detailed_content(request: SessionDetailedRequest, db: Sess
     Request body:
     - session_id: ID of the session content record
     
+    Headers:
+    - Idempotency-Key: Optional. Retries with the same key get the first response
+      (Idempotent-Replayed: true) instead of generating again; see DEPLOYMENT.md
+    
     Response:
     - success: Boolean indicating success
     - from_cache: Whether content was retrieved from cache
@@ -131,6 +239,15 @@ async def get_session_detailed_content(request: SessionDetailedRequest, db: Sess
         - session_id: ID of the session content
         - content: Detailed session content object with teaching script, board work, etc.
     """
+    return await idempotency_service.run(
+        idempotency,
+        "get-session-detailed-content",
+        request.model_dump(mode="json"),
+        lambda: _get_session_detailed_content(request, db)
+    )
+
+
+async def _get_session_detailed_content(request: SessionDetailedRequest, db: Session) -> SessionDetailedResponse:
     try:
         from_cache, content = await lesson_plan_service.get_or_generate_session_detailed_content(
             db=db,
@@ -146,6 +263,15 @@ async def get_session_detailed_content(request: SessionDetailedRequest, db: Sess
             )
         )
     
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    except ShuttingDownError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    except StatementTimeoutError:
+        raise
+    
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     
@@ -153,3 +279,254 @@ async def get_session_detailed_content(request: SessionDetailedRequest, db: Sess
         raise HTTPException(status_code=500, detail=f"Failed to get/generate session detailed content: {str(e)}")
 
 
+@router.get("/sessions/{session_id}/detailed-content", response_model=SessionContentFragmentsResponse)
+async def get_session_detailed_content_fragments(
+    session_id: int,
+    response: Response,
+    sections: Optional[str] = None,
+    path: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get parts of a session's stored detailed content.
+    
+    Only the requested sections are extracted from the JSONB document (in SQL,
+    with `->` and `#>`) and returned, each with its own ETag. Content is never
+    generated here; use POST /get-session-detailed-content for that.
+    
+    Query parameters:
+    - sections: Comma-separated top-level sections, e.g. `teaching_script,board_work`
+    - path: `/`-separated path to a nested fragment, e.g. `activities/0`; repeatable
+    
+    Headers:
+    - If-None-Match: ETags the client has cached. Fragments whose ETag is listed are
+      returned with not_modified=true and no content; if the response ETag (covering
+      all fragments) is listed, the answer is 304 Not Modified
+    
+    Response:
+    - session_id: ID of the session map
+    - fragments: path, etag, not_modified and content (null where the path does not exist)
+    """
+    paths = [section.strip() for section in (sections or "").split(",") if section.strip()]
+    paths += [p.strip("/") for p in path or [] if p.strip("/")]
+    if not paths or len(paths) > MAX_CONTENT_FRAGMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Request between 1 and {MAX_CONTENT_FRAGMENTS} sections or paths"
+        )
+    keys = [p.split("/") for p in paths]
+    if any(not key for parts in keys for key in parts):
+        raise HTTPException(status_code=400, detail="Paths must not contain empty segments")
+    
+    try:
+        contents = lesson_plan_service.get_session_content_fragments(db, session_id, keys)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    etags = [generate_etag(content) for content in contents]
+    etag = generate_etag(list(zip(paths, etags)))
+    cached = {tag.strip().removeprefix("W/") for tag in (if_none_match or "").split(",")}
+    if etag in cached:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return SessionContentFragmentsResponse(
+        session_id=session_id,
+        fragments=[
+            SessionContentFragment(
+                path=fragment_path,
+                etag=fragment_etag,
+                not_modified=fragment_etag in cached,
+                content=None if fragment_etag in cached else content
+            )
+            for fragment_path, fragment_etag, content in zip(paths, etags, contents)
+        ]
+    )
+
+
+@router.post(
+    "/regenerate-sessions-for-key-points",
+    response_model=KeyPointRegenerateResponse,
+    dependencies=[Depends(ai_rate_limit)]
+)
+async def regenerate_sessions_for_key_points(
+    request: KeyPointRegenerateRequest,
+    db: Session = Depends(get_db),
+    idempotency: IdempotencyScope = Depends(idempotency_scope)
+):
+    """
+    Regenerate only the sessions affected by edited key points.
+    
+    This endpoint:
+    1. Finds the active session maps whose kp_ids contain any of the given key points
+    2. Replaces each with a new version (same grouping) and deactivates the old one
+    3. Regenerates the summary of each replaced session that had one
+    4. Leaves detailed content to be regenerated on the next request for it
+    
+    Request body:
+    - kp_ids: IDs of the edited key points
+    - input_id: Optional lesson plan input to restrict regeneration to
+    
+    Headers:
+    - Idempotency-Key: Optional. Retries with the same key get the first response
+      (Idempotent-Replayed: true) instead of generating again; see DEPLOYMENT.md
+    
+    Response:
+    - success: Boolean indicating success
+    - sessions: Replaced sessions with previous_session_map_id, session_map_id,
+      session_number and summary_regenerated
+    """
+    return await idempotency_service.run(
+        idempotency,
+        "regenerate-sessions-for-key-points",
+        request.model_dump(mode="json"),
+        lambda: _regenerate_sessions_for_key_points(request, db)
+    )
+
+
+async def _regenerate_sessions_for_key_points(
+    request: KeyPointRegenerateRequest,
+    db: Session
+) -> KeyPointRegenerateResponse:
+    try:
+        regenerated = await lesson_plan_service.regenerate_sessions_for_key_points(
+            db, request.kp_ids, input_id=request.input_id
+        )
+        
+        return KeyPointRegenerateResponse(
+            success=True,
+            sessions=[RegeneratedSession(**session) for session in regenerated]
+        )
+    
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    except ShuttingDownError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    except StatementTimeoutError:
+        raise
+    
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to regenerate sessions: {str(e)}")
+
+
+@router.get("/key-points/{kp_id}/sessions", response_model=KeyPointImpactResponse)
+async def get_key_point_impact(kp_id: int, include_inactive: bool = False, db: Session = Depends(get_db)):
+    """
+    Impact analysis: list the sessions that use a key point.
+    
+    Uses the session_key_point index, so no JSONB scanning is involved.
+    
+    Query parameters:
+    - include_inactive: Also list deactivated (superseded) session versions
+    
+    Response:
+    - key_point_id: The key point analysed
+    - total_sessions / total_inputs: Number of sessions and lesson plan inputs affected
+    - sessions: Affected sessions with has_summary and has_detailed_content flags
+    """
+    sessions = lesson_plan_service.get_session_impact_for_key_points(
+        db, [kp_id], include_inactive=include_inactive
+    )
+    
+    return KeyPointImpactResponse(
+        key_point_id=kp_id,
+        total_sessions=len(sessions),
+        total_inputs=len({session["input_id"] for session in sessions}),
+        sessions=[SessionImpact(**session) for session in sessions]
+    )
+
+
+@router.post("/invalidate-sessions-for-key-points", response_model=KeyPointInvalidateResponse)
+async def invalidate_sessions_for_key_points(request: KeyPointInvalidateRequest, db: Session = Depends(get_db)):
+    """
+    Targeted invalidation of generated content for sessions using the given key points.
+    
+    Summaries and detailed content of the affected active sessions are discarded;
+    the session groupings are kept and content is regenerated on the next request.
+    
+    Request body:
+    - kp_ids: IDs of the key points whose sessions should be invalidated
+    
+    Response:
+    - success: Boolean indicating success
+    - session_map_ids: Sessions whose content was invalidated
+    - contents_deleted: Number of discarded session content records
+    """
+    session_map_ids, contents_deleted = lesson_plan_service.invalidate_sessions_for_key_points(db, request.kp_ids)
+    
+    return KeyPointInvalidateResponse(
+        success=True,
+        session_map_ids=session_map_ids,
+        contents_deleted=contents_deleted
+    )
+
+
+@router.get(
+    "/ai-cache/stats",
+    response_model=AIResponseCacheStats,
+    dependencies=[Depends(require_admin_token)]
+)
+async def get_ai_cache_stats(db: Session = Depends(get_db)):
+    """
+    Report AI response cache effectiveness.
+    
+    Headers:
+    - X-Admin-Token: Required (ADMIN_TOKEN)
+    
+    Response:
+    - hits / misses / hit_rate / bytes_saved: Counters since this process started
+    - entries / total_hits / total_bytes_saved: Totals persisted across all processes
+    """
+    return AIResponseCacheStats(**ai_cache_service.get_stats(db))
+
+
+@router.delete(
+    "/ai-cache",
+    response_model=AIResponseCacheInvalidateResponse,
+    dependencies=[Depends(require_admin_token)]
+)
+async def invalidate_ai_cache(
+    endpoint: Optional[str] = None,
+    model_version: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Selectively invalidate cached AI responses.
+    
+    Headers:
+    - X-Admin-Token: Required (ADMIN_TOKEN); every invalidated response costs a new AI call
+    
+    Query parameters (all optional, combined with AND; none clears the whole cache):
+    - endpoint: AI service endpoint path, e.g. /api/generate-session-summary
+    - model_version: Model version recorded on the cached responses
+    - prompt_version: Prompt version recorded on the cached responses
+    """
+    deleted = ai_cache_service.invalidate(
+        db,
+        endpoint=endpoint,
+        model_version=model_version,
+        prompt_version=prompt_version
+    )
+    return AIResponseCacheInvalidateResponse(deleted=deleted)
+
+
+@router.get("/summary-prefetch/stats", response_model=SummaryPrefetchStats)
+async def get_summary_prefetch_stats():
+    """
+    Report speculative summary prefetch effectiveness, for tuning SUMMARY_PREFETCH_COUNT.
+    
+    Response (counters since this process started):
+    - scheduled / completed / failed / skipped / cancelled: Prefetch outcomes
+    - hits: Explicit summary requests answered by a prefetch (joined: of which were still generating)
+    - wasted: Prefetched summaries not requested within the claim window
+    - unclaimed: Prefetched summaries still within the claim window
+    - hit_rate: hits / (hits + wasted)
+    """
+    return SummaryPrefetchStats(**summary_prefetch_service.get_stats())
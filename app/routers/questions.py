@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.query_counter import query_budget
+from app.db.statement_timeout import statement_timeout
+from app.db.session import get_db, get_read_db
+from app.middleware.server_timing import TimedRoute
 from app.schemas.question import QuestionCreate, QuestionResponse, QuestionUpdate, QuestionBulkCreate
 from app.services import question_service, chapter_service
 
-router = APIRouter(prefix="/questions", tags=["questions"])
+router = APIRouter(prefix="/questions", tags=["questions"], route_class=TimedRoute)
 
 
 @router.post("", response_model=QuestionResponse, status_code=201)
@@ -19,6 +22,7 @@ async def create_question(question: QuestionCreate, db: Session = Depends(get_db
 
 
 @router.post("/bulk", response_model=List[QuestionResponse], status_code=201)
+@query_budget(3)
 async def create_questions_bulk(bulk_data: QuestionBulkCreate, db: Session = Depends(get_db)):
     # Validate chapter exists
     chapter = chapter_service.get_chapter_by_id(db, bulk_data.chapter_id)
@@ -29,12 +33,13 @@ async def create_questions_bulk(bulk_data: QuestionBulkCreate, db: Session = Dep
 
 
 @router.get("/chapters/{chapter_id}", response_model=List[QuestionResponse])
-async def get_questions_by_chapter(chapter_id: int, db: Session = Depends(get_db)):
+@statement_timeout(2000)
+async def get_questions_by_chapter(chapter_id: int, db: Session = Depends(get_read_db)):
     return question_service.get_questions_by_chapter(db, chapter_id)
 
 
 @router.get("/{question_id}", response_model=QuestionResponse)
-async def get_question(question_id: int, db: Session = Depends(get_db)):
+async def get_question(question_id: int, db: Session = Depends(get_read_db)):
     question = question_service.get_question_by_id(db, question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
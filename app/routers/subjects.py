@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.middleware.server_timing import TimedRoute
 from app.schemas.subject import SubjectCreate, SubjectResponse, SubjectUpdate
 from app.services import subject_service, class_service
 
-router = APIRouter(prefix="/subjects", tags=["subjects"])
+router = APIRouter(prefix="/subjects", tags=["subjects"], route_class=TimedRoute)
 
 
 @router.post("", response_model=SubjectResponse, status_code=201)
@@ -19,7 +20,7 @@ async def create_subject(subject: SubjectCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/classes/{class_id}", response_model=List[SubjectResponse])
-async def get_subjects_by_class(class_id: int, db: Session = Depends(get_db)):
+async def get_subjects_by_class(class_id: int, db: Session = Depends(get_read_db)):
     return subject_service.get_subjects_by_class(db, class_id)
 
 
@@ -4,6 +4,11 @@ from app.schemas.class_model import ClassCreate, ClassResponse, ClassUpdate
 from app.schemas.subject import SubjectCreate, SubjectResponse, SubjectUpdate
 from app.schemas.chapter import ChapterCreate, ChapterResponse, ChapterUpdate
 from app.schemas.key_point import KeyPointCreate, KeyPointResponse, KeyPointUpdate
+from app.schemas.key_point_prerequisite import (
+    KeyPointPrerequisiteCreate,
+    KeyPointPrerequisiteResponse,
+    KeyPointOrderResponse,
+)
 from app.schemas.key_point_content import KeyPointContentCreate, KeyPointContentResponse, KeyPointContentUpdate
 from app.schemas.question import QuestionCreate, QuestionResponse, QuestionUpdate, QuestionBulkCreate
 from app.schemas.answer import AnswerCreate, AnswerResponse
@@ -15,6 +20,8 @@ from app.schemas.lesson_plan_session_map import (
     GroupKpsResponse,
     SessionData,
     SessionMetadata,
+    KeyPointRegenerateRequest,
+    KeyPointRegenerateResponse,
 )
 from app.schemas.lesson_plan_session_content import (
     LessonPlanSessionContentCreate,
@@ -23,8 +30,16 @@ from app.schemas.lesson_plan_session_content import (
     SessionSummaryResponse,
     SessionDetailedRequest,
     SessionDetailedResponse,
-    SessionDetailedData
+    SessionDetailedData,
+    SessionContentFragment,
+    SessionContentFragmentsResponse
 )
+from app.schemas.ai_response_cache import AIResponseCacheStats, AIResponseCacheInvalidateResponse
+from app.schemas.summary_prefetch import SummaryPrefetchStats
+from app.schemas.profiling import ProfileSummary, ProfileTargetCreate, ProfileTargetResponse
+from app.schemas.slow_query import SlowQueryShapeResponse, SlowQueryResetResponse
+from app.schemas.event_loop import BlockingEventResponse
+from app.schemas.db_pool import PoolStatsResponse, PoolWaitBucket, PoolLivenessResponse
 
 __all__ = [
     "BoardCreate",
@@ -44,6 +59,9 @@ __all__ = [
     "KeyPointCreate",
     "KeyPointResponse",
     "KeyPointUpdate",
+    "KeyPointPrerequisiteCreate",
+    "KeyPointPrerequisiteResponse",
+    "KeyPointOrderResponse",
     "KeyPointContentCreate",
     "KeyPointContentResponse",
     "KeyPointContentUpdate",
@@ -63,11 +81,27 @@ __all__ = [
     "GroupKpsResponse",
     "SessionData",
     "SessionMetadata",
+    "KeyPointRegenerateRequest",
+    "KeyPointRegenerateResponse",
     "LessonPlanSessionContentCreate",
     "LessonPlanSessionContentResponse",
     "SessionSummaryRequest",
     "SessionSummaryResponse",
     "SessionDetailedRequest",
     "SessionDetailedResponse",
+    "SessionContentFragment",
+    "SessionContentFragmentsResponse",
+    "AIResponseCacheStats",
+    "AIResponseCacheInvalidateResponse",
+    "SummaryPrefetchStats",
+    "ProfileSummary",
+    "ProfileTargetCreate",
+    "ProfileTargetResponse",
+    "SlowQueryShapeResponse",
+    "SlowQueryResetResponse",
+    "BlockingEventResponse",
+    "PoolStatsResponse",
+    "PoolWaitBucket",
+    "PoolLivenessResponse",
 ]
 
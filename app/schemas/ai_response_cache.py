@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+
+
+class AIResponseCacheStats(BaseModel):
+    """AI response cache hit/miss report"""
+    enabled: bool
+    model_version: Optional[str] = None
+    prompt_version: Optional[str] = None
+    hits: int
+    misses: int
+    hit_rate: float
+    bytes_saved: int
+    stores: int
+    entries: int
+    total_hits: int
+    total_bytes_saved: int
+    total_bytes_stored: int
+
+    model_config = ConfigDict(protected_namespaces=())
+
+
+class AIResponseCacheInvalidateResponse(BaseModel):
+    """Result of a selective cache invalidation"""
+    deleted: int
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+from datetime import datetime
+
+
+class PoolWaitBucket(BaseModel):
+    """Cumulative checkout wait histogram bucket (le=None is +Inf)"""
+    le: Optional[float] = None
+    count: int
+
+
+class PoolLivenessResponse(BaseModel):
+    """Result of the last background liveness check"""
+    checked_at: Optional[datetime] = None
+    ok: Optional[bool] = None
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PoolStatsResponse(BaseModel):
+    """Connection pool state of one engine in this process"""
+    pool: str
+    pool_class: str
+    mode: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    idle: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    recycle: Optional[int] = None
+    pre_ping: bool
+    checkout_count: int
+    checkout_wait_seconds_total: float
+    checkout_wait_buckets: List[PoolWaitBucket]
+    checkout_timeouts: int
+    liveness: Optional[PoolLivenessResponse] = None
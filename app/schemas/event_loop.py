@@ -0,0 +1,14 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+from datetime import datetime
+
+
+class BlockingEventResponse(BaseModel):
+    """Event loop blocking episode with the stack that blocked it"""
+    detected_at: datetime
+    blocked_seconds: float
+    task: Optional[str] = None
+    culprit: Optional[str] = None
+    stack: List[str]
+
+    model_config = ConfigDict(from_attributes=True)
@@ -29,6 +29,21 @@ class KeyPointUpdate(BaseModel):
     skill_intent: Optional[SkillIntent] = None
 
 
+# KeyPointResponse fields that list endpoints can select with `fields=`, in response order
+KEY_POINT_FIELDS = (
+    "id",
+    "code",
+    "title",
+    "section",
+    "chapter_id",
+    "difficulty_level",
+    "cognitive_level",
+    "skill_intent",
+    "created_at",
+    "content",
+)
+
+
 class KeyPointResponse(BaseModel):
     id: int
     code: str
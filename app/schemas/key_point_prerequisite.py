@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class KeyPointPrerequisiteCreate(BaseModel):
+    prerequisite_ids: List[int] = Field(..., min_length=1)
+
+
+class KeyPointPrerequisiteResponse(BaseModel):
+    prerequisite_id: int
+    code: str
+    title: str
+    depth: int  # 1 = direct prerequisite
+
+
+class KeyPointOrderResponse(BaseModel):
+    id: int
+    code: str
+    title: str
+    position: int
+    prerequisite_count: int
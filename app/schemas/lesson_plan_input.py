@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import Literal, Optional
 
 
 class LessonPlanRequest(BaseModel):
@@ -8,6 +9,7 @@ class LessonPlanRequest(BaseModel):
     subject_id: int
     chapter_id: int
     planned_sessions: int
+    grouping_mode: Literal["ai", "local"] = "ai"  # "local" groups in-process without the AI service
 
 
 class LessonPlanInputBase(BaseModel):
@@ -25,6 +27,8 @@ class LessonPlanInputCreate(LessonPlanInputBase):
 
 class LessonPlanInputResponse(LessonPlanInputBase):
     id: int
+    kp_fingerprint: Optional[str] = None
+    grouping_source: Optional[str] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
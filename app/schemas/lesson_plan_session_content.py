@@ -29,6 +29,20 @@ class SessionDetailedResponse(BaseModel):
     data: SessionDetailedData
 
 
+class SessionContentFragment(BaseModel):
+    """Part of a session's detailed content, selected by section or JSON path"""
+    path: str
+    etag: str
+    not_modified: bool = False
+    content: Optional[Any] = None
+
+
+class SessionContentFragmentsResponse(BaseModel):
+    """Response from the session detailed content fragments endpoint"""
+    session_id: int
+    fragments: List[SessionContentFragment]
+
+
 class SessionSummaryRequest(BaseModel):
     """Request to generate session summary"""
     session_map_id: int
@@ -34,11 +34,63 @@ class GroupKpsData(BaseModel):
 class GroupKpsResponse(BaseModel):
     """Response from group-kps-into-sessions endpoint"""
     from_cache: bool
+    is_stale: bool = False
     sessions: List[SessionData]
     metadata: SessionMetadata
     success: bool
 
 
+class KeyPointRegenerateRequest(BaseModel):
+    """Request to regenerate the sessions containing edited key points"""
+    kp_ids: List[int] = Field(..., min_length=1)
+    input_id: Optional[int] = None
+
+
+class RegeneratedSession(BaseModel):
+    """A session map replaced by a new version"""
+    previous_session_map_id: int
+    session_map_id: int
+    session_number: int
+    summary_regenerated: bool
+
+
+class KeyPointRegenerateResponse(BaseModel):
+    """Response from regenerate-sessions-for-key-points endpoint"""
+    success: bool
+    sessions: List[RegeneratedSession]
+
+
+class SessionImpact(BaseModel):
+    """A session that uses a key point"""
+    session_map_id: int
+    input_id: int
+    session_number: int
+    session_title: str
+    is_active: bool
+    has_summary: bool
+    has_detailed_content: bool
+
+
+class KeyPointImpactResponse(BaseModel):
+    """Response from key point impact analysis endpoint"""
+    key_point_id: int
+    total_sessions: int
+    total_inputs: int
+    sessions: List[SessionImpact]
+
+
+class KeyPointInvalidateRequest(BaseModel):
+    """Request to invalidate generated content of sessions using key points"""
+    kp_ids: List[int] = Field(..., min_length=1)
+
+
+class KeyPointInvalidateResponse(BaseModel):
+    """Response from invalidate-sessions-for-key-points endpoint"""
+    success: bool
+    session_map_ids: List[int]
+    contents_deleted: int
+
+
 class LessonPlanSessionMapBase(BaseModel):
     """Base schema for session map"""
     input_id: int
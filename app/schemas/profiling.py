@@ -0,0 +1,33 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
+
+
+class ProfileSummary(BaseModel):
+    """Stored request profile"""
+    name: str
+    method: str
+    path: str
+    route: str
+    status: int
+    duration_ms: float
+    db_queries: int
+    samples: int
+    interval_ms: float
+    created_at: str
+
+
+class ProfileTargetCreate(BaseModel):
+    """Profile the next `count` requests matching a path pattern"""
+    path_pattern: str = Field(..., min_length=1, description="fnmatch pattern on the request path, e.g. /lesson-plans/*")
+    count: int = Field(1, ge=1, le=100)
+    method: Optional[str] = None
+
+
+class ProfileTargetResponse(BaseModel):
+    """Active runtime profiling target"""
+    id: int
+    path_pattern: str
+    remaining: int
+    method: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Optional
+from datetime import datetime
+
+
+class SlowQueryShapeResponse(BaseModel):
+    """Slow statements aggregated by shape"""
+    shape: str
+    count: int
+    total_seconds: float
+    max_seconds: float
+    last_statement: str
+    last_parameters: str
+    last_seen_at: Optional[datetime] = None
+    routes: Dict[str, int]
+    functions: Dict[str, int]
+    explain: Optional[str] = None
+    explained_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SlowQueryResetResponse(BaseModel):
+    """Slow query log reset result"""
+    deleted: int
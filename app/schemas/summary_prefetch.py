@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class SummaryPrefetchStats(BaseModel):
+    """Speculative summary prefetch report"""
+    prefetch_count: int
+    scheduled: int
+    completed: int
+    failed: int
+    skipped: int
+    cancelled: int
+    hits: int
+    joined: int
+    wasted: int
+    unclaimed: int
+    hit_rate: float
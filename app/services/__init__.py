@@ -4,8 +4,11 @@ from app.services import class_service
 from app.services import subject_service
 from app.services import chapter_service
 from app.services import key_point_service
+from app.services import key_point_prerequisite_service
 from app.services import question_service
 from app.services import lesson_plan_service
+from app.services import ai_cache_service
+from app.services import summary_prefetch_service
 
 __all__ = [
     "board_service",
@@ -14,7 +17,10 @@ __all__ = [
     "subject_service",
     "chapter_service",
     "key_point_service",
+    "key_point_prerequisite_service",
     "question_service",
     "lesson_plan_service",
+    "ai_cache_service",
+    "summary_prefetch_service",
 ]
 
@@ -0,0 +1,172 @@
+"""
+Content-addressed cache for AI service responses.
+
+Responses are stored in `ai_response_cache` keyed by a canonical hash of the
+outbound request body, so the same payload is never sent to the AI service
+twice for the same model/prompt version.
+
+Lookups read through the caller's session. Hit counts and new entries are
+written in their own short transactions, so the cache never commits or rolls
+back the caller's work.
+"""
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.db.session import AI_MODEL_VERSION, AI_PROMPT_VERSION, SessionLocal, settings
+from app.models.ai_response_cache import AIResponseCache
+from app.utils import metrics
+from app.utils.hash_utils import generate_request_hash
+
+logger = logging.getLogger(__name__)
+
+# Process-local counters (since start-up); persisted totals live on the rows
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "stores": 0}
+
+
+def _record(key: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def build_request_hash(endpoint: str, payload: Dict[str, Any]) -> str:
+    """
+    Hash an outbound request using the currently configured model/prompt versions.
+    """
+    return generate_request_hash(
+        endpoint,
+        payload,
+        model_version=AI_MODEL_VERSION,
+        prompt_version=AI_PROMPT_VERSION
+    )
+
+
+def get_cached_response(db: Session, endpoint: str, payload: Dict[str, Any]) -> Optional[dict]:
+    """
+    Return the cached AI response for a request, or None on a miss.
+    """
+    if not settings.ai_response_cache_enabled:
+        return None
+
+    request_hash = build_request_hash(endpoint, payload)
+    entry = db.query(AIResponseCache).filter(AIResponseCache.request_hash == request_hash).first()
+
+    if not entry:
+        _record("misses")
+        metrics.AI_RESPONSE_CACHE.inc(endpoint=endpoint, result="miss")
+        return None
+
+    _count_hit(entry.id)
+    _record("hits")
+    metrics.AI_RESPONSE_CACHE.inc(endpoint=endpoint, result="hit")
+    _record("bytes_saved", entry.response_bytes or 0)
+    return entry.response_json
+
+
+def _count_hit(entry_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(AIResponseCache).filter(AIResponseCache.id == entry_id).update({
+            AIResponseCache.hit_count: AIResponseCache.hit_count + 1,
+            AIResponseCache.last_hit_at: datetime.now(timezone.utc),
+        }, synchronize_session=False)
+        db.commit()
+    except Exception:
+        # Hit counts are statistics; never fail the lookup over them
+        logger.warning("Could not count AI response cache hit", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+
+def store_response(endpoint: str, payload: Dict[str, Any], response: dict) -> None:
+    """
+    Store a successful AI response. Concurrent stores of the same request are ignored.
+    """
+    if not settings.ai_response_cache_enabled:
+        return
+
+    statement = insert(AIResponseCache).values(
+        request_hash=build_request_hash(endpoint, payload),
+        endpoint=endpoint,
+        response_json=response,
+        response_bytes=len(json.dumps(response, separators=(",", ":")).encode("utf-8")),
+        model_version=AI_MODEL_VERSION,
+        prompt_version=AI_PROMPT_VERSION,
+        hit_count=0
+    ).on_conflict_do_nothing(index_elements=[AIResponseCache.request_hash])
+
+    db = SessionLocal()
+    try:
+        stored = db.execute(statement).rowcount
+        db.commit()
+    except Exception:
+        logger.warning("Could not store AI response for %s", endpoint, exc_info=True)
+        db.rollback()
+        return
+    finally:
+        db.close()
+    if stored:
+        _record("stores")
+
+
+def invalidate(
+    db: Session,
+    endpoint: Optional[str] = None,
+    model_version: Optional[str] = None,
+    prompt_version: Optional[str] = None
+) -> int:
+    """
+    Delete cached responses matching all of the given filters.
+
+    Returns:
+        Number of deleted entries
+    """
+    query = db.query(AIResponseCache)
+    if endpoint is not None:
+        query = query.filter(AIResponseCache.endpoint == endpoint)
+    if model_version is not None:
+        query = query.filter(AIResponseCache.model_version == model_version)
+    if prompt_version is not None:
+        query = query.filter(AIResponseCache.prompt_version == prompt_version)
+
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def get_stats(db: Session) -> Dict[str, Any]:
+    """
+    Report process-local hit/miss counters and persisted per-entry totals.
+    """
+    with _stats_lock:
+        process_stats = dict(_stats)
+
+    lookups = process_stats["hits"] + process_stats["misses"]
+
+    entries, total_hits, total_bytes_saved, total_bytes = db.query(
+        func.count(AIResponseCache.id),
+        func.coalesce(func.sum(AIResponseCache.hit_count), 0),
+        func.coalesce(func.sum(AIResponseCache.hit_count * AIResponseCache.response_bytes), 0),
+        func.coalesce(func.sum(AIResponseCache.response_bytes), 0)
+    ).one()
+
+    return {
+        "enabled": settings.ai_response_cache_enabled,
+        "model_version": AI_MODEL_VERSION,
+        "prompt_version": AI_PROMPT_VERSION,
+        "hits": process_stats["hits"],
+        "misses": process_stats["misses"],
+        "hit_rate": process_stats["hits"] / lookups if lookups else 0.0,
+        "bytes_saved": process_stats["bytes_saved"],
+        "stores": process_stats["stores"],
+        "entries": entries,
+        "total_hits": int(total_hits),
+        "total_bytes_saved": int(total_bytes_saved),
+        "total_bytes_stored": int(total_bytes)
+    }
@@ -0,0 +1,98 @@
+"""
+HTTP client for the external AI service.
+
+All outbound AI calls go through `post_to_ai_service` so that caching, the
+circuit breaker and other cross-cutting concerns have a single place to hook into.
+"""
+import time
+from typing import Any, Dict, Optional
+import httpx
+from app.db.session import AI_SERVICE_URL, settings
+from app.utils import metrics, request_context
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+ai_service_breaker = CircuitBreaker(
+    "ai-service",
+    failure_threshold=settings.ai_breaker_failure_threshold,
+    recovery_timeout=settings.ai_breaker_recovery_timeout
+)
+
+# Transport override, e.g. an in-process ASGI stand-in for the AI service in tests and benchmarks
+_transport: Optional[httpx.AsyncBaseTransport] = None
+
+
+def use_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """
+    Route all AI service calls through `transport` (None restores real HTTP).
+    """
+    global _transport
+    _transport = transport
+
+
+def is_available() -> bool:
+    """
+    False while the AI service circuit breaker is open.
+    """
+    return not ai_service_breaker.is_open()
+
+
+async def post_to_ai_service(endpoint: str, payload: Dict[str, Any], timeout: float) -> dict:
+    """
+    POST a JSON payload to an AI service endpoint.
+
+    Transport errors and 5xx responses count as failures for the circuit breaker.
+
+    Args:
+        endpoint: Endpoint path on the AI service (e.g. "/api/generate-session-summary")
+        payload: JSON-serializable request body
+        timeout: Request timeout in seconds
+
+    Returns:
+        The response JSON from the AI service
+
+    Raises:
+        CircuitOpenError: If the breaker is open and the call was not attempted
+        httpx.HTTPError: If the request fails
+    """
+    if not ai_service_breaker.allow_request():
+        metrics.AI_REQUEST_DURATION.observe(0.0, endpoint=endpoint, outcome="circuit_open")
+        raise CircuitOpenError("AI service is unavailable (circuit breaker open)")
+
+    url = f"{AI_SERVICE_URL}{endpoint}"
+    started = time.perf_counter()
+    outcome = "cancelled"
+
+    try:
+        async with httpx.AsyncClient(timeout=timeout, transport=_transport) as client:
+            response = await client.post(url, json=payload)
+            response.raise_for_status()
+            result = response.json()
+        outcome = "success"
+    except httpx.HTTPStatusError as e:
+        outcome = f"http_{e.response.status_code // 100}xx"
+        if e.response.status_code >= 500:
+            ai_service_breaker.record_failure()
+        else:
+            ai_service_breaker.record_success()
+        raise
+    except httpx.TimeoutException:
+        outcome = "timeout"
+        ai_service_breaker.record_failure()
+        raise
+    except (httpx.HTTPError, ValueError):
+        outcome = "error"
+        ai_service_breaker.record_failure()
+        raise
+    except BaseException:
+        ai_service_breaker.release_trial()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.AI_REQUEST_DURATION.observe(elapsed, endpoint=endpoint, outcome=outcome)
+        stats = request_context.current()
+        if stats is not None:
+            stats.add_phase("ai", elapsed)
+
+    ai_service_breaker.record_success()
+    return result
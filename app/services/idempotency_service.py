@@ -0,0 +1,287 @@
+"""
+Idempotency-Key support for the lesson plan routes that call the AI service.
+
+A client that retries a POST with the same Idempotency-Key header gets the
+response of the original request instead of a second generation:
+
+- The first request with a key records it in idempotency_keys as
+  "in_progress", runs, and stores its response (successes and 4xx errors).
+- A retry after the original completed is answered with the stored response
+  and an `Idempotent-Replayed: true` header.
+- A duplicate arriving while the original is still running in this process
+  awaits it and gets the same response. One running on another worker is
+  polled for up to IDEMPOTENCY_WAIT_SECONDS, then answered 409.
+- Reusing a key with a different request body is answered 422.
+
+Keys are scoped to the route and the caller's `client_id` (X-Client-Id, else
+a hash of the Authorization header, else the address; not the address-only
+identity of the rate limits), so two clients that pick the same key never see
+each other's responses.
+
+5xx outcomes are not stored: the key is released so that a retry runs again.
+Keys expire after IDEMPOTENCY_KEY_TTL_SECONDS, and a key left in progress by
+a dead worker can be taken over after IDEMPOTENCY_LOCK_SECONDS.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from app.db.session import SessionLocal, settings
+from app.models.idempotency_key import IdempotencyKey
+from app.utils import metrics
+from app.utils.client_identity import client_id
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# How often a duplicate re-checks a key that is in progress on another worker
+POLL_INTERVAL = 0.5
+# Fraction of new keys that also delete expired ones
+CLEANUP_RATE = 0.01
+
+
+@dataclass
+class IdempotencyScope:
+    # Idempotency-Key header, None when the client did not send one
+    key: Optional[str]
+    client: str
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: Any
+
+
+@dataclass
+class _Record:
+    request_hash: str
+    # None while the original request is in progress
+    response: Optional[StoredResponse]
+
+
+# Keyed requests running in this process: (client, endpoint, key) -> (request hash,
+# future resolved with the stored response, or None if the request failed without one)
+_in_flight: Dict[Tuple[str, str, str], Tuple[str, asyncio.Future]] = {}
+
+
+def idempotency_scope(request: Request, idempotency_key: Optional[str] = Header(None)) -> IdempotencyScope:
+    """
+    Dependency reading the Idempotency-Key header and the caller it is scoped to.
+    """
+    return IdempotencyScope(idempotency_key, client_id(request.scope, settings.trusted_proxy_count))
+
+
+def request_hash(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _key_filter(query, client: str, endpoint: str, key: str):
+    return query.filter(
+        IdempotencyKey.client == client, IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key
+    )
+
+
+def _key_expired(query, now: datetime, stale_before: Optional[datetime] = None):
+    expired = IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_key_ttl_seconds)
+    if stale_before is not None:
+        expired = expired | ((IdempotencyKey.status == "in_progress") & (IdempotencyKey.updated_at < stale_before))
+    return query.filter(expired)
+
+
+def _claim(client: str, endpoint: str, key: str, digest: str) -> Optional[_Record]:
+    """
+    Record the key as in progress for this request.
+
+    Returns:
+        None if this request now owns the key, otherwise the existing record
+    """
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        db.add(IdempotencyKey(
+            client=client,
+            key=key,
+            endpoint=endpoint,
+            request_hash=digest,
+            status="in_progress",
+            created_at=now,
+            updated_at=now
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        else:
+            if random.random() < CLEANUP_RATE:
+                _key_expired(db.query(IdempotencyKey), now).delete(synchronize_session=False)
+                db.commit()
+            return None
+
+        # Take the key over if it expired or the worker running it died
+        stale_before = now - timedelta(seconds=settings.idempotency_lock_seconds)
+        taken = (
+            _key_expired(_key_filter(db.query(IdempotencyKey), client, endpoint, key), now, stale_before)
+            .update({
+                IdempotencyKey.request_hash: digest,
+                IdempotencyKey.status: "in_progress",
+                IdempotencyKey.response_status: None,
+                IdempotencyKey.response_body: None,
+                IdempotencyKey.created_at: now,
+                IdempotencyKey.updated_at: now,
+            }, synchronize_session=False)
+        )
+        db.commit()
+        if taken:
+            return None
+
+        record = _key_filter(db.query(IdempotencyKey), client, endpoint, key).first()
+        if record is None:
+            # Deleted since the insert failed; the caller claims again
+            return _Record(digest, None)
+        response = None
+        if record.status == "completed":
+            response = StoredResponse(record.response_status, record.response_body)
+        return _Record(record.request_hash, response)
+    except Exception:
+        # Idempotency bookkeeping must not fail the request itself
+        logger.warning("Could not record idempotency key for %s; running without it", endpoint, exc_info=True)
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def _store(client: str, endpoint: str, key: str, response: Optional[StoredResponse]) -> None:
+    """
+    Store the response for the key, or release the key if there is none to replay.
+    """
+    db = SessionLocal()
+    try:
+        query = _key_filter(db.query(IdempotencyKey), client, endpoint, key)
+        if response is None:
+            query.delete(synchronize_session=False)
+        else:
+            query.update({
+                IdempotencyKey.status: "completed",
+                IdempotencyKey.response_status: response.status_code,
+                IdempotencyKey.response_body: response.body,
+                IdempotencyKey.updated_at: datetime.now(timezone.utc),
+            }, synchronize_session=False)
+        db.commit()
+    except Exception:
+        logger.warning("Could not store response for idempotency key on %s", endpoint, exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _check_request_hash(endpoint: str, stored_hash: str, digest: str) -> None:
+    if stored_hash != digest:
+        metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result="mismatch")
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+
+
+def _replay(response: StoredResponse) -> JSONResponse:
+    headers = {REPLAYED_HEADER: "true"}
+    if response.status_code >= 400:
+        raise HTTPException(status_code=response.status_code, detail=response.body.get("detail"), headers=headers)
+    return JSONResponse(content=response.body, status_code=response.status_code, headers=headers)
+
+
+async def _execute(
+    client: str,
+    endpoint: str,
+    key: str,
+    digest: str,
+    handler: Callable[[], Awaitable[Any]]
+) -> Any:
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[(client, endpoint, key)] = (digest, future)
+    response = None
+    try:
+        result = await handler()
+        response = StoredResponse(200, jsonable_encoder(result))
+        return result
+    except HTTPException as e:
+        if e.status_code < 500:
+            response = StoredResponse(e.status_code, {"detail": e.detail})
+        raise
+    finally:
+        _store(client, endpoint, key, response)
+        _in_flight.pop((client, endpoint, key), None)
+        future.set_result(response)
+        metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result="executed")
+
+
+async def run(
+    scope: IdempotencyScope,
+    endpoint: str,
+    payload: Dict[str, Any],
+    handler: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Run `handler` (the body of a route) at most once per Idempotency-Key.
+
+    Args:
+        scope: Key and caller from `idempotency_scope`; without a key the handler runs as is
+        endpoint: Route the key is scoped to
+        payload: JSON request body, compared between the original and its retries
+
+    Returns:
+        The handler's result, or a JSONResponse replaying the stored response
+
+    Raises:
+        HTTPException: 400 for an invalid key, 409 while the key is in progress on
+            another worker, 422 for a key reused with a different body, or the
+            original request's 4xx error
+    """
+    client, key = scope.client, scope.key
+    if key is None:
+        return await handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+    digest = request_hash(payload)
+    deadline = time.monotonic() + settings.idempotency_wait_seconds
+    while True:
+        running = _in_flight.get((client, endpoint, key))
+        if running is not None:
+            _check_request_hash(endpoint, running[0], digest)
+            response = await asyncio.shield(running[1])
+            if response is None:
+                # The original failed and released the key: run it again
+                continue
+            metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result="coalesced")
+            return _replay(response)
+
+        record = _claim(client, endpoint, key, digest)
+        if record is None:
+            return await _execute(client, endpoint, key, digest, handler)
+        _check_request_hash(endpoint, record.request_hash, digest)
+        if record.response is not None:
+            metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result="replayed")
+            return _replay(record.response)
+
+        if time.monotonic() >= deadline:
+            metrics.IDEMPOTENT_REQUESTS.inc(endpoint=endpoint, result="conflict")
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "5"}
+            )
+        await asyncio.sleep(POLL_INTERVAL)
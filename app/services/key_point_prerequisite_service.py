@@ -0,0 +1,225 @@
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from typing import Dict, List, Tuple
+from app.models.key_point import KeyPoint
+from app.models.key_point_prerequisite import KeyPointPrerequisite, KeyPointPrerequisiteClosure
+
+
+class PrerequisiteCycleError(ValueError):
+    """Raised when a new prerequisite edge would create a cycle."""
+
+
+def _lock_prerequisite_graph(db: Session) -> None:
+    """
+    Serialize prerequisite graph writes for the rest of the transaction,
+    so concurrent inserts cannot jointly create a cycle.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext('key_point_prerequisites'))"))
+
+
+def add_prerequisites(db: Session, key_point_id: int, prerequisite_ids: List[int]) -> List[KeyPointPrerequisite]:
+    """
+    Add direct prerequisites to a key point and extend the transitive closure.
+
+    Existing edges are skipped. All edges are added in one transaction, or none are.
+
+    Raises:
+        PrerequisiteCycleError: If an edge would make a key point (indirectly) its own prerequisite
+    """
+    _lock_prerequisite_graph(db)
+
+    created = []
+    try:
+        for prerequisite_id in dict.fromkeys(prerequisite_ids):
+            if prerequisite_id == key_point_id:
+                raise PrerequisiteCycleError("A key point cannot be its own prerequisite")
+
+            exists = db.query(KeyPointPrerequisite).filter(
+                KeyPointPrerequisite.key_point_id == key_point_id,
+                KeyPointPrerequisite.prerequisite_id == prerequisite_id
+            ).first()
+            if exists:
+                continue
+
+            # Cycle: the new prerequisite already (indirectly) requires this key point
+            cycle = db.query(KeyPointPrerequisiteClosure).filter(
+                KeyPointPrerequisiteClosure.key_point_id == prerequisite_id,
+                KeyPointPrerequisiteClosure.prerequisite_id == key_point_id
+            ).first()
+            if cycle:
+                raise PrerequisiteCycleError(
+                    f"Key point {prerequisite_id} already depends on key point {key_point_id}; "
+                    f"adding it as a prerequisite would create a cycle"
+                )
+
+            edge = KeyPointPrerequisite(key_point_id=key_point_id, prerequisite_id=prerequisite_id)
+            db.add(edge)
+            created.append(edge)
+
+            # Every ancestor of the prerequisite (and the prerequisite itself) becomes
+            # an ancestor of this key point and of everything that depends on it
+            ancestors = {prerequisite_id: 1}
+            for ancestor_id, depth in db.query(
+                KeyPointPrerequisiteClosure.prerequisite_id, KeyPointPrerequisiteClosure.depth
+            ).filter(KeyPointPrerequisiteClosure.key_point_id == prerequisite_id).all():
+                ancestors[ancestor_id] = depth + 1
+
+            descendants = {key_point_id: 0}
+            for descendant_id, depth in db.query(
+                KeyPointPrerequisiteClosure.key_point_id, KeyPointPrerequisiteClosure.depth
+            ).filter(KeyPointPrerequisiteClosure.prerequisite_id == key_point_id).all():
+                descendants[descendant_id] = depth
+
+            rows = [
+                {
+                    "key_point_id": descendant_id,
+                    "prerequisite_id": ancestor_id,
+                    "depth": descendant_depth + ancestor_depth
+                }
+                for descendant_id, descendant_depth in descendants.items()
+                for ancestor_id, ancestor_depth in ancestors.items()
+            ]
+            stmt = insert(KeyPointPrerequisiteClosure).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key_point_id", "prerequisite_id"],
+                set_={"depth": func.least(KeyPointPrerequisiteClosure.depth, stmt.excluded.depth)}
+            )
+            db.execute(stmt)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return created
+
+
+def rebuild_closure(db: Session, key_point_ids: List[int]) -> None:
+    """
+    Recompute the closure rows of the given key points from the edge table.
+    """
+    if not key_point_ids:
+        return
+
+    db.query(KeyPointPrerequisiteClosure).filter(
+        KeyPointPrerequisiteClosure.key_point_id.in_(key_point_ids)
+    ).delete(synchronize_session=False)
+
+    db.execute(
+        text("""
+            WITH RECURSIVE reach(key_point_id, prerequisite_id, depth) AS (
+                SELECT key_point_id, prerequisite_id, 1
+                FROM key_point_prerequisites
+                WHERE key_point_id = ANY(:key_point_ids)
+                UNION
+                SELECT reach.key_point_id, edge.prerequisite_id, reach.depth + 1
+                FROM reach
+                JOIN key_point_prerequisites edge ON edge.key_point_id = reach.prerequisite_id
+            )
+            INSERT INTO key_point_prerequisite_closure (key_point_id, prerequisite_id, depth)
+            SELECT key_point_id, prerequisite_id, MIN(depth)
+            FROM reach
+            GROUP BY key_point_id, prerequisite_id
+        """),
+        {"key_point_ids": list(key_point_ids)}
+    )
+
+
+def remove_prerequisite(db: Session, key_point_id: int, prerequisite_id: int) -> bool:
+    """
+    Remove a direct prerequisite edge and rebuild the closure of everything that depended on it.
+    """
+    _lock_prerequisite_graph(db)
+
+    deleted = db.query(KeyPointPrerequisite).filter(
+        KeyPointPrerequisite.key_point_id == key_point_id,
+        KeyPointPrerequisite.prerequisite_id == prerequisite_id
+    ).delete(synchronize_session=False)
+    if not deleted:
+        db.rollback()
+        return False
+
+    affected = [key_point_id] + get_dependent_ids(db, key_point_id)
+    rebuild_closure(db, affected)
+    db.commit()
+    return True
+
+
+def get_dependent_ids(db: Session, key_point_id: int) -> List[int]:
+    """
+    Get the ids of all key points that (directly or indirectly) require a key point.
+    """
+    return [
+        descendant_id
+        for (descendant_id,) in db.query(KeyPointPrerequisiteClosure.key_point_id).filter(
+            KeyPointPrerequisiteClosure.prerequisite_id == key_point_id
+        ).all()
+    ]
+
+
+def get_prerequisites(db: Session, key_point_id: int, transitive: bool = False) -> List[Tuple[KeyPoint, int]]:
+    """
+    Get what must be taught before a key point, as (key point, depth) pairs.
+
+    With `transitive=True`, indirect prerequisites are included and the result
+    is ordered furthest-first, i.e. in the order they should be taught.
+    """
+    query = (
+        db.query(KeyPoint, KeyPointPrerequisiteClosure.depth)
+        .join(KeyPointPrerequisiteClosure, KeyPointPrerequisiteClosure.prerequisite_id == KeyPoint.id)
+        .filter(KeyPointPrerequisiteClosure.key_point_id == key_point_id)
+    )
+    if not transitive:
+        query = query.filter(KeyPointPrerequisiteClosure.depth == 1)
+
+    return query.order_by(KeyPointPrerequisiteClosure.depth.desc(), KeyPoint.id).all()
+
+
+def get_chapter_topological_order(db: Session, chapter_id: int) -> List[Tuple[KeyPoint, int]]:
+    """
+    Get a chapter's key points in a valid teaching order, as (key point, prerequisite count) pairs.
+
+    If A requires B, every prerequisite of B is also a prerequisite of A, so A
+    has strictly more prerequisites than B: ordering by the closure's
+    prerequisite count is a topological order without any graph traversal.
+    """
+    # Count only the chapter's rows: an index lookup per key point on the
+    # closure's primary key instead of aggregating the whole table
+    prerequisite_counts = (
+        db.query(
+            KeyPointPrerequisiteClosure.key_point_id.label("key_point_id"),
+            func.count().label("prerequisite_count")
+        )
+        .join(KeyPoint, KeyPoint.id == KeyPointPrerequisiteClosure.key_point_id)
+        .filter(KeyPoint.chapter_id == chapter_id)
+        .group_by(KeyPointPrerequisiteClosure.key_point_id)
+        .subquery()
+    )
+    prerequisite_count = func.coalesce(prerequisite_counts.c.prerequisite_count, 0)
+
+    return (
+        db.query(KeyPoint, prerequisite_count)
+        .outerjoin(prerequisite_counts, prerequisite_counts.c.key_point_id == KeyPoint.id)
+        .filter(KeyPoint.chapter_id == chapter_id)
+        .order_by(prerequisite_count, KeyPoint.id)
+        .all()
+    )
+
+
+def get_chapter_prerequisite_map(db: Session, chapter_id: int) -> Dict[int, List[int]]:
+    """
+    Get the direct prerequisites of every key point in a chapter that has any.
+    """
+    rows = (
+        db.query(KeyPointPrerequisite.key_point_id, KeyPointPrerequisite.prerequisite_id)
+        .join(KeyPoint, KeyPoint.id == KeyPointPrerequisite.key_point_id)
+        .filter(KeyPoint.chapter_id == chapter_id)
+        .order_by(KeyPointPrerequisite.key_point_id, KeyPointPrerequisite.prerequisite_id)
+        .all()
+    )
+
+    prerequisite_map: Dict[int, List[int]] = {}
+    for key_point_id, prerequisite_id in rows:
+        prerequisite_map.setdefault(key_point_id, []).append(prerequisite_id)
+    return prerequisite_map
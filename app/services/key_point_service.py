@@ -1,7 +1,11 @@
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from sqlalchemy import Text, cast, func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session, joinedload, load_only, raiseload
+from typing import Collection, Dict, List, Optional
 from app.models.key_point import KeyPoint
 from app.models.key_point_content import KeyPointContent
+from app.models.key_point_prerequisite import KeyPointPrerequisite
+from app.models.session_key_point import SessionKeyPoint
 from app.schemas.key_point import KeyPointCreate, KeyPointUpdate
 
 
@@ -11,32 +15,25 @@ def create_key_point(db: Session, key_points: List[KeyPointCreate]) -> List[KeyP
     for key_point in key_points:
         # Extract content and version fields (not part of KeyPoint model)
         key_point_data = key_point.model_dump(exclude={'content', 'model_version', 'prompt_version'})
-        content_data = key_point.content
-        model_version = key_point.model_version
-        prompt_version = key_point.prompt_version
         
-        # Create the key_point record
+        # Create the key_point record with its key_point_content record
         db_key_point = KeyPoint(**key_point_data)
-        db.add(db_key_point)
-        db.flush()  # Flush to get the ID without committing
-        
-        # Create the associated key_point_content record
-        db_key_point_content = KeyPointContent(
-            key_point_id=db_key_point.id,
-            content=content_data,
-            model_version=model_version,
-            prompt_version=prompt_version,
+        db_key_point.key_point_contents.append(KeyPointContent(
+            content=key_point.content,
+            model_version=key_point.model_version,
+            prompt_version=key_point.prompt_version,
             is_active=True
-        )
-        db.add(db_key_point_content)
+        ))
+        db.add(db_key_point)
         created_key_points.append(db_key_point)
     
-    # Commit all records at once
+    # One flush inserts all key points, then all contents, in batches
+    db.flush()
+    ids = [kp.id for kp in created_key_points]
     db.commit()
     
-    # Refresh all created key points
-    for kp in created_key_points:
-        db.refresh(kp)
+    # Reload the created key points in one query instead of refreshing each
+    db.query(KeyPoint).filter(KeyPoint.id.in_(ids)).all()
     
     return created_key_points
 
@@ -49,16 +46,20 @@ def get_key_point_by_code(db: Session, code: str) -> Optional[KeyPoint]:
     return db.query(KeyPoint).filter(KeyPoint.code == code).first()
 
 
-def get_key_points_by_chapter(db: Session, chapter_id: int) -> List[KeyPoint]:
-    key_points = (
-        db.query(KeyPoint)
-        .options(joinedload(KeyPoint.key_point_contents))
-        .filter(KeyPoint.chapter_id == chapter_id)
-        .order_by(KeyPoint.id)
-        .all()
-    )
-    
-    # Manually set content attribute from latest active key_point_content
+def get_existing_codes(db: Session, codes: List[str]) -> List[str]:
+    """
+    Return which of `codes` are already used by a key point.
+    """
+    if not codes:
+        return []
+    rows = db.query(KeyPoint.code).filter(KeyPoint.code.in_(codes)).all()
+    return [row.code for row in rows]
+
+
+def _attach_latest_content(key_points: List[KeyPoint]) -> List[KeyPoint]:
+    """
+    Set each key point's `content` attribute from its latest active key_point_content.
+    """
     for kp in key_points:
         if kp.key_point_contents:
             active_contents = [c for c in kp.key_point_contents if c.is_active]
@@ -73,6 +74,127 @@ def get_key_points_by_chapter(db: Session, chapter_id: int) -> List[KeyPoint]:
     return key_points
 
 
+def get_key_points_by_chapter(
+    db: Session,
+    chapter_id: int,
+    fields: Optional[Collection[str]] = None
+) -> List[KeyPoint]:
+    """
+    Get a chapter's key points with their latest active content.
+    
+    `fields` (names from KEY_POINT_FIELDS) restricts the SELECT to those columns:
+    the others are deferred and raise if accessed, and key_point_content is only
+    joined when "content" is requested.
+    """
+    query = db.query(KeyPoint).filter(KeyPoint.chapter_id == chapter_id).order_by(KeyPoint.id)
+    if fields is None:
+        return _attach_latest_content(query.options(joinedload(KeyPoint.key_point_contents)).all())
+    
+    columns = [getattr(KeyPoint, field) for field in fields if field != "content"]
+    options = [load_only(KeyPoint.id, *columns, raiseload=True)]
+    if "content" not in fields:
+        options.append(raiseload(KeyPoint.key_point_contents))
+        return query.options(*options).all()
+    
+    options.append(
+        joinedload(KeyPoint.key_point_contents).load_only(
+            KeyPointContent.content, KeyPointContent.is_active, KeyPointContent.created_at
+        )
+    )
+    return _attach_latest_content(query.options(*options).all())
+
+
+def get_key_points_for_session(db: Session, session_map_id: int) -> List[KeyPoint]:
+    """
+    Get the key points of a lesson plan session through the session_key_point index.
+    """
+    key_points = (
+        db.query(KeyPoint)
+        .join(SessionKeyPoint, SessionKeyPoint.key_point_id == KeyPoint.id)
+        .options(joinedload(KeyPoint.key_point_contents))
+        .filter(SessionKeyPoint.session_map_id == session_map_id)
+        .order_by(KeyPoint.id)
+        .all()
+    )
+    
+    return _attach_latest_content(key_points)
+
+
+def _kp_digest_query(db: Session, chapter_id: int):
+    """
+    Build a query yielding (key_point_id, digest) for every key point in a chapter.
+    
+    The digest covers the fields used to build lesson plans plus the latest
+    active content version and direct prerequisites, so it changes whenever a
+    key point is reclassified, retitled, gets new content or new prerequisites.
+    """
+    latest_content = (
+        db.query(
+            KeyPointContent.key_point_id.label("key_point_id"),
+            func.max(KeyPointContent.id).label("content_id")
+        )
+        .filter(KeyPointContent.is_active == True)
+        .group_by(KeyPointContent.key_point_id)
+        .subquery()
+    )
+    
+    prerequisites = (
+        db.query(
+            KeyPointPrerequisite.key_point_id.label("key_point_id"),
+            func.string_agg(
+                cast(KeyPointPrerequisite.prerequisite_id, Text),
+                aggregate_order_by(literal(","), KeyPointPrerequisite.prerequisite_id)
+            ).label("prerequisite_ids")
+        )
+        .group_by(KeyPointPrerequisite.key_point_id)
+        .subquery()
+    )
+    
+    # NULL arguments are skipped by concat_ws, so key points without
+    # prerequisites keep the digest they had before prerequisites existed
+    digest = func.md5(func.concat_ws(
+        "|",
+        KeyPoint.id,
+        KeyPoint.title,
+        KeyPoint.section,
+        KeyPoint.difficulty_level,
+        KeyPoint.cognitive_level,
+        KeyPoint.skill_intent,
+        latest_content.c.content_id,
+        prerequisites.c.prerequisite_ids
+    ))
+    
+    return (
+        db.query(KeyPoint.id, digest.label("digest"))
+        .outerjoin(latest_content, latest_content.c.key_point_id == KeyPoint.id)
+        .outerjoin(prerequisites, prerequisites.c.key_point_id == KeyPoint.id)
+        .filter(KeyPoint.chapter_id == chapter_id)
+    )
+
+
+def get_chapter_kp_digests(db: Session, chapter_id: int) -> Dict[int, str]:
+    """
+    Get a per-key-point content digest for every key point in a chapter.
+    """
+    return {kp_id: digest for kp_id, digest in _kp_digest_query(db, chapter_id).all()}
+
+
+def get_chapter_kp_fingerprint(db: Session, chapter_id: int) -> str:
+    """
+    Compute a cheap digest of a chapter's key points in a single query.
+    
+    Equal to `generate_kp_fingerprint(get_chapter_kp_digests(...))`, but only a
+    single hash is returned from the database.
+    """
+    digests = _kp_digest_query(db, chapter_id).subquery()
+    return db.query(
+        func.md5(func.coalesce(
+            func.string_agg(digests.c.digest, aggregate_order_by(literal(","), digests.c.id)),
+            ""
+        ))
+    ).scalar()
+
+
 def get_all_key_points(db: Session, skip: int = 0, limit: int = 100) -> List[KeyPoint]:
     return db.query(KeyPoint).offset(skip).limit(limit).all()
 
@@ -92,10 +214,18 @@ def update_key_point(db: Session, key_point_id: int, key_point_update: KeyPointU
 
 
 def delete_key_point(db: Session, key_point_id: int) -> bool:
+    from app.services import key_point_prerequisite_service
+    
     db_key_point = get_key_point_by_id(db, key_point_id)
     if not db_key_point:
         return False
     
+    # Edges and closure rows of the key point itself cascade; paths that
+    # passed through it must be recomputed for everything that depended on it
+    dependent_ids = key_point_prerequisite_service.get_dependent_ids(db, key_point_id)
+    
     db.delete(db_key_point)
+    db.flush()
+    key_point_prerequisite_service.rebuild_closure(db, dependent_ids)
     db.commit()
     return True
@@ -0,0 +1,250 @@
+"""
+Lesson plan generations as resumable jobs, for graceful shutdown.
+
+Every generation that calls the AI service (a grouping cache miss, a stale
+input refresh, a session summary, detailed content) runs inside
+`tracked_job`, which records it in lesson_plan_jobs while it runs and
+deletes the row once it completes.
+
+On shutdown the lifespan calls `drain`: new generations are refused with
+ShuttingDownError (503), in-flight ones get SHUTDOWN_GRACE_SECONDS to finish
+and the rest are cancelled and left as "pending" jobs. At startup
+`resume_pending` picks up pending jobs, and "running" ones whose worker died
+without draining, and runs them again in the background. Jobs are
+idempotent: a resumed generation whose result was stored in the meantime
+finds it and stops.
+"""
+import asyncio
+import logging
+import os
+import socket
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal, settings
+from app.models.lesson_plan_job import LessonPlanJob
+from app.schemas.lesson_plan_input import LessonPlanRequest
+from app.utils import background_tasks, metrics
+
+logger = logging.getLogger(__name__)
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Tracked jobs running in this process: job id -> task running it
+_in_flight: Dict[int, asyncio.Task] = {}
+# (job id, task) of the job the current task is running, so nested generations share its row
+_current_job: ContextVar[Optional[Tuple[int, asyncio.Task]]] = ContextVar("lesson_plan_job", default=None)
+_draining = False
+
+
+class ShuttingDownError(Exception):
+    """
+    Raised when a generation is requested while this worker is shutting down.
+    """
+    pass
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+def _create_job(kind: str, params: Dict[str, Any]) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        job = LessonPlanJob(kind=kind, params=params, status="running", owner=OWNER)
+        db.add(job)
+        db.commit()
+        return job.id
+    except Exception:
+        # Job tracking must not fail the generation itself
+        logger.warning("Could not record %s job; it will not be resumable", kind, exc_info=True)
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def _finish_job(job_id: int, error: Optional[BaseException] = None, interrupted: bool = False) -> None:
+    """
+    Delete a completed job, or keep an interrupted one (or one that failed and
+    may be retried) as pending.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(LessonPlanJob).filter(LessonPlanJob.id == job_id).first()
+        if job is None:
+            return
+        if (error is None and not interrupted) or (error is not None and job.attempts == 1):
+            # Completed, or failed in front of a client that sees the error and can retry
+            db.delete(job)
+        else:
+            if interrupted:
+                job.status = "pending"
+            else:
+                # A resumed job that failed again: retry until the attempt limit
+                job.status = "pending" if job.attempts < settings.lesson_plan_job_max_attempts else "failed"
+                job.last_error = str(error)[:2000]
+            job.owner = None
+            job.updated_at = datetime.now(timezone.utc)
+            metrics.LESSON_PLAN_JOBS.inc(event="interrupted" if interrupted else job.status)
+        db.commit()
+    except Exception:
+        logger.warning("Could not update lesson plan job %s", job_id, exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def _running(job_id: Optional[int]) -> AsyncIterator[None]:
+    task = asyncio.current_task()
+    if job_id is None:
+        yield
+        return
+    _in_flight[job_id] = task
+    token = _current_job.set((job_id, task))
+    try:
+        yield
+    except asyncio.CancelledError:
+        _finish_job(job_id, interrupted=True)
+        raise
+    except Exception as e:
+        _finish_job(job_id, error=e)
+        raise
+    else:
+        _finish_job(job_id)
+    finally:
+        _current_job.reset(token)
+        _in_flight.pop(job_id, None)
+
+
+@asynccontextmanager
+async def tracked_job(kind: str, params: Dict[str, Any]) -> AsyncIterator[None]:
+    """
+    Run a generation as a resumable job.
+
+    Raises:
+        ShuttingDownError: If the worker is draining; the generation is not started
+    """
+    current = _current_job.get()
+    if current is not None and current[1] is asyncio.current_task():
+        # Part of a job this task is already running (e.g. a summary during a refresh)
+        yield
+        return
+    if _draining:
+        raise ShuttingDownError("Service is restarting, retry shortly")
+
+    async with _running(_create_job(kind, params)):
+        yield
+
+
+# --- Resumption -----------------------------------------------------------
+
+async def _resume_group_sessions(db: Session, params: Dict[str, Any]) -> None:
+    from app.services import lesson_plan_service
+    await lesson_plan_service.group_kps_into_sessions(db, LessonPlanRequest(**params))
+
+
+async def _resume_refresh_input(db: Session, params: Dict[str, Any]) -> None:
+    from app.services import lesson_plan_service
+    await lesson_plan_service.refresh_lesson_input_by_id(
+        db, params["input_id"], LessonPlanRequest(**params["request"])
+    )
+
+
+async def _resume_session_summary(db: Session, params: Dict[str, Any]) -> None:
+    from app.services import lesson_plan_service
+    if lesson_plan_service.get_session_content_by_id(db, params["session_map_id"]) is None:
+        await lesson_plan_service.generate_and_store_session_summary(db, params["session_map_id"])
+
+
+async def _resume_detailed_content(db: Session, params: Dict[str, Any]) -> None:
+    from app.services import lesson_plan_service
+    await lesson_plan_service.get_or_generate_session_detailed_content(db, params["session_id"])
+
+
+RESUME_HANDLERS: Dict[str, Callable[[Session, Dict[str, Any]], Awaitable[None]]] = {
+    "group_sessions": _resume_group_sessions,
+    "refresh_input": _resume_refresh_input,
+    "session_summary": _resume_session_summary,
+    "detailed_content": _resume_detailed_content,
+}
+
+
+async def _run_job(job_id: int, kind: str, params: Dict[str, Any]) -> None:
+    db = SessionLocal()
+    try:
+        async with _running(job_id):
+            await RESUME_HANDLERS[kind](db, params)
+    finally:
+        db.close()
+
+
+def resume_pending(limit: int = 100) -> int:
+    """
+    Claim pending jobs (and running ones abandoned by a dead worker) and run them
+    in the background on the running event loop.
+
+    Returns:
+        Number of jobs resumed
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.lesson_plan_job_stale_seconds)
+    db = SessionLocal()
+    try:
+        jobs = (
+            db.query(LessonPlanJob)
+            .filter(
+                (LessonPlanJob.status == "pending")
+                | ((LessonPlanJob.status == "running") & (LessonPlanJob.updated_at < stale_before))
+            )
+            .order_by(LessonPlanJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = []
+        for job in jobs:
+            if job.kind not in RESUME_HANDLERS or job.attempts >= settings.lesson_plan_job_max_attempts:
+                job.status = "failed"
+                continue
+            job.status = "running"
+            job.owner = OWNER
+            job.attempts += 1
+            job.updated_at = datetime.now(timezone.utc)
+            claimed.append((job.id, job.kind, dict(job.params)))
+        db.commit()
+    except Exception:
+        logger.warning("Could not resume lesson plan jobs", exc_info=True)
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+    for job_id, kind, params in claimed:
+        metrics.LESSON_PLAN_JOBS.inc(event="resumed")
+        background_tasks.spawn(f"lesson-plan-job:{job_id}", _run_job, job_id, kind, params)
+    if claimed:
+        logger.info("Resuming %d interrupted lesson plan jobs", len(claimed))
+    return len(claimed)
+
+
+async def drain(grace_seconds: float) -> None:
+    """
+    Refuse new generations, wait up to `grace_seconds` for in-flight ones and
+    cancel the rest, leaving them as pending jobs.
+    """
+    global _draining
+    _draining = True
+
+    tasks = {task for task in _in_flight.values() if not task.done()}
+    if not tasks:
+        return
+    logger.info("Waiting up to %gs for %d lesson plan generations", grace_seconds, len(tasks))
+    _, unfinished = await asyncio.wait(tasks, timeout=grace_seconds)
+    if unfinished:
+        logger.warning("Persisting %d unfinished lesson plan generations as pending jobs", len(unfinished))
+        for task in unfinished:
+            task.cancel()
+        await asyncio.wait(unfinished, timeout=5)
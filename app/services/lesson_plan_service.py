@@ -1,14 +1,28 @@
+from sqlalchemy import JSON, and_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.models.key_point import KeyPoint
 from app.models.lesson_plan_input import LessonPlanInput
 from app.models.lesson_plan_session_map import LessonPlanSessionMap
 from app.models.lesson_plan_session_content import LessonPlanSessionContent
+from app.models.session_key_point import SessionKeyPoint
 from app.schemas.lesson_plan_input import LessonPlanInputCreate, LessonPlanRequest
 from app.schemas.lesson_plan_session_map import LessonPlanSessionMapCreate
 from app.schemas.lesson_plan_session_content import LessonPlanSessionContentCreate
-from app.utils.hash_utils import generate_input_hash
-from typing import Optional, Tuple, List, Dict, Any
-import httpx
-from app.db.session import AI_SERVICE_URL
+from app.utils import background_tasks, metrics, request_context
+from app.utils.hash_utils import generate_input_hash, generate_kp_fingerprint
+from app.db.session import SessionLocal
+from app.db.statement_timeout import StatementTimeoutError
+from app.services import (
+    ai_cache_service,
+    ai_client,
+    lesson_plan_job_service,
+    session_grouping_engine,
+    summary_prefetch_service
+)
+from app.services.ai_client import post_to_ai_service
+from app.utils.circuit_breaker import CircuitOpenError
+from typing import Optional, Set, Tuple, List, Dict, Any
 
 
 def create_lesson_plan_input(db: Session, lesson_input: LessonPlanInputCreate) -> LessonPlanInput:
@@ -22,11 +36,44 @@ def create_lesson_plan_input(db: Session, lesson_input: LessonPlanInputCreate) -
     return db_input
 
 
+def _numeric_kp_ids(kp_ids: Optional[List[Any]]) -> List[int]:
+    """
+    Distinct numeric ids from a kp_ids list, in order (the AI service may return anything).
+    """
+    return [int(kp_id) for kp_id in dict.fromkeys(str(kp_id) for kp_id in kp_ids or []) if kp_id.isdigit()]
+
+
+def _existing_key_point_ids(db: Session, kp_ids: List[Any]) -> Set[int]:
+    candidates = _numeric_kp_ids(kp_ids)
+    if not candidates:
+        return set()
+    return {kp_id for (kp_id,) in db.query(KeyPoint.id).filter(KeyPoint.id.in_(candidates)).all()}
+
+
+def _link_key_points(db_session_map: LessonPlanSessionMap, known_kp_ids: Set[int]) -> LessonPlanSessionMap:
+    """
+    Populate the session_key_point index rows for a session map from its kp_ids.
+    
+    Ids that are not numeric or not in `known_kp_ids` are skipped, as in the
+    session_key_point backfill; kp_ids itself is stored as returned.
+    """
+    db_session_map.key_point_links = [
+        SessionKeyPoint(key_point_id=kp_id, position=position)
+        for position, kp_id in enumerate(
+            kp_id for kp_id in _numeric_kp_ids(db_session_map.kp_ids) if kp_id in known_kp_ids
+        )
+    ]
+    return db_session_map
+
+
 def create_session_map(db: Session, session_map: LessonPlanSessionMapCreate) -> LessonPlanSessionMap:
     """
     Create a new session map record.
     """
-    db_session_map = LessonPlanSessionMap(**session_map.model_dump())
+    db_session_map = _link_key_points(
+        LessonPlanSessionMap(**session_map.model_dump()),
+        _existing_key_point_ids(db, session_map.kp_ids)
+    )
     db.add(db_session_map)
     db.commit()
     db.refresh(db_session_map)
@@ -43,7 +90,42 @@ def get_session_maps_by_input_id(db: Session, input_id: int) -> List[LessonPlanS
     ).order_by(LessonPlanSessionMap.session_number).all()
 
 
+async def _call_ai_service(
+    db: Session,
+    endpoint: str,
+    payload: Dict[str, Any],
+    timeout: float
+) -> dict:
+    """
+    Call an AI service endpoint, serving identical requests from the response cache.
+    
+    Only successful responses are cached, so failures are retried on the next call.
+    
+    Args:
+        db: Database session
+        endpoint: AI service endpoint path
+        payload: Request body
+        timeout: Request timeout in seconds
+    
+    Returns:
+        The response JSON (cached or fresh)
+    
+    Raises:
+        httpx.HTTPError: If the request fails
+    """
+    with request_context.phase("cache"):
+        cached = ai_cache_service.get_cached_response(db, endpoint, payload)
+    if cached is not None:
+        return cached
+    
+    response = await post_to_ai_service(endpoint, payload, timeout)
+    if response.get("success"):
+        ai_cache_service.store_response(endpoint, payload, response)
+    return response
+
+
 async def call_group_kps_service(
+    db: Session,
     subject_name: str,
     class_name: str,
     chapter_title: str,
@@ -55,6 +137,7 @@ async def call_group_kps_service(
     Call the external AI service to group key points into sessions.
     
     Args:
+        db: Database session (used for the AI response cache)
         subject_name: Name of the subject
         class_name: Name of the class
         chapter_title: Title of the chapter
@@ -67,8 +150,6 @@ async def call_group_kps_service(
     Raises:
         httpx.HTTPError: If the request fails
     """
-    url = f"{AI_SERVICE_URL}/api/group-kps-into-sessions"
-    
     payload = {
         "board": board_name,
         "chapter": chapter_title,
@@ -79,94 +160,104 @@ async def call_group_kps_service(
         "knowledge_points": key_points
     }
     
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+    return await _call_ai_service(db, "/api/group-kps-into-sessions", payload, timeout=120.0)
 
 
-async def group_kps_into_sessions(
-    db: Session,
-    request: LessonPlanRequest
-) -> Tuple[bool, List[dict], dict]:
+def _build_cached_sessions(db: Session, session_maps: List[LessonPlanSessionMap]) -> List[dict]:
     """
-    Group key points into sessions or retrieve from cache.
+    Convert stored session maps (and any generated summaries) to the response format.
+    """
+    # Query session contents for summary and objectives
+    # Get all session_ids from session_maps
+    session_ids = [sm.id for sm in session_maps]
+    session_contents = db.query(LessonPlanSessionContent).filter(
+        LessonPlanSessionContent.session_id.in_(session_ids)
+    ).all()
+    
+    # Create lookup dicts for session contents by session_id
+    content_by_session_id = {
+        sc.session_id: sc.session_summary
+        for sc in session_contents
+    }
     
-    Args:
-        db: Database session
-        request: LessonPlanRequest with all parameters
+    # Create lookup for session_content availability
+    content_available_by_session_id = {
+        sc.session_id: sc.session_content is not None
+        for sc in session_contents
+    }
     
-    Returns:
-        Tuple of (from_cache: bool, sessions: list, metadata: dict)
+    # Convert to response format
+    return [
+        {
+            "session_map_id": sm.id,
+            "session_number": sm.session_number,
+            "session_title": sm.session_title,
+            "kp_ids": sm.kp_ids,
+            "summary": content_by_session_id.get(sm.id, {}).get("summary") if sm.id in content_by_session_id else None,
+            "objectives": content_by_session_id.get(sm.id, {}).get("objectives") if sm.id in content_by_session_id else None,
+            "is_detailed_content_available": content_available_by_session_id.get(sm.id, False)
+        }
+        for sm in session_maps
+    ]
+
+
+def _set_kp_digests(lesson_input: LessonPlanInput, kp_digests: Dict[int, str]) -> None:
     """
-    # Generate hash for the request
-    input_hash = generate_input_hash(
-        board_id=request.board_id,
-        class_id=request.class_id,
-        subject_id=request.subject_id,
-        chapter_id=request.chapter_id,
-        planned_sessions=request.planned_sessions
-    )
+    Record the key point digests (and derived fingerprint) a lesson plan input is built from.
+    """
+    lesson_input.kp_digests = {str(kp_id): digest for kp_id, digest in kp_digests.items()}
+    lesson_input.kp_fingerprint = generate_kp_fingerprint(kp_digests)
+
+
+def _get_kp_digests(lesson_input: LessonPlanInput) -> Dict[int, str]:
+    """
+    Return the recorded key point digests of a lesson plan input keyed by integer KP id.
+    """
+    return {int(kp_id): digest for kp_id, digest in (lesson_input.kp_digests or {}).items()}
+
+
+def _is_lesson_input_stale(db: Session, lesson_input: LessonPlanInput) -> bool:
+    """
+    Check whether the chapter's key points changed since the session maps were built.
     
-    # Check if we have a cached result
-    lesson_input = db.query(LessonPlanInput).filter(LessonPlanInput.input_hash == input_hash).first()
+    Inputs created before fingerprints were recorded are adopted with the
+    current fingerprint instead of being regenerated all at once.
+    """
+    from app.services import key_point_service
     
-    if lesson_input:
-        # Check if we have session maps for this input
-        session_maps = get_session_maps_by_input_id(db, lesson_input.id)
-        
-        if session_maps:
-            # Query session contents for summary and objectives
-            # Get all session_ids from session_maps
-            session_ids = [sm.id for sm in session_maps]
-            session_contents = db.query(LessonPlanSessionContent).filter(
-                LessonPlanSessionContent.session_id.in_(session_ids)
-            ).all()
-            
-            # Create lookup dicts for session contents by session_id
-            content_by_session_id = {
-                sc.session_id: sc.session_summary
-                for sc in session_contents
-            }
-            
-            # Create lookup for session_content availability
-            content_available_by_session_id = {
-                sc.session_id: sc.session_content is not None
-                for sc in session_contents
-            }
-            
-            # Convert to response format
-            sessions = [
-                {
-                    "session_map_id": sm.id,
-                    "session_number": sm.session_number,
-                    "session_title": sm.session_title,
-                    "kp_ids": sm.kp_ids,
-                    "summary": content_by_session_id.get(sm.id, {}).get("summary") if sm.id in content_by_session_id else None,
-                    "objectives": content_by_session_id.get(sm.id, {}).get("objectives") if sm.id in content_by_session_id else None,
-                    "is_detailed_content_available": content_available_by_session_id.get(sm.id, False)
-                }
-                for sm in session_maps
-            ]
-            
-            # Get metadata from stored data or recreate
-            from app.services import subject_service, class_service, chapter_service
-            subject = subject_service.get_subject_by_id(db, request.subject_id)
-            class_obj = class_service.get_class_by_id(db, request.class_id)
-            chapter = chapter_service.get_chapter_by_id(db, request.chapter_id)
-            
-            metadata = {
-                "chapter": chapter.title if chapter else "",
-                "subject": subject.name if subject else "",
-                "class": class_obj.name if class_obj else "",
-                "total_sessions": len(sessions),
-                "total_kps": sum(len(s["kp_ids"]) for s in sessions)
-            }
-            
-            return True, sessions, metadata
+    if lesson_input.kp_fingerprint is None:
+        _set_kp_digests(lesson_input, key_point_service.get_chapter_kp_digests(db, lesson_input.chapter_id))
+        db.commit()
+        return False
     
-    # Not in cache - need to fetch data and call AI service
-    from app.services import subject_service, class_service, chapter_service, board_service, key_point_service
+    current_fingerprint = key_point_service.get_chapter_kp_fingerprint(db, lesson_input.chapter_id)
+    return lesson_input.kp_fingerprint != current_fingerprint
+
+
+async def _generate_and_store_sessions(
+    db: Session,
+    request: LessonPlanRequest,
+    lesson_input: Optional[LessonPlanInput],
+    input_hash: str,
+    allow_fallback: bool = True
+) -> Tuple[List[dict], dict]:
+    """
+    Group the chapter's key points (AI service or local engine) and store the result.
+    
+    With `grouping_mode="ai"`, the local engine is used as a fallback while the
+    AI service circuit breaker is open (unless `allow_fallback` is False); such
+    inputs are regrouped through the AI service once it is available again.
+    
+    When `lesson_input` already exists, its current session maps are deactivated
+    in the same transaction that stores the new ones.
+    
+    Returns:
+        Tuple of (sessions: list, metadata: dict)
+    """
+    from app.services import (
+        subject_service, class_service, chapter_service, board_service, key_point_service,
+        key_point_prerequisite_service
+    )
     
     # Get subject, class, chapter, and board details
     subject = subject_service.get_subject_by_id(db, request.subject_id)
@@ -185,11 +276,16 @@ async def group_kps_into_sessions(
     if not board:
         raise ValueError("Board not found")
     
+    # Digest the key points before generating, so edits made while the
+    # AI call is in flight are detected as stale on the next lookup
+    kp_digests = key_point_service.get_chapter_kp_digests(db, request.chapter_id)
+    
     # Get key points for the chapter
     key_points = key_point_service.get_key_points_by_chapter(db, request.chapter_id)
     if not key_points:
         raise ValueError("No key points found for this chapter")
     print(f"Found {len(key_points)} key points for chapter ID {request.chapter_id}")
+    prerequisite_map = key_point_prerequisite_service.get_chapter_prerequisite_map(db, request.chapter_id)
     # Format key points for AI service
     formatted_kps = [
         {
@@ -197,35 +293,63 @@ async def group_kps_into_sessions(
             "title": kp.title,
             "difficulty": kp.difficulty_level.value,
             "cognitive_level": kp.cognitive_level.value,
-            "prerequisites": []  # Add logic for prerequisites if available in your model
+            "prerequisites": prerequisite_map.get(kp.id, [])
         }
         for kp in key_points
     ]
     
-    # Call AI service
-    ai_response = await call_group_kps_service(
-        subject_name=subject.name,
-        class_name=class_obj.name,
-        chapter_title=chapter.title,
-        board_name=board.name,
-        number_of_sessions=request.planned_sessions,
-        key_points=formatted_kps
-    )
-    
-    # Check if AI service returned success
-    if not ai_response.get("success"):
-        raise ValueError(f"AI service error: {ai_response.get('error', 'Unknown error')}")
-    
-    # Extract session data
-    data = ai_response.get("data", {})
-    sessions = data.get("sessions", [])
-    metadata = data.get("metadata", {})
+    grouping_source = "local" if request.grouping_mode == "local" else "ai"
+    if grouping_source == "ai" and allow_fallback and not ai_client.is_available():
+        grouping_source = "local_fallback"
+    
+    if grouping_source == "ai":
+        try:
+            # Call AI service
+            ai_response = await call_group_kps_service(
+                db=db,
+                subject_name=subject.name,
+                class_name=class_obj.name,
+                chapter_title=chapter.title,
+                board_name=board.name,
+                number_of_sessions=request.planned_sessions,
+                key_points=formatted_kps
+            )
+        except CircuitOpenError:
+            if not allow_fallback:
+                raise
+            grouping_source = "local_fallback"
+    
+    if grouping_source == "ai":
+        # Check if AI service returned success
+        if not ai_response.get("success"):
+            raise ValueError(f"AI service error: {ai_response.get('error', 'Unknown error')}")
+        
+        # Extract session data (copied, since the response may be shared via the AI cache)
+        data = ai_response.get("data", {})
+        sessions = [dict(session) for session in data.get("sessions", [])]
+        metadata = dict(data.get("metadata", {}))
+    else:
+        # Group in-process with the deterministic engine
+        local_kps = [
+            {**formatted_kp, "skill_intent": kp.skill_intent.value, "section": kp.section}
+            for formatted_kp, kp in zip(formatted_kps, key_points)
+        ]
+        with request_context.phase("grouping"):
+            sessions = session_grouping_engine.group_key_points(local_kps, request.planned_sessions)
+        metadata = {
+            "chapter": chapter.title,
+            "subject": subject.name,
+            "class": class_obj.name,
+            "total_sessions": len(sessions),
+            "total_kps": len(key_points)
+        }
     
     # Validate that we have sessions before creating input
     if not sessions:
         raise ValueError("AI service returned no sessions")
     
     # Create or get lesson plan input
+    created_input = False
     if not lesson_input:
         input_create = LessonPlanInputCreate(
             board_id=request.board_id,
@@ -236,9 +360,17 @@ async def group_kps_into_sessions(
             input_hash=input_hash
         )
         lesson_input = create_lesson_plan_input(db, input_create)
+        created_input = True
     
-    # Store each session in the database
+    # Store all sessions in one transaction, replacing any previous active set
     try:
+        db.query(LessonPlanSessionMap).filter(
+            LessonPlanSessionMap.input_id == lesson_input.id,
+            LessonPlanSessionMap.is_active == True
+        ).update({LessonPlanSessionMap.is_active: False}, synchronize_session=False)
+        
+        chapter_kp_ids = {kp.id for kp in key_points}
+        created_session_maps = []
         for session in sessions:
             session_map_create = LessonPlanSessionMapCreate(
                 input_id=lesson_input.id,
@@ -248,23 +380,139 @@ async def group_kps_into_sessions(
                 version=None,  # Can be extracted from AI response if available
                 is_active=True
             )
-            created_session_map = create_session_map(db, session_map_create)
-            
-            # Add session_map_id, summary and objectives to the session response
-            session["session_map_id"] = created_session_map.id
-            session["summary"] = None
-            session["objectives"] = None
-            session["is_detailed_content_available"] = False
+            db_session_map = _link_key_points(
+                LessonPlanSessionMap(**session_map_create.model_dump()),
+                chapter_kp_ids
+            )
+            db.add(db_session_map)
+            created_session_maps.append(db_session_map)
+        
+        _set_kp_digests(lesson_input, kp_digests)
+        lesson_input.grouping_source = grouping_source
+        db.commit()
     except Exception as e:
-        # If session creation fails and we just created the input, rollback by deleting it
-        if lesson_input and not db.query(LessonPlanSessionMap).filter(
-            LessonPlanSessionMap.input_id == lesson_input.id
-        ).first():
+        db.rollback()
+        # If session creation fails and we just created the input, remove it again
+        if created_input:
             db.delete(lesson_input)
             db.commit()
+        if isinstance(e, StatementTimeoutError):
+            raise
         raise ValueError(f"Failed to create session maps: {str(e)}")
     
-    return False, sessions, metadata
+    for session, created_session_map in zip(sessions, created_session_maps):
+        # Add session_map_id, summary and objectives to the session response
+        session["session_map_id"] = created_session_map.id
+        session["summary"] = None
+        session["objectives"] = None
+        session["is_detailed_content_available"] = False
+    
+    return sessions, metadata
+
+
+async def refresh_lesson_input_by_id(db: Session, input_id: int, request: LessonPlanRequest) -> None:
+    """
+    Refresh a lesson plan input by ID (no-op if it was deleted meanwhile).
+    """
+    lesson_input = db.query(LessonPlanInput).filter(LessonPlanInput.id == input_id).first()
+    if not lesson_input:
+        return
+    await refresh_lesson_input(db, lesson_input, request)
+
+
+async def _refresh_lesson_input(input_id: int, request: LessonPlanRequest) -> None:
+    """
+    Background job: refresh a stale lesson plan input with its own database session.
+    """
+    db = SessionLocal()
+    try:
+        params = {"input_id": input_id, "request": request.model_dump(mode="json")}
+        async with lesson_plan_job_service.tracked_job("refresh_input", params):
+            await refresh_lesson_input_by_id(db, input_id, request)
+    finally:
+        db.close()
+
+
+def schedule_lesson_input_refresh(input_id: int, request: LessonPlanRequest) -> None:
+    """
+    Regenerate a stale lesson plan input in the background (at most once at a time per input).
+    """
+    background_tasks.spawn(f"lesson-input-refresh:{input_id}", _refresh_lesson_input, input_id, request)
+
+
+async def group_kps_into_sessions(
+    db: Session,
+    request: LessonPlanRequest
+) -> Tuple[bool, List[dict], dict, bool]:
+    """
+    Group key points into sessions or retrieve from cache.
+    
+    Cached groupings are served even when the chapter's key points have changed
+    since they were built (stale-while-revalidate); in that case a background
+    regeneration is started and `is_stale` is returned as True.
+    
+    Args:
+        db: Database session
+        request: LessonPlanRequest with all parameters
+    
+    Returns:
+        Tuple of (from_cache: bool, sessions: list, metadata: dict, is_stale: bool)
+    """
+    # Generate hash for the request
+    input_hash = generate_input_hash(
+        board_id=request.board_id,
+        class_id=request.class_id,
+        subject_id=request.subject_id,
+        chapter_id=request.chapter_id,
+        planned_sessions=request.planned_sessions,
+        grouping_mode=request.grouping_mode
+    )
+    
+    # Check if we have a cached result
+    with request_context.phase("cache"):
+        lesson_input = db.query(LessonPlanInput).filter(LessonPlanInput.input_hash == input_hash).first()
+        # Check if we have session maps for this input
+        session_maps = get_session_maps_by_input_id(db, lesson_input.id) if lesson_input else []
+    
+    if lesson_input:
+        
+        if session_maps:
+            is_stale = _is_lesson_input_stale(db, lesson_input)
+            # Local fallback groupings are replaced once the AI service is back
+            if lesson_input.grouping_source == "local_fallback" and ai_client.is_available():
+                is_stale = True
+            if is_stale:
+                schedule_lesson_input_refresh(lesson_input.id, request)
+            metrics.LESSON_PLAN_CACHE.inc(result="stale" if is_stale else "hit")
+            
+            with request_context.phase("cache"):
+                sessions = _build_cached_sessions(db, session_maps)
+            
+            # Get metadata from stored data or recreate
+            from app.services import subject_service, class_service, chapter_service
+            subject = subject_service.get_subject_by_id(db, request.subject_id)
+            class_obj = class_service.get_class_by_id(db, request.class_id)
+            chapter = chapter_service.get_chapter_by_id(db, request.chapter_id)
+            
+            metadata = {
+                "chapter": chapter.title if chapter else "",
+                "subject": subject.name if subject else "",
+                "class": class_obj.name if class_obj else "",
+                "total_sessions": len(sessions),
+                "total_kps": sum(len(s["kp_ids"]) for s in sessions)
+            }
+            
+            return True, sessions, metadata, is_stale
+    
+    # Not in cache - need to fetch data and call AI service
+    metrics.LESSON_PLAN_CACHE.inc(result="miss")
+    async with lesson_plan_job_service.tracked_job("group_sessions", request.model_dump(mode="json")):
+        sessions, metadata = await _generate_and_store_sessions(db, request, lesson_input, input_hash)
+    
+    # Clients ask for summaries in session order next; start on the first few now
+    summary_prefetch_service.schedule([session["session_map_id"] for session in sessions])
+    
+    return False, sessions, metadata, False
 
 
 def get_session_map_by_id(db: Session, session_map_id: int) -> Optional[LessonPlanSessionMap]:
@@ -277,15 +525,26 @@ def get_session_map_by_id(db: Session, session_map_id: int) -> Optional[LessonPl
 def create_session_content(db: Session, session_content: LessonPlanSessionContentCreate) -> LessonPlanSessionContent:
     """
     Create a new session content record.
+    
+    A session has at most one content record; if a concurrent request stored
+    one first, that record is returned instead.
     """
     db_session_content = LessonPlanSessionContent(**session_content.model_dump())
     db.add(db_session_content)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = get_session_content_by_id(db, session_content.session_id)
+        if existing is None:
+            raise
+        return existing
     db.refresh(db_session_content)
     return db_session_content
 
 
 async def call_generate_session_summary(
+    db: Session,
     board: str,
     chapter: str,
     class_name: str,
@@ -297,6 +556,7 @@ async def call_generate_session_summary(
     Call the external AI service to generate session summary.
     
     Args:
+        db: Database session (used for the AI response cache)
         board: Board name
         chapter: Chapter title
         class_name: Class name
@@ -310,8 +570,6 @@ async def call_generate_session_summary(
     Raises:
         httpx.HTTPError: If the request fails
     """
-    url = f"{AI_SERVICE_URL}/api/generate-session-summary"
-    
     payload = {
         "board": board,
         "chapter": chapter,
@@ -321,10 +579,7 @@ async def call_generate_session_summary(
         "knowledge_points": knowledge_points
     }
     
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+    return await _call_ai_service(db, "/api/generate-session-summary", payload, timeout=120.0)
 
 
 async def generate_session_summary(
@@ -334,6 +589,45 @@ async def generate_session_summary(
     """
     Generate session summary using AI service and store in database.
     
+    A summary is generated at most once per session: one that was already
+    stored (or prefetched) is returned instead, and a prefetch that is
+    currently generating it is awaited rather than duplicated.
+    
+    Args:
+        db: Database session
+        session_map_id: ID of the session map
+    
+    Returns:
+        Tuple of (session_number, session_title, summary, objectives)
+    """
+    with request_context.phase("prefetch"):
+        prefetched = await summary_prefetch_service.claim(db, session_map_id)
+    session_content = prefetched or get_session_content_by_id(db, session_map_id)
+    if session_content is not None:
+        session_map = get_session_map_by_id(db, session_map_id)
+        if session_map:
+            session_summary = session_content.session_summary or {}
+            return (
+                session_map.session_number,
+                session_map.session_title,
+                session_summary.get("summary", ""),
+                session_summary.get("objectives", [])
+            )
+    
+    with summary_prefetch_service.explicit_request():
+        return await generate_and_store_session_summary(db, session_map_id)
+
+
+async def generate_and_store_session_summary(
+    db: Session,
+    session_map_id: int
+) -> Tuple[int, str, str, List[str]]:
+    """
+    Generate a session summary with the AI service and store it, unconditionally.
+    
+    If a concurrent generation stored the session's summary first, that
+    summary is returned and the new one is discarded.
+    
     Args:
         db: Database session
         session_map_id: ID of the session map
@@ -370,17 +664,8 @@ async def generate_session_summary(
     if not chapter:
         raise ValueError("Chapter not found")
     
-    # Get key points based on kp_ids from session_map
-    kp_ids = session_map.kp_ids  # This is a list of kp IDs
-    
-    # Convert kp_ids from strings to integers if needed
-    if kp_ids and isinstance(kp_ids[0], str):
-        kp_ids = [int(kp_id) for kp_id in kp_ids]
-    
-    all_key_points = key_point_service.get_key_points_by_chapter(db, lesson_input.chapter_id)
-    
-    # Filter key points that match the kp_ids in the session
-    filtered_kps = [kp for kp in all_key_points if kp.id in kp_ids]
+    # Get the session's key points through the session_key_point index
+    filtered_kps = key_point_service.get_key_points_for_session(db, session_map.id)
     
     if not filtered_kps:
         raise ValueError("No key points found for the session")
@@ -396,41 +681,47 @@ async def generate_session_summary(
         for kp in filtered_kps
     ]
     
-    # Call AI service
-    ai_response = await call_generate_session_summary(
-        board=board.name,
-        chapter=chapter.title,
-        class_name=class_obj.name,
-        subject=subject.name,
-        session_title=session_map.session_title,
-        knowledge_points=knowledge_points
-    )
-    
-    # Check if AI service returned success
-    if not ai_response.get("success"):
-        raise ValueError(f"AI service error: {ai_response.get('error', 'Unknown error')}")
-    
-    # Extract data from response
-    data = ai_response.get("data", {})
-    summary = data.get("summary", "")
-    objectives = data.get("objectives", [])
-    
-    # Create session summary object to store
-    session_summary_data = {
-        "summary": summary,
-        "objectives": objectives
-    }
-    
-    # Store in database
-    session_content_create = LessonPlanSessionContentCreate(
-        session_id=session_map_id,
-        session_summary=session_summary_data,
-        session_content=None,  # Will be generated later
-        version=None
+    async with lesson_plan_job_service.tracked_job("session_summary", {"session_map_id": session_map_id}):
+        # Call AI service
+        ai_response = await call_generate_session_summary(
+            db=db,
+            board=board.name,
+            chapter=chapter.title,
+            class_name=class_obj.name,
+            subject=subject.name,
+            session_title=session_map.session_title,
+            knowledge_points=knowledge_points
+        )
+        
+        # Check if AI service returned success
+        if not ai_response.get("success"):
+            raise ValueError(f"AI service error: {ai_response.get('error', 'Unknown error')}")
+        
+        # Extract data from response
+        data = ai_response.get("data", {})
+        
+        # Create session summary object to store
+        session_summary_data = {
+            "summary": data.get("summary", ""),
+            "objectives": data.get("objectives", [])
+        }
+        
+        # Store in database
+        session_content_create = LessonPlanSessionContentCreate(
+            session_id=session_map_id,
+            session_summary=session_summary_data,
+            session_content=None,  # Will be generated later
+            version=None
+        )
+        stored = create_session_content(db, session_content_create)
+    
+    session_summary = stored.session_summary or {}
+    return (
+        session_map.session_number,
+        session_map.session_title,
+        session_summary.get("summary", ""),
+        session_summary.get("objectives", [])
     )
-    create_session_content(db, session_content_create)
-    
-    return session_map.session_number, session_map.session_title, summary, objectives
 
 
 def get_session_content_by_id(db: Session, session_id: int) -> Optional[LessonPlanSessionContent]:
@@ -439,7 +730,42 @@ def get_session_content_by_id(db: Session, session_id: int) -> Optional[LessonPl
     """
     return db.query(LessonPlanSessionContent).filter(LessonPlanSessionContent.session_id == session_id).first()
 
+def get_session_content_fragments(db: Session, session_id: int, paths: List[List[str]]) -> List[Any]:
+    """
+    Extract parts of a session's detailed content in SQL, so only those parts
+    leave the database: a top-level section with `->`, a nested path with `#>`.
+    
+    Args:
+        db: Database session
+        session_id: ID of the session map
+        paths: Paths into the content, each a list of keys (array indexes as strings)
+    
+    Returns:
+        The fragment at each path, None where the path does not exist
+    
+    Raises:
+        ValueError: If the session has no content record or no detailed content yet
+    """
+    document = LessonPlanSessionContent.session_content
+    fragments = [
+        (document[path[0]] if len(path) == 1 else document[tuple(path)]).label(f"fragment_{i}")
+        for i, path in enumerate(paths)
+    ]
+    row = (
+        # Content stored as None may be SQL NULL or a JSON null
+        db.query(and_(document.isnot(None), document != JSON.NULL).label("generated"), *fragments)
+        .filter(LessonPlanSessionContent.session_id == session_id)
+        .first()
+    )
+    if row is None:
+        raise ValueError("Session content not found")
+    if not row.generated:
+        raise ValueError("Detailed content has not been generated for this session")
+    return list(row[1:])
+
+
 async def call_generate_detailed_content(
+    db: Session,
     subject_name: str,
     class_name: str,
     title: str,
@@ -452,6 +778,7 @@ async def call_generate_detailed_content(
     Call the external AI service to generate detailed session content.
     
     Args:
+        db: Database session (used for the AI response cache)
         subject_name: Subject name
         class_name: Class name
         title: Session title
@@ -466,8 +793,6 @@ async def call_generate_detailed_content(
     Raises:
         httpx.HTTPError: If the request fails
     """
-    url = f"{AI_SERVICE_URL}/api/generate-detailed-content-for-session"
-    
     payload = {
         "subject_name": subject_name,
         "class_name": class_name,
@@ -478,10 +803,7 @@ async def call_generate_detailed_content(
         "kp_list": kp_list
     }
     
-    async with httpx.AsyncClient(timeout=180.0) as client:
-        response = await client.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+    return await _call_ai_service(db, "/api/generate-detailed-content-for-session", payload, timeout=180.0)
 
 
 async def get_or_generate_session_detailed_content(
@@ -499,7 +821,8 @@ async def get_or_generate_session_detailed_content(
         Tuple of (from_cache: bool, content: dict)
     """
     # Get session content record
-    session_content = get_session_content_by_id(db, session_id)
+    with request_context.phase("cache"):
+        session_content = get_session_content_by_id(db, session_id)
     if not session_content:
         raise ValueError("Session content not found")
     
@@ -529,17 +852,8 @@ async def get_or_generate_session_detailed_content(
     if not class_obj:
         raise ValueError("Class not found")
     
-    # Get key points based on kp_ids from session_map
-    kp_ids = session_map.kp_ids
-    
-    # Convert kp_ids from strings to integers if needed
-    if kp_ids and isinstance(kp_ids[0], str):
-        kp_ids = [int(kp_id) for kp_id in kp_ids]
-    
-    all_key_points = key_point_service.get_key_points_by_chapter(db, lesson_input.chapter_id)
-    
-    # Filter key points that match the kp_ids in the session
-    filtered_kps = [kp for kp in all_key_points if kp.id in kp_ids]
+    # Get the session's key points through the session_key_point index
+    filtered_kps = key_point_service.get_key_points_for_session(db, session_map.id)
     
     if not filtered_kps:
         raise ValueError("No key points found for the session")
@@ -557,28 +871,253 @@ async def get_or_generate_session_detailed_content(
     summary = session_content.session_summary.get("summary", "")
     objectives = session_content.session_summary.get("objectives", [])
     
-    # Call AI service
-    ai_response = await call_generate_detailed_content(
-        subject_name=subject.name,
-        class_name=class_obj.name,
-        title=session_map.session_title,
-        duration="40 mins",  # Default duration
-        summary=summary,
-        objectives=objectives,
-        kp_list=kp_list
+    async with lesson_plan_job_service.tracked_job("detailed_content", {"session_id": session_id}):
+        # Call AI service
+        ai_response = await call_generate_detailed_content(
+            db=db,
+            subject_name=subject.name,
+            class_name=class_obj.name,
+            title=session_map.session_title,
+            duration="40 mins",  # Default duration
+            summary=summary,
+            objectives=objectives,
+            kp_list=kp_list
+        )
+        
+        # Check if AI service returned success
+        if not ai_response.get("success"):
+            raise ValueError(f"AI service error: {ai_response.get('error', 'Unknown error')}")
+        
+        # Extract content from response
+        content = ai_response.get("data", {}).get("content", {})
+        
+        # Update session_content in database
+        session_content.session_content = content
+        db.commit()
+        db.refresh(session_content)
+    
+    return False, content
+
+
+def get_active_session_maps_for_key_points(
+    db: Session,
+    kp_ids: List[int],
+    input_id: Optional[int] = None
+) -> List[LessonPlanSessionMap]:
+    """
+    Retrieve active session maps whose kp_ids contain any of the given key points.
+    """
+    if not kp_ids:
+        return []
+    
+    session_ids = db.query(SessionKeyPoint.session_map_id).filter(
+        SessionKeyPoint.key_point_id.in_(kp_ids)
+    )
+    query = db.query(LessonPlanSessionMap).filter(
+        LessonPlanSessionMap.is_active == True,
+        LessonPlanSessionMap.id.in_(session_ids)
+    )
+    if input_id is not None:
+        query = query.filter(LessonPlanSessionMap.input_id == input_id)
+    
+    return query.order_by(LessonPlanSessionMap.input_id, LessonPlanSessionMap.session_number).all()
+
+
+def get_session_impact_for_key_points(
+    db: Session,
+    kp_ids: List[int],
+    include_inactive: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    List the sessions that use any of the given key points, with what has been generated for them.
+    
+    Returns:
+        List of dicts with session_map_id, input_id, session_number, session_title,
+        is_active, has_summary and has_detailed_content
+    """
+    session_ids = db.query(SessionKeyPoint.session_map_id).filter(
+        SessionKeyPoint.key_point_id.in_(kp_ids)
     )
+    query = db.query(LessonPlanSessionMap).filter(LessonPlanSessionMap.id.in_(session_ids))
+    if not include_inactive:
+        query = query.filter(LessonPlanSessionMap.is_active == True)
+    session_maps = query.order_by(LessonPlanSessionMap.input_id, LessonPlanSessionMap.session_number).all()
+    
+    if not session_maps:
+        return []
+    
+    detailed_content = LessonPlanSessionContent.session_content
+    contents = db.query(
+        LessonPlanSessionContent.session_id,
+        # Content stored as None may be SQL NULL or a JSON null
+        and_(detailed_content.isnot(None), detailed_content != JSON.NULL)
+    ).filter(
+        LessonPlanSessionContent.session_id.in_([sm.id for sm in session_maps])
+    ).all()
+    has_detailed = {}
+    for session_id, detailed in contents:
+        has_detailed[session_id] = has_detailed.get(session_id, False) or detailed
+    
+    return [
+        {
+            "session_map_id": sm.id,
+            "input_id": sm.input_id,
+            "session_number": sm.session_number,
+            "session_title": sm.session_title,
+            "is_active": sm.is_active,
+            "has_summary": sm.id in has_detailed,
+            "has_detailed_content": has_detailed.get(sm.id, False)
+        }
+        for sm in session_maps
+    ]
+
+
+def invalidate_sessions_for_key_points(db: Session, kp_ids: List[int]) -> Tuple[List[int], int]:
+    """
+    Discard the generated summaries and detailed content of active sessions using the given key points.
     
-    # Check if AI service returned success
-    if not ai_response.get("success"):
-        raise ValueError(f"AI service error: {ai_response.get('error', 'Unknown error')}")
+    The session groupings are kept; content is regenerated the next time it is requested.
     
-    # Extract content from response
-    content = ai_response.get("data", {}).get("content", {})
+    Returns:
+        Tuple of (invalidated session_map_ids, number of deleted content rows)
+    """
+    session_ids = [sm.id for sm in get_active_session_maps_for_key_points(db, kp_ids)]
+    if not session_ids:
+        return [], 0
     
-    # Update session_content in database
-    session_content.session_content = content
+    deleted = db.query(LessonPlanSessionContent).filter(
+        LessonPlanSessionContent.session_id.in_(session_ids)
+    ).delete(synchronize_session=False)
     db.commit()
-    db.refresh(session_content)
     
-    return False, content
+    return session_ids, deleted
+
+
+def _next_version(version: Optional[str]) -> str:
+    """
+    Increment a numeric session map version; unversioned maps count as version 1.
+    """
+    if version and version.isdigit():
+        return str(int(version) + 1)
+    return "2"
 
+
+async def regenerate_sessions_for_key_points(
+    db: Session,
+    kp_ids: List[int],
+    input_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Regenerate only the sessions that contain the given (edited) key points.
+    
+    Each affected session map is replaced by a new version with the same
+    grouping, and the old version is deactivated. If the old version had a
+    summary, a new one is generated (one AI call per affected session);
+    detailed content is regenerated lazily the next time it is requested.
+    
+    Args:
+        db: Database session
+        kp_ids: IDs of the edited key points
+        input_id: Restrict regeneration to one lesson plan input
+    
+    Returns:
+        List of dicts with previous_session_map_id, session_map_id, session_number
+        and summary_regenerated for every replaced session
+    """
+    affected = get_active_session_maps_for_key_points(db, kp_ids, input_id=input_id)
+    if not affected:
+        return []
+    
+    had_summary = {
+        session_id
+        for (session_id,) in db.query(LessonPlanSessionContent.session_id).filter(
+            LessonPlanSessionContent.session_id.in_([sm.id for sm in affected])
+        ).all()
+    }
+    
+    known_kp_ids = _existing_key_point_ids(db, [kp_id for sm in affected for kp_id in sm.kp_ids or []])
+    replacements = []
+    for old_map in affected:
+        new_map = _link_key_points(LessonPlanSessionMap(
+            input_id=old_map.input_id,
+            session_number=old_map.session_number,
+            session_title=old_map.session_title,
+            kp_ids=old_map.kp_ids,
+            version=_next_version(old_map.version),
+            is_active=True
+        ), known_kp_ids)
+        old_map.is_active = False
+        db.add(new_map)
+        replacements.append((old_map, new_map))
+    db.commit()
+    
+    results = []
+    for old_map, new_map in replacements:
+        summary_regenerated = False
+        if old_map.id in had_summary:
+            await generate_and_store_session_summary(db, new_map.id)
+            summary_regenerated = True
+        
+        results.append({
+            "previous_session_map_id": old_map.id,
+            "session_map_id": new_map.id,
+            "session_number": new_map.session_number,
+            "summary_regenerated": summary_regenerated
+        })
+    
+    # Record the regenerated key points as up to date on the affected inputs
+    from app.services import key_point_service
+    input_ids = {old_map.input_id for old_map, _ in replacements}
+    for lesson_input in db.query(LessonPlanInput).filter(LessonPlanInput.id.in_(input_ids)).all():
+        if lesson_input.kp_digests is None:
+            continue
+        current_digests = key_point_service.get_chapter_kp_digests(db, lesson_input.chapter_id)
+        recorded_digests = _get_kp_digests(lesson_input)
+        for kp_id in kp_ids:
+            if kp_id in current_digests and kp_id in recorded_digests:
+                recorded_digests[kp_id] = current_digests[kp_id]
+        _set_kp_digests(lesson_input, recorded_digests)
+    db.commit()
+    
+    return results
+
+
+async def refresh_lesson_input(
+    db: Session,
+    lesson_input: LessonPlanInput,
+    request: LessonPlanRequest
+) -> None:
+    """
+    Bring a stale lesson plan input up to date with the chapter's key points.
+    
+    When key points were only edited, just the sessions containing them are
+    regenerated. When key points were added or removed (or no per-KP digests
+    were recorded, or the grouping was a local fallback), the whole chapter
+    is regrouped.
+    """
+    from app.services import key_point_service
+    
+    current_digests = key_point_service.get_chapter_kp_digests(db, lesson_input.chapter_id)
+    recorded_digests = _get_kp_digests(lesson_input)
+    
+    session_maps = get_session_maps_by_input_id(db, lesson_input.id)
+    # Ids the AI invented or that were deleted since would never match the digests
+    mapped_kp_ids = _existing_key_point_ids(db, [kp_id for sm in session_maps for kp_id in sm.kp_ids or []])
+    
+    if (
+        lesson_input.grouping_source == "local_fallback"
+        or not recorded_digests
+        or set(recorded_digests) != set(current_digests)
+        or mapped_kp_ids != set(current_digests)
+    ):
+        await _generate_and_store_sessions(
+            db, request, lesson_input, lesson_input.input_hash, allow_fallback=False
+        )
+        return
+    
+    changed_kp_ids = [
+        kp_id for kp_id, digest in current_digests.items()
+        if recorded_digests.get(kp_id) != digest
+    ]
+    if changed_kp_ids:
+        await regenerate_sessions_for_key_points(db, changed_kp_ids, input_id=lesson_input.id)
@@ -21,9 +21,11 @@ def create_questions_bulk(db: Session, bulk_data: QuestionBulkCreate) -> List[Qu
         db.add(db_question)
         questions.append(db_question)
     
+    db.flush()
+    ids = [q.id for q in questions]
     db.commit()
-    for q in questions:
-        db.refresh(q)
+    # Reload the created questions in one query instead of refreshing each
+    db.query(Question).filter(Question.id.in_(ids)).all()
     return questions
 
 
@@ -0,0 +1,208 @@
+"""
+Deterministic, in-process grouping of a chapter's key points into sessions.
+
+Used as a fast path (`grouping_mode="local"`) and as a fallback when the AI
+service circuit breaker is open. Takes the same key point dicts that are sent
+to the AI service and returns sessions in the same shape the AI service does.
+
+Algorithm:
+1. Order key points: sections in chapter order (first appearance by id), and
+   within a section by cognitive level, then difficulty, then id; any
+   prerequisites are always placed before the key points that depend on them.
+2. Weight each key point by difficulty and cognitive level.
+3. Cut the ordered list into contiguous sessions of roughly equal weight,
+   moving each cut to a nearby section boundary when one is close enough.
+"""
+import heapq
+from typing import Any, Dict, List, Optional
+
+
+COGNITIVE_ORDER = {
+    "Remember": 0,
+    "Understand": 1,
+    "Apply": 2,
+    "Analyze": 3,
+    "Evaluate": 4,
+    "Create": 5,
+}
+
+DIFFICULTY_ORDER = {
+    "Very_Easy": 0,
+    "Easy": 1,
+    "Medium": 2,
+    "Hard": 3,
+    "Very_Hard": 4,
+}
+
+# Relative teaching time of a key point
+DIFFICULTY_WEIGHTS = {
+    "Very_Easy": 0.6,
+    "Easy": 0.8,
+    "Medium": 1.0,
+    "Hard": 1.3,
+    "Very_Hard": 1.6,
+}
+
+COGNITIVE_WEIGHTS = {
+    "Remember": 0.8,
+    "Understand": 1.0,
+    "Apply": 1.1,
+    "Analyze": 1.2,
+    "Evaluate": 1.3,
+    "Create": 1.4,
+}
+
+# Skill intents that need practice time on top of explanation
+PRACTICE_SKILL_INTENTS = {"Compute", "Problem_Solving", "Critical_Thinking"}
+
+# How far (as a fraction of the average session size) a cut may move to land on a section boundary
+SECTION_SNAP_TOLERANCE = 0.25
+
+
+def _key_point_weight(kp: Dict[str, Any]) -> float:
+    weight = DIFFICULTY_WEIGHTS.get(kp.get("difficulty"), 1.0) * COGNITIVE_WEIGHTS.get(kp.get("cognitive_level"), 1.0)
+    if kp.get("skill_intent") in PRACTICE_SKILL_INTENTS:
+        weight *= 1.15
+    return weight
+
+
+def _order_key_points(key_points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order key points for teaching, honouring prerequisites (stable topological sort).
+    """
+    section_rank: Dict[Optional[str], int] = {}
+    for kp in sorted(key_points, key=lambda k: int(k["kp_id"])):
+        section_rank.setdefault(kp.get("section"), len(section_rank))
+
+    def sort_key(kp: Dict[str, Any]):
+        return (
+            section_rank[kp.get("section")],
+            COGNITIVE_ORDER.get(kp.get("cognitive_level"), len(COGNITIVE_ORDER)),
+            DIFFICULTY_ORDER.get(kp.get("difficulty"), len(DIFFICULTY_ORDER)),
+            int(kp["kp_id"]),
+        )
+
+    by_id = {int(kp["kp_id"]): kp for kp in key_points}
+    dependents: Dict[int, List[int]] = {kp_id: [] for kp_id in by_id}
+    missing: Dict[int, int] = {kp_id: 0 for kp_id in by_id}
+    for kp_id, kp in by_id.items():
+        for prerequisite_id in kp.get("prerequisites") or []:
+            prerequisite_id = int(prerequisite_id)
+            # Prerequisites outside the chapter are already taught
+            if prerequisite_id in by_id and prerequisite_id != kp_id:
+                dependents[prerequisite_id].append(kp_id)
+                missing[kp_id] += 1
+
+    ready = [(sort_key(by_id[kp_id]), kp_id) for kp_id, count in missing.items() if count == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        _, kp_id = heapq.heappop(ready)
+        ordered.append(by_id[kp_id])
+        for dependent_id in dependents[kp_id]:
+            missing[dependent_id] -= 1
+            if missing[dependent_id] == 0:
+                heapq.heappush(ready, (sort_key(by_id[dependent_id]), dependent_id))
+
+    # Cyclic prerequisites cannot be honoured; append the rest in plain order
+    if len(ordered) < len(by_id):
+        placed = {int(kp["kp_id"]) for kp in ordered}
+        ordered.extend(sorted((kp for kp_id, kp in by_id.items() if kp_id not in placed), key=sort_key))
+
+    return ordered
+
+
+def _cut_points(ordered: List[Dict[str, Any]], number_of_sessions: int) -> List[int]:
+    """
+    Return the start index of every session after the first.
+    """
+    weights = [_key_point_weight(kp) for kp in ordered]
+    prefix = [0.0]
+    for weight in weights:
+        prefix.append(prefix[-1] + weight)
+    total = prefix[-1]
+
+    count = len(ordered)
+    tolerance = max(1, int(round(count / number_of_sessions * SECTION_SNAP_TOLERANCE)))
+    boundaries = {
+        i for i in range(1, count)
+        if ordered[i].get("section") != ordered[i - 1].get("section")
+    }
+
+    cuts = []
+    previous = 0
+    search_from = 1
+    for k in range(1, number_of_sessions):
+        target = total * k / number_of_sessions
+        # First index whose prefix weight reaches the target
+        ideal = search_from
+        while ideal < count and prefix[ideal] < target:
+            ideal += 1
+        if ideal > search_from and (target - prefix[ideal - 1]) < (prefix[ideal] - target):
+            ideal -= 1
+
+        # Keep at least one key point in this and every remaining session
+        low = previous + 1
+        high = count - (number_of_sessions - k)
+        cut = min(max(ideal, low), high)
+
+        nearby = [b for b in boundaries if low <= b <= high and abs(b - cut) <= tolerance]
+        if nearby:
+            cut = min(nearby, key=lambda b: (abs(b - cut), b))
+
+        cuts.append(cut)
+        previous = cut
+        search_from = cut
+
+    return cuts
+
+
+def _session_title(session_kps: List[Dict[str, Any]], session_number: int) -> str:
+    sections = list(dict.fromkeys(kp.get("section") for kp in session_kps if kp.get("section")))
+    if len(sections) == 1:
+        return sections[0]
+    if len(sections) > 1:
+        return f"{sections[0]} & {sections[-1]}" if len(sections) == 2 else f"{sections[0]} to {sections[-1]}"
+    return f"Session {session_number}: {session_kps[0]['title']}"
+
+
+def group_key_points(key_points: List[Dict[str, Any]], number_of_sessions: int) -> List[Dict[str, Any]]:
+    """
+    Group key points into balanced, ordered sessions.
+
+    Args:
+        key_points: Key point dicts with kp_id, title, difficulty, cognitive_level and
+            optionally skill_intent, section and prerequisites (list of kp ids)
+        number_of_sessions: Requested number of sessions (capped at the number of key points)
+
+    Returns:
+        List of session dicts with session_number, session_title and kp_ids (as strings)
+    """
+    if not key_points:
+        return []
+
+    number_of_sessions = max(1, min(number_of_sessions, len(key_points)))
+    ordered = _order_key_points(key_points)
+    starts = [0] + _cut_points(ordered, number_of_sessions) + [len(ordered)]
+
+    sessions = []
+    for index in range(number_of_sessions):
+        session_kps = ordered[starts[index]:starts[index + 1]]
+        sessions.append({
+            "session_number": index + 1,
+            "session_title": _session_title(session_kps, index + 1),
+            "kp_ids": [str(kp["kp_id"]) for kp in session_kps],
+        })
+
+    # Sessions splitting one section get numbered parts
+    title_counts: Dict[str, int] = {}
+    for session in sessions:
+        title_counts[session["session_title"]] = title_counts.get(session["session_title"], 0) + 1
+    parts_seen: Dict[str, int] = {}
+    for session in sessions:
+        title = session["session_title"]
+        if title_counts[title] > 1:
+            parts_seen[title] = parts_seen.get(title, 0) + 1
+            session["session_title"] = f"{title} (Part {parts_seen[title]})"
+
+    return sessions
@@ -0,0 +1,172 @@
+"""
+Speculative prefetch of session summaries.
+
+Right after a fresh grouping, clients almost always ask for the summary of
+session 1, then session 2, and so on. When `summary_prefetch_count` (K) is set,
+the summaries of the first K sessions are generated in the background as soon
+as the grouping is stored, so those requests are answered from the database.
+
+Prefetches are low priority: they run one at a time, wait while any explicit
+summary generation is in flight and are skipped while the AI service circuit
+breaker is open. An explicit request for a session whose prefetch has not
+started yet cancels that prefetch; one that is already generating is joined
+instead of generating the summary twice.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal, settings
+from app.models.lesson_plan_session_content import LessonPlanSessionContent
+from app.services import ai_client
+from app.utils import background_tasks
+
+logger = logging.getLogger(__name__)
+
+# How often a queued prefetch re-checks whether explicit requests have finished
+YIELD_INTERVAL = 0.2
+
+_prefetch_slot = asyncio.Semaphore(1)
+_explicit_in_flight = 0
+# Sessions whose prefetch is currently calling the AI service
+_generating: Set[int] = set()
+# Prefetched summaries not yet requested: session_map_id -> completion time
+_unclaimed: Dict[int, float] = {}
+
+_stats = {
+    "scheduled": 0,
+    "completed": 0,
+    "failed": 0,
+    "skipped": 0,
+    "cancelled": 0,
+    "hits": 0,
+    "joined": 0,
+    "wasted": 0,
+}
+
+
+def _task_key(session_map_id: int) -> str:
+    return f"summary-prefetch:{session_map_id}"
+
+
+def _expire_unclaimed() -> None:
+    """
+    Count prefetched summaries nobody asked for within the claim window as wasted.
+    """
+    cutoff = time.monotonic() - settings.summary_prefetch_claim_window
+    for session_map_id, completed_at in list(_unclaimed.items()):
+        if completed_at < cutoff:
+            del _unclaimed[session_map_id]
+            _stats["wasted"] += 1
+
+
+def schedule(session_map_ids: List[int]) -> int:
+    """
+    Start prefetching the summaries of the first K sessions (in the given order).
+
+    Returns:
+        Number of prefetches scheduled
+    """
+    count = settings.summary_prefetch_count
+    if count <= 0:
+        return 0
+
+    _expire_unclaimed()
+    for session_map_id in session_map_ids[:count]:
+        background_tasks.spawn(_task_key(session_map_id), _prefetch, session_map_id)
+        _stats["scheduled"] += 1
+    return min(count, len(session_map_ids))
+
+
+async def _prefetch(session_map_id: int) -> None:
+    from app.services import lesson_plan_service
+
+    async with _prefetch_slot:
+        while _explicit_in_flight:
+            await asyncio.sleep(YIELD_INTERVAL)
+
+        if not ai_client.is_available():
+            _stats["skipped"] += 1
+            return
+
+        db = SessionLocal()
+        _generating.add(session_map_id)
+        try:
+            if lesson_plan_service.get_session_content_by_id(db, session_map_id):
+                _stats["skipped"] += 1
+                return
+            await lesson_plan_service.generate_and_store_session_summary(db, session_map_id)
+            _unclaimed[session_map_id] = time.monotonic()
+            _stats["completed"] += 1
+        except Exception as e:
+            # The explicit request will generate the summary itself
+            _stats["failed"] += 1
+            logger.warning("Summary prefetch for session map %s failed: %s", session_map_id, e)
+        finally:
+            _generating.discard(session_map_id)
+            db.close()
+
+
+async def claim(db: Session, session_map_id: int) -> Optional[LessonPlanSessionContent]:
+    """
+    Resolve an explicit summary request against the prefetcher.
+
+    Joins a prefetch that is already generating this session's summary, cancels
+    one that is still queued, and returns the prefetched summary if there is one.
+
+    Returns:
+        The stored session content holding the prefetched summary, or None if
+        the caller has to generate the summary itself
+    """
+    task = background_tasks.get(_task_key(session_map_id))
+    if task is not None:
+        if session_map_id in _generating:
+            await asyncio.shield(task)
+            if session_map_id in _unclaimed:
+                _stats["joined"] += 1
+        else:
+            task.cancel()
+            _stats["cancelled"] += 1
+            return None
+
+    if _unclaimed.pop(session_map_id, None) is None:
+        return None
+
+    from app.services import lesson_plan_service
+
+    session_content = lesson_plan_service.get_session_content_by_id(db, session_map_id)
+    if session_content is not None:
+        _stats["hits"] += 1
+    return session_content
+
+
+@contextmanager
+def explicit_request() -> Iterator[None]:
+    """
+    Mark an explicit summary generation as in flight, holding back queued prefetches.
+    """
+    global _explicit_in_flight
+    _explicit_in_flight += 1
+    try:
+        yield
+    finally:
+        _explicit_in_flight -= 1
+
+
+def get_stats() -> dict:
+    """
+    Report prefetch effectiveness since this process started.
+
+    `hit_rate` is the share of prefetched summaries that were requested, out of
+    those that were either requested or expired unrequested (wasted).
+    """
+    _expire_unclaimed()
+    resolved = _stats["hits"] + _stats["wasted"]
+    return {
+        "prefetch_count": settings.summary_prefetch_count,
+        **_stats,
+        "unclaimed": len(_unclaimed),
+        "hit_rate": _stats["hits"] / resolved if resolved else 0.0,
+    }
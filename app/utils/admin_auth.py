@@ -0,0 +1,32 @@
+"""
+Shared-secret authentication for operational endpoints.
+
+Admin endpoints, on-demand profiling and the AI response cache endpoints
+require the `X-Admin-Token` header to match ADMIN_TOKEN. With no ADMIN_TOKEN
+configured they are disabled.
+"""
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.db.session import settings
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """
+    Whether `token` is the configured admin token (always False when none is configured).
+    """
+    if not settings.admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.admin_token.encode())
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Dependency rejecting requests without a valid admin token.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin API is disabled")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
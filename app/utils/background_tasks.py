@@ -0,0 +1,68 @@
+"""
+Registry for fire-and-forget asyncio tasks started by request handlers.
+
+Tasks can be keyed so that the same unit of work (e.g. regenerating one
+lesson plan input) is never running twice in the same process.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from app.utils import request_context
+
+logger = logging.getLogger(__name__)
+
+_keyed_tasks: Dict[str, asyncio.Task] = {}
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(
+    key: Optional[str],
+    func: Callable[..., Awaitable[Any]],
+    *args: Any,
+    **kwargs: Any
+) -> asyncio.Task:
+    """
+    Run `func(*args, **kwargs)` in the background on the running event loop.
+
+    If `key` is given and a task with that key is still running, the existing
+    task is returned and `func` is not called again.
+    """
+    if key is not None:
+        existing = _keyed_tasks.get(key)
+        if existing is not None and not existing.done():
+            return existing
+
+    # The task must not count towards the request that happened to start it
+    task = asyncio.get_running_loop().create_task(
+        func(*args, **kwargs), context=request_context.detached_context()
+    )
+    _tasks.add(task)
+    if key is not None:
+        _keyed_tasks[key] = task
+
+    def _on_done(t: asyncio.Task) -> None:
+        _tasks.discard(t)
+        if key is not None and _keyed_tasks.get(key) is t:
+            del _keyed_tasks[key]
+        if not t.cancelled() and t.exception() is not None:
+            logger.error("Background task %s failed", key or t.get_name(), exc_info=t.exception())
+
+    task.add_done_callback(_on_done)
+    return task
+
+
+def get(key: str) -> Optional[asyncio.Task]:
+    """
+    Return the running task registered under `key`, if any.
+    """
+    task = _keyed_tasks.get(key)
+    if task is not None and not task.done():
+        return task
+    return None
+
+
+def pending() -> Set[asyncio.Task]:
+    """
+    Return all background tasks that have not finished yet.
+    """
+    return {t for t in _tasks if not t.done()}
@@ -0,0 +1,82 @@
+"""
+Minimal circuit breaker for calls to external services.
+"""
+import threading
+import time
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    - closed: calls go through; `failure_threshold` consecutive failures open it
+    - open: calls are rejected until `recovery_timeout` seconds have passed
+    - half-open: one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return "half_open"
+        return "open"
+
+    def is_open(self) -> bool:
+        """
+        True if calls would currently be rejected (open, or half-open with a trial in flight).
+        """
+        with self._lock:
+            state = self._state()
+            return state == "open" or (state == "half_open" and self._trial_in_flight)
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may proceed; reserves the trial call when half-open.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """
+        Give back a reserved half-open trial without recording an outcome (e.g. on cancellation).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
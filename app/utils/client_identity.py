@@ -0,0 +1,47 @@
+"""
+Identify the client behind a request. `client_id` scopes per-client state
+(read-your-writes pinning, idempotency keys); rate limits use `client_address`,
+which a client cannot choose.
+"""
+import hashlib
+from starlette.types import Scope
+
+CLIENT_ID_HEADER = b"x-client-id"
+
+
+def client_id(scope: Scope, trusted_proxies: int = 0) -> str:
+    """
+    The client's identity: its X-Client-Id header, a hash of its credentials,
+    or else its address (see `client_address`).
+    """
+    headers = dict(scope.get("headers") or [])
+    explicit = headers.get(CLIENT_ID_HEADER)
+    if explicit:
+        return "id:" + explicit.decode("latin-1")[:128]
+
+    authorization = headers.get(b"authorization")
+    if authorization:
+        return "auth:" + hashlib.sha256(authorization).hexdigest()[:32]
+
+    return client_address(scope, trusted_proxies)
+
+
+def client_address(scope: Scope, trusted_proxies: int = 0) -> str:
+    """
+    The client's address, which keys rate limits.
+
+    This is the peer address of the connection unless `trusted_proxies`
+    (TRUSTED_PROXY_COUNT) proxies sit in front of the application. In that
+    case it is the X-Forwarded-For entry that many positions from the right,
+    the one the outermost trusted proxy appended. Entries to its left are
+    supplied by the client and never used.
+    """
+    if trusted_proxies > 0:
+        forwarded = dict(scope.get("headers") or []).get(b"x-forwarded-for")
+        hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",")] if forwarded else []
+        hops = [hop for hop in hops if hop]
+        if hops:
+            return "ip:" + hops[-min(trusted_proxies, len(hops))]
+
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
@@ -1,4 +1,6 @@
 import hashlib
+import json
+from typing import Any, Dict, Optional
 
 
 def generate_input_hash(
@@ -6,13 +8,84 @@ def generate_input_hash(
     class_id: int,
     subject_id: int,
     chapter_id: int,
-    planned_sessions: int
+    planned_sessions: int,
+    grouping_mode: str = "ai"
 ) -> str:
     """
     Generate a SHA-256 hex digest for a normalized input string.
 
     Normalized format:
     "{board_id}|{class_id}|{subject_id}|{chapter_id}|{planned_sessions}"
+    with "|{grouping_mode}" appended for non-AI grouping modes, so existing
+    AI hashes are unchanged.
     """
     normalized = f"{board_id}|{class_id}|{subject_id}|{chapter_id}|{planned_sessions}"
+    if grouping_mode != "ai":
+        normalized = f"{normalized}|{grouping_mode}"
     return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def generate_kp_fingerprint(kp_digests: Dict[int, str]) -> str:
+    """
+    Generate an MD5 hex digest over per-key-point digests.
+
+    Normalized format (ordered by key point id):
+    "{digest_1},{digest_2},..."
+    """
+    normalized = ",".join(kp_digests[kp_id] for kp_id in sorted(kp_digests))
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()
+
+
+def _normalize_payload(value: Any) -> Any:
+    """
+    Recursively normalize a JSON payload so that semantically identical
+    payloads serialize identically (surrounding whitespace in strings is
+    ignored; key order is handled by the canonical dump).
+    """
+    if isinstance(value, dict):
+        return {str(k): _normalize_payload(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_payload(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def canonical_json(payload: Any) -> str:
+    """
+    Serialize a payload to canonical JSON (sorted keys, compact separators).
+    """
+    return json.dumps(
+        _normalize_payload(payload),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str
+    )
+
+
+def generate_request_hash(
+    endpoint: str,
+    payload: Any,
+    model_version: Optional[str] = None,
+    prompt_version: Optional[str] = None
+) -> str:
+    """
+    Generate a SHA-256 hex digest for an outbound AI service request.
+
+    Normalized format:
+    "{endpoint}|{model_version}|{prompt_version}|{canonical_json(payload)}"
+    """
+    normalized = f"{endpoint}|{model_version or ''}|{prompt_version or ''}|{canonical_json(payload)}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def generate_etag(value: Any) -> str:
+    """
+    Generate a strong ETag (quoted, truncated SHA-256) for a JSON value.
+
+    Unlike canonical_json, strings are hashed as is, so any change to the
+    value changes the tag.
+    """
+    serialized = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return f'"{hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:32]}"'
@@ -0,0 +1,40 @@
+"""
+Recent load of this process, read by the admission middleware to shed load.
+
+Each signal is an exponentially decaying average: it follows recent
+observations and falls back towards zero when nothing is observed (e.g.
+when shedding stops all pool checkouts), so shedding cannot lock itself in.
+"""
+import math
+import threading
+import time
+
+# Seconds for an observation's weight to fall to 1/e
+DECAY_SECONDS = 5.0
+
+
+class DecayingAverage:
+    def __init__(self, decay_seconds: float = DECAY_SECONDS):
+        self.decay_seconds = decay_seconds
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * math.exp(-(now - self._updated) / self.decay_seconds)
+
+    def observe(self, value: float, weight: float = 0.2) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._value = self._decayed(now) * (1 - weight) + value * weight
+            self._updated = now
+
+    def current(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+# Seconds waited for a pooled connection (primary pool)
+POOL_WAIT = DecayingAverage()
+# Event loop heartbeat lag in seconds
+LOOP_LAG = DecayingAverage()
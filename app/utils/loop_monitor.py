@@ -0,0 +1,174 @@
+"""
+Event loop lag and blocking call monitor.
+
+A heartbeat task wakes up every LOOP_MONITOR_INTERVAL_MS and records how late
+it was scheduled in the `event_loop_lag_seconds` histogram: any lag means
+some callback held the loop and every other request on the worker waited.
+
+A watchdog thread checks the heartbeat. When the loop has not come back for
+LOOP_BLOCK_THRESHOLD_MS it captures the loop thread's stack, i.e. the code
+blocking it right now (typically a synchronous database call inside an
+`async def` route), logs it once per blocking episode and keeps it for
+GET /admin/event-loop/blocks.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Deque, List, Optional
+from app.db.session import settings
+from app.utils import load_signals, metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTS = 50
+MAX_STACK_FRAMES = 40
+
+
+@dataclass
+class BlockingEvent:
+    detected_at: datetime
+    # How long the loop had been blocked when the stack was captured (it may block longer)
+    blocked_seconds: float
+    task: Optional[str]
+    # Innermost application frame, e.g. app.services.key_point_service.get_key_points_by_chapter:212
+    culprit: Optional[str]
+    stack: List[str]
+
+
+_events: Deque[BlockingEvent] = deque(maxlen=MAX_EVENTS)
+_events_lock = threading.Lock()
+
+
+def _culprit(frame: Optional[FrameType]) -> Optional[str]:
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and not module.startswith("app.middleware."):
+            return f"{module}.{frame.f_code.co_qualname}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+def _task_name(task: Optional[asyncio.Task]) -> Optional[str]:
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", task.get_name())
+
+
+def _format_stack(frame: Optional[FrameType]) -> List[str]:
+    """
+    The stack of the callback running on the loop, without the event loop frames above it.
+    """
+    if frame is None:
+        return []
+    summary = traceback.extract_stack(frame)
+    starts = [i for i, entry in enumerate(summary) if entry.filename.endswith(os.path.join("asyncio", "events.py"))]
+    if starts:
+        summary = summary[starts[-1] + 1:]
+    return [line.rstrip() for line in traceback.format_list(summary[-MAX_STACK_FRAMES:])]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, block_threshold: float):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._last_beat = time.perf_counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._heartbeat = self._loop.create_task(self._beat(), name="loop-monitor-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_beat = now
+            lag = max(0.0, now - expected)
+            metrics.EVENT_LOOP_LAG.observe(lag)
+            load_signals.LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            last_beat = self._last_beat
+            blocked = time.perf_counter() - last_beat - self.interval
+            # Report each blocking episode (identified by its last heartbeat) once
+            if blocked < self.block_threshold or last_beat == reported_beat:
+                continue
+            reported_beat = last_beat
+            self._capture(blocked)
+
+    def _capture(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        event = BlockingEvent(
+            detected_at=datetime.now(timezone.utc),
+            blocked_seconds=blocked,
+            task=_task_name(asyncio.current_task(self._loop)),
+            culprit=_culprit(frame),
+            stack=_format_stack(frame),
+        )
+        with _events_lock:
+            _events.append(event)
+        metrics.EVENT_LOOP_BLOCKS.inc()
+        logger.warning(
+            "Event loop blocked for more than %.0f ms in %s (task %s):\n%s",
+            blocked * 1000, event.culprit or "<unknown>", event.task, "\n".join(event.stack)
+        )
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def start() -> None:
+    """
+    Start monitoring the running event loop (no-op when LOOP_MONITOR_ENABLED is false).
+    """
+    global _monitor
+    if not settings.loop_monitor_enabled or _monitor is not None:
+        return
+    _monitor = LoopMonitor(settings.loop_monitor_interval_ms / 1000, settings.loop_block_threshold_ms / 1000)
+    _monitor.start()
+
+
+async def stop() -> None:
+    global _monitor
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor = None
+
+
+def get_blocking_events() -> List[BlockingEvent]:
+    """
+    The most recent blocking episodes, newest first.
+    """
+    with _events_lock:
+        return list(reversed(_events))
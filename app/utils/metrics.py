@@ -0,0 +1,255 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A minimal registry of counters, gauges and histograms (no client library or
+external collector needed); `render()` produces the body of GET /metrics.
+All metric updates are thread-safe, since database events fire on thread
+pool workers.
+"""
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Request / AI call latency (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Single database statement / pool checkout (seconds)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# Event loop scheduling lag (seconds)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Statements per request
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """
+    A gauge set directly, or computed at render time by `callback`
+    (returning {label values tuple: value}).
+    """
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callbacks: List[Callable[[], Dict[LabelValues, float]]] = [callback] if callback else []
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def add_callback(self, callback: Callable[[], Dict[LabelValues, float]]) -> None:
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            values.update(callback())
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> ([count per bucket], sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    def snapshot(self, **labels: str) -> Tuple[List[Tuple[float, int]], int, float]:
+        """
+        ([(upper bound, cumulative count)], count, sum) for one label set.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), [0.0]))
+            counts, total = list(counts), total[0]
+        cumulative, buckets = 0, []
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets, cumulative, total
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+def render() -> str:
+    """
+    Render every registered metric in the Prometheus text format.
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# --- Application metrics --------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status", ("method", "route", "status")
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database statements issued per HTTP request", ("method", "route"), COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Database time per HTTP request", ("method", "route")
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Duration of single database statements", ("pool",), DB_BUCKETS
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_THRESHOLD_MS", ("pool",)
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds", "Time spent waiting for a pooled connection", ("pool",), DB_BUCKETS
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT seconds", ("pool",)
+)
+DB_POOL_LIVENESS_FAILURES = Counter(
+    "db_pool_liveness_failures_total", "Failed background pool liveness checks", ("pool",)
+)
+DB_STATEMENT_TIMEOUTS = Counter(
+    "db_statement_timeouts_total", "Requests failed by a statement cancelled after its statement timeout", ("method", "route")
+)
+DB_READ_ROUTING = Counter(
+    "db_read_routing_total", "Read-only requests by database (primary or replica) and reason", ("target", "reason")
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Pooled connections by state", ("pool", "state")
+)
+AI_REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds", "AI service call latency by upstream endpoint and outcome", ("endpoint", "outcome")
+)
+AI_RESPONSE_CACHE = Counter(
+    "ai_response_cache_total", "AI response cache lookups by endpoint and result", ("endpoint", "result")
+)
+LESSON_PLAN_CACHE = Counter(
+    "lesson_plan_cache_total", "Lesson plan grouping lookups (hit, stale hit or miss)", ("result",)
+)
+LESSON_PLAN_JOBS = Counter(
+    "lesson_plan_jobs_total", "Lesson plan generation jobs interrupted by shutdown, resumed or failed", ("event",)
+)
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total",
+    "Requests with an Idempotency-Key by endpoint and result (executed, replayed, coalesced, conflict, mismatch)",
+    ("endpoint", "result")
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat was scheduled", (), LAG_BUCKETS
+)
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by rate limit bucket", ("bucket",)
+)
+REQUESTS_SHED = Counter(
+    "requests_shed_total", "Requests rejected with 503 by load shedding, by overload signal", ("reason",)
+)
+EVENT_LOOP_BLOCKS = Counter(
+    "event_loop_blocks_total", "Times the event loop was blocked longer than LOOP_BLOCK_THRESHOLD_MS"
+)
@@ -0,0 +1,279 @@
+"""
+Statistical profiler for single requests.
+
+While a profiled request runs, a sampling thread records the request's stack
+every PROFILE_INTERVAL_MS: the coroutine stack of the request's asyncio task
+(also while it is suspended, so time spent awaiting the AI service or the
+thread pool shows up as `<await>`) and the stacks of thread pool threads
+running its sync endpoint. Samples are wall-clock, not CPU time.
+
+Profiles are written to PROFILE_DIR in the collapsed-stack format
+("frame;frame;frame count" per line) read by flamegraph.pl, speedscope and
+inferno, with a JSON sidecar describing the request.
+
+Requests are profiled when they ask for it (see app.middleware.profiling) or
+when they match a target set at runtime through the admin API, e.g. the next
+5 requests to /lesson-plans/*.
+"""
+import asyncio
+import fnmatch
+import json
+import os
+import re
+import secrets
+import sys
+import sysconfig
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional
+from app.db.session import settings
+from app.utils.request_context import RequestStats
+
+PROFILE_SUFFIX = ".folded"
+METADATA_SUFFIX = ".json"
+AWAIT_FRAME = "<await>"
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+
+
+# --- Runtime targets ------------------------------------------------------
+
+@dataclass
+class ProfileTarget:
+    id: int
+    # fnmatch pattern on the request path, e.g. /lesson-plans/*
+    path_pattern: str
+    remaining: int
+    method: Optional[str] = None
+
+
+_targets: Dict[int, ProfileTarget] = {}
+_target_ids = iter(range(1, sys.maxsize))
+_targets_lock = threading.Lock()
+
+
+def add_target(path_pattern: str, count: int, method: Optional[str] = None) -> ProfileTarget:
+    """
+    Profile the next `count` requests whose path matches `path_pattern`.
+    """
+    with _targets_lock:
+        target = ProfileTarget(next(_target_ids), path_pattern, count, method.upper() if method else None)
+        _targets[target.id] = target
+        return target
+
+
+def list_targets() -> List[ProfileTarget]:
+    with _targets_lock:
+        return list(_targets.values())
+
+
+def remove_target(target_id: int) -> bool:
+    with _targets_lock:
+        return _targets.pop(target_id, None) is not None
+
+
+def claim_target(method: str, path: str) -> bool:
+    """
+    Whether a runtime target selects this request; uses up one of its profiles.
+    """
+    with _targets_lock:
+        for target in list(_targets.values()):
+            if target.method and target.method != method:
+                continue
+            if not fnmatch.fnmatchcase(path, target.path_pattern):
+                continue
+            target.remaining -= 1
+            if target.remaining <= 0:
+                del _targets[target.id]
+            return True
+    return False
+
+
+# --- Sampling -------------------------------------------------------------
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(os.getcwd() + os.sep):
+        return os.path.relpath(filename)
+    return os.path.basename(filename)
+
+
+def _label(code: CodeType) -> str:
+    # Collapsed-stack format separates frames with ';' and ends with ' count'
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _frame_codes(frame: Optional[FrameType]) -> List[CodeType]:
+    """
+    Code objects of a thread's stack, outermost first.
+    """
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return codes
+
+
+def _await_chain_codes(coro: Any) -> List[CodeType]:
+    """
+    Code objects of a suspended coroutine and everything it is awaiting, outermost first.
+    """
+    codes = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        codes.append(frame.f_code)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return codes
+
+
+def _is_pool_machinery(code: CodeType) -> bool:
+    filename = code.co_filename
+    return filename.startswith(_STDLIB_DIR) or f"{os.sep}anyio{os.sep}" in filename
+
+
+class RequestProfiler:
+    """
+    Samples one request until `stop()`; create it on the request's event loop.
+    """
+
+    def __init__(self, stats: RequestStats, interval: float):
+        self.stats = stats
+        self.interval = interval
+        self.task = asyncio.current_task()
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # The task's coroutine chain can change under us; drop the sample
+                pass
+
+    def _task_codes(self, frames: Dict[int, FrameType]) -> Optional[List[CodeType]]:
+        if self.task is None or self.task.done():
+            return None
+        root = self.task.get_coro().cr_code
+        if asyncio.current_task(self.loop) is self.task:
+            codes = _frame_codes(frames.get(self.loop_thread_id))
+            # Drop the event loop frames above the task's coroutine
+            for index, code in enumerate(codes):
+                if code is root:
+                    return codes[index:]
+            return None
+        return _await_chain_codes(self.task.get_coro())
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        task_codes = self._task_codes(frames)
+        if task_codes is None:
+            return
+
+        task_stack = [_label(code) for code in task_codes]
+        running = asyncio.current_task(self.loop) is self.task
+        thread_stacks = []
+        for thread_id in list(self.stats.thread_ids):
+            codes = _frame_codes(frames.get(thread_id))
+            while codes and _is_pool_machinery(codes[0]):
+                codes.pop(0)
+            if codes:
+                thread_stacks.append([_label(code) for code in codes])
+
+        if running:
+            self.samples[";".join(task_stack)] += 1
+        elif thread_stacks:
+            # The task is waiting on the thread pool: attribute the time to what the threads run
+            for thread_stack in thread_stacks:
+                self.samples[";".join(task_stack + thread_stack)] += 1
+        else:
+            self.samples[";".join(task_stack + [AWAIT_FRAME])] += 1
+        self.sample_count += 1
+
+
+# --- Storage --------------------------------------------------------------
+
+def _profile_dir() -> Path:
+    return Path(settings.profile_dir)
+
+
+def new_profile_name(method: str, path: str) -> str:
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+    return f"{timestamp}-{method.lower()}-{slug}-{secrets.token_hex(3)}"
+
+
+def save_profile(name: str, profiler: RequestProfiler, metadata: Dict[str, Any]) -> None:
+    """
+    Write a profile and its metadata, then prune the oldest beyond PROFILE_MAX_FILES.
+    """
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f"{name}{PROFILE_SUFFIX}", "w", encoding="utf-8") as f:
+        for stack, count in profiler.samples.most_common():
+            f.write(f"{stack} {count}\n")
+    metadata = {
+        **metadata,
+        "name": name,
+        "samples": profiler.sample_count,
+        "interval_ms": profiler.interval * 1000,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(directory / f"{name}{METADATA_SUFFIX}", "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+    existing = sorted(directory.glob(f"*{METADATA_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    for old in existing[:max(0, len(existing) - settings.profile_max_files)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(PROFILE_SUFFIX).unlink(missing_ok=True)
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Metadata of the most recent profiles, newest first.
+    """
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return []
+    files = sorted(directory.glob(f"*{METADATA_SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    profiles = []
+    for path in files[:limit]:
+        try:
+            profiles.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def get_profile_path(name: str) -> Optional[Path]:
+    """
+    Path of a stored profile, or None if there is no profile with that name.
+    """
+    if not _NAME_PATTERN.match(name):
+        return None
+    path = _profile_dir() / f"{name}{PROFILE_SUFFIX}"
+    return path if path.is_file() else None
+
+
+def interval_seconds() -> float:
+    return max(settings.profile_interval_ms, 1.0) / 1000
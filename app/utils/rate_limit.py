@@ -0,0 +1,147 @@
+"""
+Inbound rate limiting with per-client token buckets.
+
+Every client (keyed by address, see `client_address`) has a general bucket of
+RATE_LIMIT_BURST requests refilled at RATE_LIMIT_PER_MINUTE, checked by the
+admission middleware, and a stricter bucket for the routes that can call the
+AI service (AI_RATE_LIMIT_*), checked by the `ai_rate_limit` dependency.
+Exceeding either answers 429 with Retry-After.
+
+Buckets live in process memory by default, so each worker enforces its own
+limit. RATE_LIMIT_BACKEND=postgres keeps them in the rate_limit_buckets table
+instead, shared by every worker and replica, at one statement per check. If
+the database cannot be reached, requests are allowed.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from app.db.session import engine, settings
+from app.utils import metrics
+from app.utils.client_identity import client_address
+
+logger = logging.getLogger(__name__)
+
+# In-memory buckets kept before full (idle) ones are dropped
+MAX_MEMORY_BUCKETS = 10000
+# Fraction of Postgres checks that also delete long-idle buckets
+POSTGRES_CLEANUP_RATE = 0.01
+
+TAKE_TOKENS = text("""
+    INSERT INTO rate_limit_buckets AS b (key, tokens, updated_at)
+    VALUES (:key, :burst - :cost, now())
+    ON CONFLICT (key) DO UPDATE
+    SET tokens = LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) - :cost,
+        updated_at = now()
+    WHERE LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) >= :cost
+    RETURNING tokens
+""")
+AVAILABLE_TOKENS = text("""
+    SELECT LEAST(:burst, tokens + EXTRACT(EPOCH FROM now() - updated_at) * :rate)
+    FROM rate_limit_buckets WHERE key = :key
+""")
+DELETE_IDLE_BUCKETS = text("DELETE FROM rate_limit_buckets WHERE updated_at < now() - interval '1 hour'")
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    # Seconds until the request would be allowed (0 when allowed)
+    retry_after: float = 0.0
+
+
+class MemoryRateLimiter:
+    def __init__(self):
+        # key -> (tokens, monotonic time of the last update, refill rate, burst)
+        self._buckets: Dict[str, Tuple[float, float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Decision:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(key, (burst, now, rate, burst))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, rate, burst)
+            if len(self._buckets) > MAX_MEMORY_BUCKETS:
+                # Buckets that would be full again (at their own rate and burst) carry no state
+                self._buckets = {
+                    k: (t, u, r, b) for k, (t, u, r, b) in self._buckets.items() if t + (now - u) * r < b
+                }
+        return Decision(allowed, 0.0 if allowed else (cost - tokens) / rate)
+
+
+class PostgresRateLimiter:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def acquire(self, key: str, rate: float, burst: float, cost: float = 1.0) -> Decision:
+        params = {"key": key, "rate": rate, "burst": burst, "cost": cost}
+        with self.engine.begin() as conn:
+            if conn.execute(TAKE_TOKENS, params).first() is not None:
+                decision = Decision(True)
+            else:
+                tokens = float(conn.execute(AVAILABLE_TOKENS, params).scalar() or 0.0)
+                decision = Decision(False, max(0.0, cost - tokens) / rate)
+            if random.random() < POSTGRES_CLEANUP_RATE:
+                conn.execute(DELETE_IDLE_BUCKETS)
+        return decision
+
+
+_memory_limiter = MemoryRateLimiter()
+_postgres_limiter = PostgresRateLimiter(engine)
+
+
+async def check(bucket: str, client: str, per_minute: float, burst: float) -> Decision:
+    """
+    Take one token from the client's bucket (always allowed when `per_minute` is 0).
+    """
+    if per_minute <= 0:
+        return Decision(True)
+    key = f"{bucket}:{client}"
+    rate = per_minute / 60.0
+    burst = max(burst, 1.0)
+
+    if settings.rate_limit_backend == "postgres":
+        try:
+            decision = await run_in_threadpool(_postgres_limiter.acquire, key, rate, burst)
+        except Exception:
+            logger.warning("Rate limit check failed; allowing the request", exc_info=True)
+            return Decision(True)
+    else:
+        decision = _memory_limiter.acquire(key, rate, burst)
+
+    if not decision.allowed:
+        metrics.RATE_LIMITED.inc(bucket=bucket)
+    return decision
+
+
+def retry_after_header(decision: Decision) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(decision.retry_after)))}
+
+
+async def ai_rate_limit(request: Request) -> None:
+    """
+    Dependency applying the AI bucket to routes that can call the AI service.
+    """
+    decision = await check(
+        "ai",
+        client_address(request.scope, settings.trusted_proxy_count),
+        settings.ai_rate_limit_per_minute,
+        settings.ai_rate_limit_burst
+    )
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many lesson plan generation requests",
+            headers=retry_after_header(decision)
+        )
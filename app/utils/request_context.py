@@ -0,0 +1,83 @@
+"""
+Per-request instrumentation state.
+
+The middleware starts a `RequestStats` for every HTTP request; anything that
+runs on behalf of that request (route handlers, dependencies in the thread
+pool, database event listeners) finds it through a context variable.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, Token, copy_context
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+@dataclass
+class RequestStats:
+    method: str = ""
+    path: str = ""
+    # Template of the matched route, e.g. /key-points/{key_point_id}
+    route: str = ""
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    # Named phases (e.g. "ai", "cache", "serialize"): total seconds and occurrences
+    phases: Dict[str, float] = field(default_factory=dict)
+    phase_counts: Dict[str, int] = field(default_factory=dict)
+    # (statement, seconds) of every SQL statement, only collected when not None
+    statements: Optional[List[Tuple[str, float]]] = None
+    # perf_counter value when the route's endpoint function returned
+    endpoint_returned_at: Optional[float] = None
+    # Thread pool threads currently running a sync endpoint for this request
+    thread_ids: Set[int] = field(default_factory=set)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.phase_counts[name] = self.phase_counts.get(name, 0) + 1
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def start(method: str = "", path: str = "") -> Token:
+    """
+    Begin collecting stats for a request; pass the returned token to `finish`.
+    """
+    return _current.set(RequestStats(method=method, path=path))
+
+
+def finish(token: Token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestStats]:
+    """
+    The stats of the request being handled, or None outside a request.
+    """
+    return _current.get()
+
+
+def detached_context() -> Context:
+    """
+    A copy of the current context without the request stats, for background
+    tasks that outlive the request which started them.
+    """
+    context = copy_context()
+    context.run(_current.set, None)
+    return context
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Attribute the time spent in the block to a named phase of the current request.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_phase(name, time.perf_counter() - started)
@@ -0,0 +1,294 @@
+"""
+Record/replay stand-in for the external AI service.
+
+Implements the three endpoints the content service calls:
+- /api/group-kps-into-sessions
+- /api/generate-session-summary
+- /api/generate-detailed-content-for-session
+
+Modes:
+- record: forward every request to the real AI service (--upstream) and save
+  the request, response and latency under --recordings/<endpoint>/<hash>.json
+- replay: answer from the recordings; requests that were never recorded get a
+  deterministic synthetic response (or 404 with --strict)
+- synthetic: always answer with deterministic synthetic responses
+
+In replay and synthetic mode, latency is drawn from a configurable
+distribution per endpoint and a configurable fraction of requests fail.
+
+In-process (tests and benchmarks), no network involved:
+
+    from benchmarks.ai_service_stub import StubConfig, create_app, installed
+    with installed(create_app(StubConfig(mode="synthetic"))):
+        ...  # every AI call of the content service hits the stub
+
+Standalone (load tests; point AI_SERVICE_URL at it):
+
+    python -m benchmarks.ai_service_stub --mode replay --port 8001 \\
+        --latency summary=lognormal:2.0,0.4 --latency detailed=uniform:5,12 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.services import ai_client
+from app.services.session_grouping_engine import group_key_points
+from app.utils.hash_utils import canonical_json
+
+ENDPOINTS = {
+    "group": "/api/group-kps-into-sessions",
+    "summary": "/api/generate-session-summary",
+    "detailed": "/api/generate-detailed-content-for-session",
+}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution spec into a sampler returning seconds.
+
+    Specs: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA", "recorded" (latency captured in record mode)
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == "recorded" and not values:
+        # Resolved per request from the recording; 0 for synthetic responses
+        return lambda rng: 0.0
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+@dataclass
+class StubConfig:
+    mode: str = "synthetic"
+    recordings_dir: Path = Path("benchmarks/recordings")
+    upstream_url: Optional[str] = None
+    # Per endpoint name ("group", "summary", "detailed"); "*" applies to all others
+    latency: Dict[str, str] = field(default_factory=lambda: {"*": "fixed:0"})
+    error_rate: float = 0.0
+    error_status: int = 503
+    strict: bool = False
+    seed: Optional[int] = None
+
+
+def _request_hash(endpoint: str, payload: Any) -> str:
+    return hashlib.sha256(f"{endpoint}|{canonical_json(payload)}".encode("utf-8")).hexdigest()
+
+
+def _recording_path(config: StubConfig, name: str, payload: Any) -> Path:
+    return config.recordings_dir / name / f"{_request_hash(ENDPOINTS[name], payload)}.json"
+
+
+def _synthetic_response(name: str, payload: Dict[str, Any]) -> dict:
+    """
+    Deterministic, well-formed response for a request.
+    """
+    if name == "group":
+        key_points = payload.get("knowledge_points") or []
+        sessions = group_key_points(key_points, int(payload.get("number_of_sessions") or 1))
+        return {
+            "success": True,
+            "data": {
+                "sessions": sessions,
+                "metadata": {
+                    "chapter": payload.get("chapter", ""),
+                    "subject": payload.get("subject", ""),
+                    "class": payload.get("class_name", ""),
+                    "total_sessions": len(sessions),
+                    "total_kps": len(key_points),
+                },
+            },
+        }
+
+    if name == "summary":
+        titles = [kp.get("title", "") for kp in payload.get("knowledge_points") or []]
+        return {
+            "success": True,
+            "data": {
+                "summary": f"{payload.get('session_title', 'This session')} covers {', '.join(titles)}.",
+                "objectives": [f"Understand {title}" for title in titles],
+            },
+        }
+
+    kp_list = payload.get("kp_list") or []
+    return {
+        "success": True,
+        "data": {
+            "content": {
+                "title": payload.get("title", ""),
+                "duration": payload.get("duration", ""),
+                "introduction": payload.get("summary", ""),
+                "objectives": payload.get("objectives", []),
+                "sections": [
+                    {
+                        "heading": kp.get("title", ""),
+                        "explanation": kp.get("description", ""),
+                        "activities": [f"Discuss {kp.get('title', '')}"],
+                    }
+                    for kp in kp_list
+                ],
+                "assessment": [f"Explain {kp.get('title', '')}" for kp in kp_list],
+            }
+        },
+    }
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    """
+    Build the stand-in ASGI app for `config`.
+    """
+    if config.mode not in ("record", "replay", "synthetic"):
+        raise ValueError(f"Unknown mode: {config.mode}")
+    if config.mode == "record" and not config.upstream_url:
+        raise ValueError("Record mode needs an upstream AI service URL")
+
+    app = FastAPI(title="AI Service Stub")
+    rng = random.Random(config.seed)
+    samplers = {name: parse_latency(config.latency.get(name, config.latency.get("*", "fixed:0"))) for name in ENDPOINTS}
+    stats: Dict[str, Dict[str, int]] = {
+        name: {"requests": 0, "recorded": 0, "replayed": 0, "synthetic": 0, "errors": 0} for name in ENDPOINTS
+    }
+
+    async def record(name: str, payload: Dict[str, Any]) -> JSONResponse:
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            upstream = await client.post(f"{config.upstream_url}{ENDPOINTS[name]}", json=payload)
+        latency = time.perf_counter() - started
+
+        path = _recording_path(config, name, payload)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "endpoint": ENDPOINTS[name],
+            "request": payload,
+            "status_code": upstream.status_code,
+            "response": upstream.json(),
+            "latency_seconds": round(latency, 4),
+        }, indent=2))
+        stats[name]["recorded"] += 1
+        return JSONResponse(upstream.json(), status_code=upstream.status_code)
+
+    async def replay(name: str, payload: Dict[str, Any]) -> JSONResponse:
+        path = _recording_path(config, name, payload)
+        recording = json.loads(path.read_text()) if config.mode == "replay" and path.exists() else None
+
+        if recording is None and config.mode == "replay" and config.strict:
+            return JSONResponse({"success": False, "error": "No recording for request"}, status_code=404)
+
+        delay = samplers[name](rng)
+        if recording is not None and config.latency.get(name, config.latency.get("*")) == "recorded":
+            delay = recording.get("latency_seconds", 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if config.error_rate and rng.random() < config.error_rate:
+            stats[name]["errors"] += 1
+            return JSONResponse({"success": False, "error": "Injected failure"}, status_code=config.error_status)
+
+        if recording is not None:
+            stats[name]["replayed"] += 1
+            return JSONResponse(recording["response"], status_code=recording.get("status_code", 200))
+
+        stats[name]["synthetic"] += 1
+        return JSONResponse(_synthetic_response(name, payload))
+
+    def make_handler(name: str):
+        async def handler(request: Request) -> JSONResponse:
+            payload = await request.json()
+            stats[name]["requests"] += 1
+            if config.mode == "record":
+                return await record(name, payload)
+            return await replay(name, payload)
+        return handler
+
+    for name, path in ENDPOINTS.items():
+        app.add_api_route(path, make_handler(name), methods=["POST"], name=name)
+
+    @app.get("/stub/stats")
+    async def get_stats() -> dict:
+        return {"mode": config.mode, "endpoints": stats}
+
+    return app
+
+
+@contextmanager
+def installed(app: FastAPI) -> Iterator[FastAPI]:
+    """
+    Route every AI service call of the content service to `app`, in-process.
+    """
+    ai_client.use_transport(httpx.ASGITransport(app=app))
+    try:
+        yield app
+    finally:
+        ai_client.use_transport(None)
+
+
+def _parse_latency_args(values: List[str]) -> Dict[str, str]:
+    latency = {"*": "fixed:0"}
+    for value in values:
+        name, sep, spec = value.partition("=")
+        if not sep:
+            name, spec = "*", value
+        if name != "*" and name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r} (expected one of {', '.join(ENDPOINTS)})")
+        parse_latency(spec)
+        latency[name] = spec
+    return latency
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Record/replay stand-in for the AI service")
+    parser.add_argument("--mode", choices=["record", "replay", "synthetic"], default="replay")
+    parser.add_argument("--recordings", type=Path, default=Path("benchmarks/recordings"))
+    parser.add_argument("--upstream", help="Real AI service URL (record mode)")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="[group|summary|detailed=]SPEC, e.g. summary=lognormal:2.0,0.4 (repeatable)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--strict", action="store_true", help="404 for unrecorded requests in replay mode")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        mode=args.mode,
+        recordings_dir=args.recordings,
+        upstream_url=args.upstream,
+        latency=_parse_latency_args(args.latency),
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        strict=args.strict,
+        seed=args.seed,
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
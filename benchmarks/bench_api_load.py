@@ -0,0 +1,314 @@
+"""
+End-to-end load test of the HTTP API with the AI service stubbed.
+
+Seeds a dataset scaled up from seed_data/ (synthetic key points and
+questions), warms up a set of lesson plans, then drives a weighted mix of
+taxonomy reads, key point reads/writes, bulk question writes and lesson plan
+cache hits/misses from concurrent clients. Reports p50/p95/p99 latency,
+throughput and database round trips per operation, and compares them with a
+stored baseline: any regression beyond the tolerance exits non-zero.
+
+By default the app and the AI stub run in-process. With --base-url the load
+is sent to a running server instead (start `python -m benchmarks.ai_service_stub`
+and point its AI_SERVICE_URL at the stub); DB round trips are then not reported.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_api_load
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_api_load --requests 5000 --concurrency 32
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_api_load --save-baseline
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks import common
+from benchmarks.common import QueryCountingApp, percentile, seed_scaled_dataset
+
+import httpx
+from app.main import app
+from benchmarks.ai_service_stub import StubConfig, create_app, installed
+
+BASELINE_NAME = "api_load"
+
+# Regressions smaller than this are treated as noise (seconds)
+LATENCY_NOISE_FLOOR = 0.005
+
+
+@dataclass
+class Operation:
+    name: str
+    weight: int
+    # Builds (method, path, json body) from the shared state
+    build: Callable[["LoadState", random.Random], Tuple[str, str, Optional[Any]]]
+    expected_status: Tuple[int, ...] = (200,)
+
+
+@dataclass
+class LoadState:
+    chapters: List[Dict[str, int]]
+    key_point_ids: List[int] = field(default_factory=list)
+    session_map_ids: List[int] = field(default_factory=list)
+    planned_sessions: int = 4
+    run_id: str = ""
+    counter: Any = field(default_factory=itertools.count)
+
+
+@dataclass
+class OperationResult:
+    latencies: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    errors: int = 0
+
+
+def _group_request(chapter: Dict[str, int], planned_sessions: int) -> Dict[str, Any]:
+    return {**chapter, "planned_sessions": planned_sessions, "grouping_mode": "ai"}
+
+
+def _new_key_point(state: LoadState, rng: random.Random):
+    chapter = rng.choice(state.chapters)
+    kp = common.make_key_point(rng, chapter["chapter_id"], next(state.counter), prefix=f"LOAD{state.run_id}")
+    body = {
+        **kp,
+        "difficulty_level": kp["difficulty_level"].value,
+        "cognitive_level": kp["cognitive_level"].value,
+        "skill_intent": kp["skill_intent"].value,
+        "content": common.make_content(rng, 0),
+    }
+    return "POST", "/key-points/", [body]
+
+
+def _bulk_questions(state: LoadState, rng: random.Random):
+    chapter_id = rng.choice(state.chapters)["chapter_id"]
+    questions = [common.make_question(rng, chapter_id, index) for index in range(20)]
+    return "POST", "/questions/bulk", {"chapter_id": chapter_id, "questions": questions}
+
+
+def _group_miss(state: LoadState, rng: random.Random):
+    # A planned session count not used before gives a new input hash
+    planned_sessions = state.planned_sessions + 1 + next(state.counter) % 1000
+    return "POST", "/lesson-plans/group-kps-into-sessions", _group_request(rng.choice(state.chapters), planned_sessions)
+
+
+OPERATIONS = [
+    Operation("GET /boards", 4, lambda s, r: ("GET", "/boards", None)),
+    Operation("GET /classes/{board_id}", 4, lambda s, r: ("GET", f"/classes/{r.choice(s.chapters)['board_id']}", None)),
+    Operation("GET /subjects/classes/{class_id}", 4,
+              lambda s, r: ("GET", f"/subjects/classes/{r.choice(s.chapters)['class_id']}", None)),
+    Operation("GET /chapters/subjects/{subject_id}", 4,
+              lambda s, r: ("GET", f"/chapters/subjects/{r.choice(s.chapters)['subject_id']}", None)),
+    Operation("GET /key-points/chapter/{chapter_id}", 20,
+              lambda s, r: ("GET", f"/key-points/chapter/{r.choice(s.chapters)['chapter_id']}", None)),
+    Operation("GET /key-points/{id}", 10, lambda s, r: ("GET", f"/key-points/{r.choice(s.key_point_ids)}", None)),
+    Operation("POST /key-points/", 2, _new_key_point, (201,)),
+    Operation("PUT /key-points/{id}", 2,
+              lambda s, r: ("PUT", f"/key-points/{r.choice(s.key_point_ids)}", {"title": f"Edited {next(s.counter)}"})),
+    Operation("GET /questions/chapters/{chapter_id}", 6,
+              lambda s, r: ("GET", f"/questions/chapters/{r.choice(s.chapters)['chapter_id']}", None)),
+    Operation("POST /questions/bulk", 2, _bulk_questions, (201,)),
+    Operation("POST /lesson-plans/group-kps-into-sessions (hit)", 12,
+              lambda s, r: ("POST", "/lesson-plans/group-kps-into-sessions",
+                            _group_request(r.choice(s.chapters), s.planned_sessions))),
+    Operation("POST /lesson-plans/group-kps-into-sessions (miss)", 2, _group_miss),
+    Operation("POST /lesson-plans/generate-session-summary", 3,
+              lambda s, r: ("POST", "/lesson-plans/generate-session-summary",
+                            {"session_map_id": r.choice(s.session_map_ids)})),
+    Operation("POST /lesson-plans/get-session-detailed-content", 3,
+              lambda s, r: ("POST", "/lesson-plans/get-session-detailed-content",
+                            {"session_id": r.choice(s.session_map_ids)})),
+]
+
+
+async def warm_up(client: httpx.AsyncClient, state: LoadState) -> None:
+    """
+    Create the lesson plans (with summaries) that the "hit" operations read, and collect key point ids.
+    """
+    for chapter in state.chapters:
+        response = await client.get(f"/key-points/chapter/{chapter['chapter_id']}")
+        response.raise_for_status()
+        state.key_point_ids.extend(kp["id"] for kp in response.json())
+
+        response = await client.post(
+            "/lesson-plans/group-kps-into-sessions", json=_group_request(chapter, state.planned_sessions)
+        )
+        response.raise_for_status()
+        for session in response.json()["sessions"]:
+            state.session_map_ids.append(session["session_map_id"])
+            if session.get("summary") is None:
+                summary = await client.post(
+                    "/lesson-plans/generate-session-summary", json={"session_map_id": session["session_map_id"]}
+                )
+                summary.raise_for_status()
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    state: LoadState,
+    total_requests: int,
+    concurrency: int,
+    seed: int
+) -> Tuple[Dict[str, OperationResult], float]:
+    results = {op.name: OperationResult() for op in OPERATIONS}
+    rng = random.Random(seed)
+    schedule = rng.choices(OPERATIONS, weights=[op.weight for op in OPERATIONS], k=total_requests)
+    queue: asyncio.Queue = asyncio.Queue()
+    for op in schedule:
+        queue.put_nowait(op)
+
+    async def worker(worker_id: int) -> None:
+        worker_rng = random.Random(seed * 1000 + worker_id)
+        while not queue.empty():
+            op = queue.get_nowait()
+            method, path, body = op.build(state, worker_rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code in op.expected_status
+                queries = response.headers.get("x-bench-db-queries")
+            except httpx.HTTPError:
+                ok, queries = False, None
+            result = results[op.name]
+            result.latencies.append(time.perf_counter() - started)
+            if not ok:
+                result.errors += 1
+            if queries is not None:
+                result.queries.append(int(queries))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def summarize(results: Dict[str, OperationResult], elapsed: float) -> Dict[str, Any]:
+    operations = {}
+    for name, result in results.items():
+        if not result.latencies:
+            continue
+        operations[name] = {
+            "requests": len(result.latencies),
+            "errors": result.errors,
+            "p50": round(percentile(result.latencies, 50), 5),
+            "p95": round(percentile(result.latencies, 95), 5),
+            "p99": round(percentile(result.latencies, 99), 5),
+            "throughput": round(len(result.latencies) / elapsed, 2),
+            "db_queries": round(sum(result.queries) / len(result.queries), 2) if result.queries else None,
+        }
+    total = sum(op["requests"] for op in operations.values())
+    return {
+        "total_requests": total,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(total / elapsed, 2) if elapsed else 0.0,
+        "operations": operations,
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    print(f"\n{'operation':<55}{'reqs':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}{'queries':>9}")
+    for name, op in summary["operations"].items():
+        queries = f"{op['db_queries']:.1f}" if op["db_queries"] is not None else "-"
+        print(
+            f"{name:<55}{op['requests']:>6}{op['errors']:>5}{op['p50'] * 1000:>9.1f}"
+            f"{op['p95'] * 1000:>9.1f}{op['p99'] * 1000:>9.1f}{op['throughput']:>8.1f}{queries:>9}"
+        )
+    print(f"\nTotal: {summary['total_requests']} requests in {summary['elapsed']:.1f}s "
+          f"({summary['throughput']:.1f} req/s)")
+
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Return a description of every regression against the baseline.
+    """
+    regressions = []
+    if summary["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput {summary['throughput']:.1f} < baseline {baseline['throughput']:.1f} req/s")
+
+    for name, base in baseline["operations"].items():
+        current = summary["operations"].get(name)
+        if current is None:
+            continue
+        if current["p95"] > base["p95"] * (1 + tolerance) and current["p95"] - base["p95"] > LATENCY_NOISE_FLOOR:
+            regressions.append(f"{name}: p95 {current['p95'] * 1000:.1f} ms > baseline {base['p95'] * 1000:.1f} ms")
+        if current["db_queries"] is not None and base.get("db_queries") is not None \
+                and current["db_queries"] > base["db_queries"] + 0.5:
+            regressions.append(f"{name}: {current['db_queries']:.1f} DB queries > baseline {base['db_queries']:.1f}")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors > baseline {base['errors']}")
+    return regressions
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    print(f"🌱 Seeding {args.chapters} chapters x {args.kps_per_chapter} key points, "
+          f"{args.questions_per_chapter} questions each...")
+    chapters = seed_scaled_dataset(args.chapters, args.kps_per_chapter, args.questions_per_chapter, seed=args.seed)
+    state = LoadState(chapters=chapters, run_id=str(int(time.time())))
+
+    stub = create_app(StubConfig(mode="synthetic", latency={"*": args.ai_latency}, seed=args.seed))
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=300.0)
+    else:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=QueryCountingApp(app)), base_url="http://bench", timeout=300.0
+        )
+
+    async with client:
+        with installed(stub):
+            print("🔥 Warming up lesson plans...")
+            await warm_up(client, state)
+            print(f"🚀 Running {args.requests} requests with concurrency {args.concurrency}...")
+            results, elapsed = await run_load(client, state, args.requests, args.concurrency, args.seed)
+
+    summary = summarize(results, elapsed)
+    summary["config"] = {
+        key: getattr(args, key)
+        for key in ("chapters", "kps_per_chapter", "questions_per_chapter", "requests", "concurrency", "ai_latency")
+    }
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end API load test")
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--kps-per-chapter", type=int, default=40)
+    parser.add_argument("--questions-per-chapter", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ai-latency", default="fixed:0", help="AI stub latency spec, e.g. lognormal:0.5,0.3")
+    parser.add_argument("--base-url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, help="Baseline file (default: benchmarks/baselines/api_load.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(main_async(args))
+    print_summary(summary)
+
+    if args.save_baseline:
+        path = common.save_baseline(BASELINE_NAME, summary, args.baseline)
+        print(f"\n💾 Baseline saved to {path}")
+        return 0
+
+    baseline = common.load_baseline(BASELINE_NAME, args.baseline)
+    if baseline is None:
+        print("\nNo baseline stored yet (run with --save-baseline)")
+        return 0
+    if baseline.get("config") != summary["config"]:
+        print(f"\n⚠️  Baseline was recorded with a different configuration: {baseline.get('config')}")
+
+    regressions = compare(summary, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against the baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print("\n✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Microbenchmarks of service-layer hot functions against a local Postgres.
+
+Each benchmark reports wall time (median / p95 / min over --repeat runs),
+database round trips per call and peak Python allocation per call (measured
+in a separate tracemalloc run, so it does not skew the timings).
+
+Benchmarks:
+- get_key_points_by_chapter at 10 / 100 / 1,000 key points x 1 / 5 / 20 content versions
+- group_kps_into_sessions cache hit
+- create_key_point at several batch sizes
+- create_questions_bulk at several batch sizes
+- KeyPointResponse serialization of 100 / 1,000 key points
+
+Data lives under a dedicated "Benchmark Board" in BENCHMARK_DATABASE_URL.
+
+Usage:
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_service_functions
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_service_functions --only get_key_points --repeat 50
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.bench_service_functions --save-baseline
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import common
+from benchmarks.common import count_queries, percentile, prepare_schema, seed_chapter
+
+from fastapi.encoders import jsonable_encoder
+from app.db.session import SessionLocal
+from app.models import Board, Chapter, Class, KeyPoint, Question, Subject
+from app.schemas.key_point import KeyPointCreate, KeyPointResponse
+from app.schemas.lesson_plan_input import LessonPlanRequest
+from app.schemas.question import QuestionBulkCreate, QuestionCreate
+from app.services import key_point_service, lesson_plan_service, question_service
+from app.utils.db_utils import get_or_create
+from benchmarks.ai_service_stub import StubConfig, create_app, installed
+
+BASELINE_NAME = "service_functions"
+
+KP_COUNTS = (10, 100, 1000)
+CONTENT_VERSIONS = (1, 5, 20)
+CREATE_BATCH_SIZES = (1, 10, 100, 500)
+QUESTION_BATCH_SIZES = (1, 10, 100, 1000)
+SERIALIZE_COUNTS = (100, 1000)
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # Runs one measured call; receives the benchmark context
+    run: Callable[[Dict[str, Any]], Any]
+    setup: Optional[Callable[[], Dict[str, Any]]] = None
+    teardown: Optional[Callable[[Dict[str, Any]], None]] = None
+
+
+_codes = itertools.count()
+
+
+def benchmark_chapter(title: str, chapter_number: int) -> Dict[str, int]:
+    """
+    Get or create a chapter under the dedicated benchmark board.
+    """
+    db = SessionLocal()
+    try:
+        board = get_or_create(db, Board, {"name": "Benchmark Board"}, {"description": "Microbenchmark data"})
+        class_obj = get_or_create(db, Class, {"name": "Benchmark Class", "board_id": board.id})
+        subject = get_or_create(db, Subject, {"name": "Benchmark Subject", "class_id": class_obj.id})
+        chapter = get_or_create(
+            db, Chapter, {"title": title, "subject_id": subject.id}, {"chapter_number": chapter_number}
+        )
+        return {"board_id": board.id, "class_id": class_obj.id, "subject_id": subject.id, "chapter_id": chapter.id}
+    finally:
+        db.close()
+
+
+def seeded_chapter(key_points: int, content_versions: int) -> Dict[str, int]:
+    ids = benchmark_chapter(f"Micro {key_points} KPs x {content_versions} versions", key_points * 100 + content_versions)
+    db = SessionLocal()
+    try:
+        seed_chapter(db, ids["chapter_id"], key_points, content_versions, prefix="MICRO")
+    finally:
+        db.close()
+    return ids
+
+
+def _delete_created(ctx: Dict[str, Any], model) -> None:
+    db = SessionLocal()
+    try:
+        if ctx["created"]:
+            db.query(model).filter(model.id.in_(ctx["created"])).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.close()
+
+
+# --- Benchmarks -----------------------------------------------------------
+
+def get_key_points_benchmark(key_points: int, content_versions: int) -> Benchmark:
+    def setup():
+        return seeded_chapter(key_points, content_versions)
+
+    def run(ctx):
+        db = SessionLocal()
+        try:
+            return key_point_service.get_key_points_by_chapter(db, ctx["chapter_id"])
+        finally:
+            db.close()
+
+    return Benchmark(f"get_key_points_by_chapter[{key_points} kps x {content_versions} versions]", run, setup)
+
+
+def group_cache_hit_benchmark() -> Benchmark:
+    def setup():
+        ids = seeded_chapter(100, 1)
+        ctx = {
+            "loop": asyncio.new_event_loop(),
+            "stub": installed(create_app(StubConfig(mode="synthetic"))),
+            "request": LessonPlanRequest(**ids, planned_sessions=6),
+        }
+        ctx["stub"].__enter__()
+        # The first call groups and stores; every measured call is a cache hit
+        run(ctx)
+        return ctx
+
+    def run(ctx):
+        db = SessionLocal()
+        try:
+            from_cache, sessions, _, _ = ctx["loop"].run_until_complete(
+                lesson_plan_service.group_kps_into_sessions(db, ctx["request"])
+            )
+            return sessions
+        finally:
+            db.close()
+
+    def teardown(ctx):
+        ctx["stub"].__exit__(None, None, None)
+        ctx["loop"].close()
+
+    return Benchmark("group_kps_into_sessions[cache hit, 100 kps]", run, setup, teardown)
+
+
+def create_key_point_benchmark(batch_size: int) -> Benchmark:
+    def setup():
+        return {**benchmark_chapter("Micro writes", 1), "created": [], "rng": random.Random(7)}
+
+    def run(ctx):
+        batch = []
+        for _ in range(batch_size):
+            attributes = common.make_key_point(ctx["rng"], ctx["chapter_id"], next(_codes), prefix=f"MICROW{time.time_ns()}")
+            batch.append(KeyPointCreate(**attributes, content=common.make_content(ctx["rng"], 0)))
+        db = SessionLocal()
+        try:
+            created = key_point_service.create_key_point(db, batch)
+            ctx["created"].extend(kp.id for kp in created)
+        finally:
+            db.close()
+
+    return Benchmark(
+        f"create_key_point[batch {batch_size}]", run, setup, lambda ctx: _delete_created(ctx, KeyPoint)
+    )
+
+
+def create_questions_bulk_benchmark(batch_size: int) -> Benchmark:
+    def setup():
+        return {**benchmark_chapter("Micro writes", 1), "created": [], "rng": random.Random(11)}
+
+    def run(ctx):
+        bulk = QuestionBulkCreate(
+            chapter_id=ctx["chapter_id"],
+            questions=[
+                QuestionCreate(**common.make_question(ctx["rng"], ctx["chapter_id"], index))
+                for index in range(batch_size)
+            ]
+        )
+        db = SessionLocal()
+        try:
+            created = question_service.create_questions_bulk(db, bulk)
+            ctx["created"].extend(q.id for q in created)
+        finally:
+            db.close()
+
+    return Benchmark(
+        f"create_questions_bulk[batch {batch_size}]", run, setup, lambda ctx: _delete_created(ctx, Question)
+    )
+
+
+def serialize_benchmark(key_points: int) -> Benchmark:
+    def setup():
+        ids = seeded_chapter(key_points, 1)
+        db = SessionLocal()
+        key_point_list = key_point_service.get_key_points_by_chapter(db, ids["chapter_id"])
+        return {"db": db, "key_points": key_point_list}
+
+    def run(ctx):
+        # What FastAPI does for response_model=List[KeyPointResponse]
+        return jsonable_encoder([KeyPointResponse.model_validate(kp) for kp in ctx["key_points"]])
+
+    return Benchmark(f"KeyPointResponse serialization[{key_points} kps]", run, setup, lambda ctx: ctx["db"].close())
+
+
+def all_benchmarks() -> List[Benchmark]:
+    benchmarks = [
+        get_key_points_benchmark(key_points, versions)
+        for key_points in KP_COUNTS
+        for versions in CONTENT_VERSIONS
+    ]
+    benchmarks.append(group_cache_hit_benchmark())
+    benchmarks.extend(create_key_point_benchmark(size) for size in CREATE_BATCH_SIZES)
+    benchmarks.extend(create_questions_bulk_benchmark(size) for size in QUESTION_BATCH_SIZES)
+    benchmarks.extend(serialize_benchmark(count) for count in SERIALIZE_COUNTS)
+    return benchmarks
+
+
+# --- Runner ---------------------------------------------------------------
+
+def measure(benchmark: Benchmark, repeat: int, warmup: int) -> Dict[str, Any]:
+    ctx = benchmark.setup() if benchmark.setup else {}
+    try:
+        for _ in range(warmup):
+            benchmark.run(ctx)
+
+        timings = []
+        queries = []
+        for _ in range(repeat):
+            with count_queries() as stats:
+                started = time.perf_counter()
+                benchmark.run(ctx)
+                timings.append(time.perf_counter() - started)
+            queries.append(stats.count)
+
+        tracemalloc.start()
+        benchmark.run(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if benchmark.teardown:
+            benchmark.teardown(ctx)
+
+    return {
+        "median": statistics.median(timings),
+        "p95": percentile(timings, 95),
+        "min": min(timings),
+        "queries": max(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"\n{'benchmark':<58}{'median ms':>11}{'p95 ms':>9}{'min ms':>9}{'queries':>9}{'peak KiB':>10}{'vs base':>9}")
+    for name, result in results.items():
+        delta = ""
+        base = (baseline or {}).get(name)
+        if base and base["median"]:
+            delta = f"{(result['median'] / base['median'] - 1) * 100:+.0f}%"
+        print(
+            f"{name:<58}{result['median'] * 1000:>11.2f}{result['p95'] * 1000:>9.2f}{result['min'] * 1000:>9.2f}"
+            f"{result['queries']:>9}{result['peak_kib']:>10.1f}{delta:>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Service-layer microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--baseline", type=Path, help="Baseline file (default: benchmarks/baselines/service_functions.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    prepare_schema()
+    benchmarks = [b for b in all_benchmarks() if not args.only or args.only in b.name]
+
+    results = {}
+    for benchmark in benchmarks:
+        print(f"⏱  {benchmark.name}", flush=True)
+        results[benchmark.name] = measure(benchmark, args.repeat, args.warmup)
+
+    baseline = common.load_baseline(BASELINE_NAME, args.baseline)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        path = common.save_baseline(BASELINE_NAME, {**(baseline or {}), **results}, args.baseline)
+        print(f"\n💾 Baseline saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark the local session-grouping engine on synthetic chapters.
+
+Runs entirely in-process (no database or AI service needed).
+
+Usage:
+    python -m benchmarks.bench_session_grouping
+    python -m benchmarks.bench_session_grouping --sizes 10 100 1000 --repeat 20
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.key_point import CognitiveLevel, DifficultyLevel, SkillIntent
+from app.services.session_grouping_engine import group_key_points
+
+
+def make_chapter(size: int, seed: int = 42) -> list:
+    """Build `size` synthetic key points spread over sections of ~8 KPs, with some prerequisites."""
+    rng = random.Random(seed)
+    key_points = []
+    for kp_id in range(1, size + 1):
+        prerequisites = []
+        if kp_id > 1 and rng.random() < 0.2:
+            prerequisites = [rng.randint(max(1, kp_id - 10), kp_id - 1)]
+        key_points.append({
+            "kp_id": kp_id,
+            "title": f"Key point {kp_id}",
+            "difficulty": rng.choice(list(DifficultyLevel)).value,
+            "cognitive_level": rng.choice(list(CognitiveLevel)).value,
+            "skill_intent": rng.choice(list(SkillIntent)).value,
+            "section": f"Section {(kp_id - 1) // 8 + 1}",
+            "prerequisites": prerequisites,
+        })
+    return key_points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'KPs':>6} {'sessions':>9} {'median ms':>10} {'p95 ms':>8} {'max ms':>8}")
+    for size in args.sizes:
+        key_points = make_chapter(size)
+        sessions = max(1, min(40, size // 6))
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = group_key_points(key_points, sessions)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        assert sum(len(s["kp_ids"]) for s in result) == size
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{size:>6} {sessions:>9} {statistics.median(timings):>10.3f} {p95:>8.3f} {timings[-1]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
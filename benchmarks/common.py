@@ -0,0 +1,250 @@
+"""
+Shared helpers for the database-backed benchmarks.
+
+Import this module before anything from `app`: it points the application at
+the benchmark database given by BENCHMARK_DATABASE_URL. Benchmarks write (and
+seed) data, so they refuse to run against the regular DATABASE_URL.
+"""
+import io
+import json
+import math
+import os
+import random
+import sys
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+
+def configure_database() -> str:
+    """
+    Point DATABASE_URL at the benchmark database and turn off rate limiting and
+    load shedding; must run before `app` is imported.
+    """
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    if not url:
+        sys.exit("BENCHMARK_DATABASE_URL is not set (benchmarks seed and write data; use a throwaway database)")
+    if "app.db.session" in sys.modules:
+        sys.exit("benchmarks.common must be imported before the app")
+    os.environ["DATABASE_URL"] = url
+    # The load comes from one client and is meant to saturate the service
+    for name in ("RATE_LIMIT_PER_MINUTE", "AI_RATE_LIMIT_PER_MINUTE", "SHED_POOL_WAIT_MS", "SHED_LOOP_LAG_MS"):
+        os.environ.setdefault(name, "0")
+    return url
+
+
+configure_database()
+
+from sqlalchemy import func
+from app.db.query_counter import count_queries
+from app.db.session import SessionLocal
+from app.models import Board, Chapter, Class, KeyPoint, KeyPointContent, Question, Subject
+from app.models.key_point import CognitiveLevel, DifficultyLevel, SkillIntent
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+# --- Query counting -------------------------------------------------------
+
+class QueryCountingApp:
+    """
+    ASGI wrapper that reports each request's database round trips in an X-Bench-DB-Queries header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as stats:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-bench-db-queries", str(stats.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
+
+
+# --- Statistics -----------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile (0 for no values).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def load_baseline(name: str, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    path = path or BASELINE_DIR / f"{name}.json"
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def save_baseline(name: str, results: Dict[str, Any], path: Optional[Path] = None) -> Path:
+    path = path or BASELINE_DIR / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+# --- Dataset --------------------------------------------------------------
+
+def prepare_schema() -> None:
+    """
+    Bring the benchmark database to the latest migration.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(project_root / "alembic.ini")), "head")
+
+
+def seed_taxonomy() -> None:
+    """
+    Seed states, boards, classes, subjects and chapters from seed_data/ (idempotent).
+    """
+    import seed_data
+
+    db = SessionLocal()
+    try:
+        with redirect_stdout(io.StringIO()):
+            seed_data.seed_states(db)
+            seed_data.seed_boards(db)
+            seed_data.seed_classes(db)
+            seed_data.seed_subjects(db)
+            seed_data.seed_chapters(db)
+    finally:
+        db.close()
+
+
+def make_key_point(rng: random.Random, chapter_id: int, index: int, prefix: str = "BENCH") -> Dict[str, Any]:
+    """
+    Attributes of one synthetic key point (sections of ~8 key points).
+    """
+    return {
+        "code": f"{prefix}-{chapter_id}-{index}",
+        "title": f"Key point {index} of chapter {chapter_id}",
+        "section": f"Section {index // 8 + 1}",
+        "chapter_id": chapter_id,
+        "difficulty_level": rng.choice(list(DifficultyLevel)),
+        "cognitive_level": rng.choice(list(CognitiveLevel)),
+        "skill_intent": rng.choice(list(SkillIntent)),
+    }
+
+
+def make_content(rng: random.Random, index: int, version: int = 0) -> Dict[str, Any]:
+    """
+    A synthetic key point content payload of realistic size (~2 KB).
+    """
+    words = ["ratio", "angle", "force", "cell", "energy", "number", "graph", "volume", "motion", "pattern"]
+    return {
+        "description": " ".join(rng.choice(words) for _ in range(60)),
+        "examples": [" ".join(rng.choice(words) for _ in range(25)) for _ in range(3)],
+        "misconceptions": [" ".join(rng.choice(words) for _ in range(15)) for _ in range(2)],
+        "version": version,
+        "index": index,
+    }
+
+
+def make_question(rng: random.Random, chapter_id: int, index: int) -> Dict[str, Any]:
+    return {
+        "chapter_id": chapter_id,
+        "question_text": f"Synthetic question {index} for chapter {chapter_id}?",
+        "question_type": rng.choice(["MCQ", "Short Answer", "Long Answer"]),
+        "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+        "marks": rng.choice([1, 2, 5]),
+        "metadata_json": {"options": ["A", "B", "C", "D"], "answer": rng.choice("ABCD")},
+    }
+
+
+def seed_chapter(
+    db,
+    chapter_id: int,
+    key_points: int,
+    content_versions: int = 1,
+    questions: int = 0,
+    seed: int = 42,
+    prefix: str = "BENCH"
+) -> None:
+    """
+    Give a chapter exactly the requested synthetic key points (each with
+    `content_versions` active content rows) and at least `questions` questions.
+    """
+    rng = random.Random(seed * 100003 + chapter_id)
+
+    seeded = db.query(KeyPoint).filter(KeyPoint.chapter_id == chapter_id, KeyPoint.code.like(f"{prefix}-%"))
+    existing = seeded.count()
+    existing_contents = db.query(func.count(KeyPointContent.id)).filter(
+        KeyPointContent.key_point_id.in_(seeded.with_entities(KeyPoint.id))
+    ).scalar()
+    if existing != key_points or existing_contents != key_points * content_versions:
+        db.query(KeyPoint).filter(
+            KeyPoint.chapter_id == chapter_id, KeyPoint.code.like(f"{prefix}-%")
+        ).delete(synchronize_session=False)
+        for index in range(key_points):
+            kp = KeyPoint(**make_key_point(rng, chapter_id, index, prefix))
+            for version in range(content_versions):
+                kp.key_point_contents.append(KeyPointContent(
+                    content=make_content(rng, index, version),
+                    model_version="bench",
+                    prompt_version=str(version),
+                    is_active=True
+                ))
+            db.add(kp)
+
+    question_count = db.query(func.count(Question.id)).filter(Question.chapter_id == chapter_id).scalar()
+    db.add_all(Question(**make_question(rng, chapter_id, index)) for index in range(question_count, questions))
+    db.commit()
+
+
+def seed_scaled_dataset(
+    chapters: int,
+    key_points_per_chapter: int,
+    questions_per_chapter: int,
+    content_versions: int = 1,
+    seed: int = 42
+) -> List[Dict[str, int]]:
+    """
+    Seed the taxonomy and give the first `chapters` chapters synthetic key points and questions.
+
+    Returns:
+        The seeded chapters as dicts with board_id, class_id, subject_id and chapter_id
+    """
+    prepare_schema()
+    seed_taxonomy()
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Board.id, Class.id, Subject.id, Chapter.id)
+            .join(Class, Class.board_id == Board.id)
+            .join(Subject, Subject.class_id == Class.id)
+            .join(Chapter, Chapter.subject_id == Subject.id)
+            .order_by(Chapter.id)
+            .limit(chapters)
+            .all()
+        )
+        if len(rows) < chapters:
+            raise ValueError(f"seed_data/ only has {len(rows)} chapters, {chapters} requested")
+
+        for _, _, _, chapter_id in rows:
+            seed_chapter(db, chapter_id, key_points_per_chapter, content_versions, questions_per_chapter, seed)
+
+        return [
+            {"board_id": board_id, "class_id": class_id, "subject_id": subject_id, "chapter_id": chapter_id}
+            for board_id, class_id, subject_id, chapter_id in rows
+        ]
+    finally:
+        db.close()
@@ -0,0 +1,430 @@
+"""
+Offline pre-generation of lesson plans for a whole board (and optionally one class).
+
+For every active chapter that has key points, runs the full lesson plan
+pipeline: session grouping, then the summary and detailed content of every
+session, so teachers never wait for generation at the start of a term.
+Chapters are processed concurrently (bounded by --concurrency); the sessions
+of one chapter are generated in order.
+
+Progress is checkpointed to a JSON file after every chapter, so an
+interrupted run continues where it stopped (failed chapters are retried).
+
+Usage:
+    python pregenerate_lesson_plans.py --board-id 1 --class-id 3 --planned-sessions 6
+    python pregenerate_lesson_plans.py --board-id 1 --planned-sessions 6 8 --dry-run
+    python pregenerate_lesson_plans.py --board-id 1 --planned-sessions 6 --concurrency 8 --restart
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import func
+from app.db.session import SessionLocal, settings
+from app.models import Board, Class, Subject, Chapter, KeyPoint, LessonPlanInput
+from app.schemas.lesson_plan_input import LessonPlanRequest
+from app.services import ai_cache_service, key_point_service, lesson_plan_service
+from app.utils import background_tasks
+from app.utils.hash_utils import generate_input_hash
+
+STAGES = ("grouping", "summary", "detailed")
+
+# Rough prompt size per key point, per stage, for dry-run estimates (characters)
+PROMPT_OVERHEAD_CHARS = 1500
+
+
+class Checkpoint:
+    """JSON checkpoint of finished (chapter, planned sessions) units."""
+
+    def __init__(self, path: Path, scope: Dict[str, Any], restart: bool = False):
+        self.path = path
+        self.data = {"scope": scope, "completed": {}, "failed": {}}
+        if path.exists() and not restart:
+            existing = json.loads(path.read_text())
+            if existing.get("scope") != scope:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to a different run ({existing.get('scope')}); "
+                    f"use --restart or another --checkpoint"
+                )
+            self.data = existing
+
+    def is_completed(self, unit_key: str) -> bool:
+        return unit_key in self.data["completed"]
+
+    def mark(self, unit_key: str, result: Dict[str, Any]) -> None:
+        bucket, other = ("failed", "completed") if result.get("error") else ("completed", "failed")
+        self.data[bucket][unit_key] = result
+        self.data[other].pop(unit_key, None)
+        # Write atomically so an interrupted run never leaves a truncated file
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self.data, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.path)
+
+
+class Report:
+    """Per-stage latency, cache and error counters for the final report."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.cached: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.errors: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.error_samples: List[str] = []
+
+    def record(self, stage: str, started: float, from_cache: bool = False) -> None:
+        self.latencies[stage].append(time.perf_counter() - started)
+        if from_cache:
+            self.cached[stage] += 1
+
+    def record_error(self, stage: str, unit_key: str, error: Exception) -> None:
+        self.errors[stage] += 1
+        if len(self.error_samples) < 10:
+            self.error_samples.append(f"{unit_key} [{stage}]: {error}")
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def list_chapters(db, board_id: int, class_id: Optional[int], subject_id: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    List the active chapters of a board (optionally one class / subject) that have key points.
+    """
+    query = (
+        db.query(
+            Class.id.label("class_id"),
+            Class.name.label("class_name"),
+            Subject.id.label("subject_id"),
+            Subject.name.label("subject_name"),
+            Chapter.id.label("chapter_id"),
+            Chapter.title.label("chapter_title"),
+            func.count(KeyPoint.id).label("kp_count")
+        )
+        .join(Subject, Subject.class_id == Class.id)
+        .join(Chapter, Chapter.subject_id == Subject.id)
+        .join(KeyPoint, KeyPoint.chapter_id == Chapter.id)
+        .filter(
+            Class.board_id == board_id,
+            Class.is_active == True,
+            Subject.is_active == True,
+            Chapter.is_active == True
+        )
+        .group_by(Class.id, Class.name, Subject.id, Subject.name, Chapter.id, Chapter.title)
+        .order_by(Class.display_order, Class.id, Subject.id, Chapter.chapter_number, Chapter.id)
+    )
+    if class_id is not None:
+        query = query.filter(Class.id == class_id)
+    if subject_id is not None:
+        query = query.filter(Subject.id == subject_id)
+    return [dict(row._mapping) for row in query.all()]
+
+
+def _kp_description(kp: KeyPoint) -> str:
+    content = getattr(kp, "content", None)
+    return content.get("description", "") if content else ""
+
+
+def _unit_key(chapter: Dict[str, Any], planned_sessions: int) -> str:
+    return f"{chapter['chapter_id']}:{planned_sessions}"
+
+
+def _build_request(board_id: int, chapter: Dict[str, Any], planned_sessions: int, grouping_mode: str) -> LessonPlanRequest:
+    return LessonPlanRequest(
+        board_id=board_id,
+        class_id=chapter["class_id"],
+        subject_id=chapter["subject_id"],
+        chapter_id=chapter["chapter_id"],
+        planned_sessions=planned_sessions,
+        grouping_mode=grouping_mode
+    )
+
+
+async def _group(db, request: LessonPlanRequest, report: Report) -> List[dict]:
+    """
+    Group a chapter, waiting for the refresh of a stale cached grouping instead of serving it.
+    """
+    started = time.perf_counter()
+    from_cache, sessions, _, is_stale = await lesson_plan_service.group_kps_into_sessions(db, request)
+    if is_stale and sessions:
+        session_map = lesson_plan_service.get_session_map_by_id(db, sessions[0]["session_map_id"])
+        refresh = background_tasks.get(f"lesson-input-refresh:{session_map.input_id}")
+        if refresh is not None:
+            await refresh
+        db.expire_all()
+        from_cache, sessions, _, _ = await lesson_plan_service.group_kps_into_sessions(db, request)
+    report.record("grouping", started, from_cache=from_cache)
+    return sessions
+
+
+async def process_unit(
+    request: LessonPlanRequest,
+    unit_key: str,
+    include_detailed: bool,
+    report: Report
+) -> Dict[str, Any]:
+    """
+    Run the full pipeline for one chapter and planned session count.
+    """
+    result: Dict[str, Any] = {"sessions": 0, "summaries_generated": 0, "detailed_generated": 0}
+    stage = "grouping"
+    db = SessionLocal()
+    try:
+        sessions = await _group(db, request, report)
+        result["sessions"] = len(sessions)
+
+        for session in sessions:
+            session_map_id = session["session_map_id"]
+
+            stage = "summary"
+            started = time.perf_counter()
+            if session.get("summary") is None:
+                await lesson_plan_service.generate_session_summary(db, session_map_id)
+                result["summaries_generated"] += 1
+                report.record(stage, started)
+            else:
+                report.record(stage, started, from_cache=True)
+
+            if include_detailed:
+                stage = "detailed"
+                started = time.perf_counter()
+                from_cache, _ = await lesson_plan_service.get_or_generate_session_detailed_content(db, session_map_id)
+                if not from_cache:
+                    result["detailed_generated"] += 1
+                report.record(stage, started, from_cache=from_cache)
+    except Exception as e:
+        db.rollback()
+        report.record_error(stage, unit_key, e)
+        result["error"] = f"{stage}: {e}"
+    finally:
+        db.close()
+
+    return result
+
+
+async def run(
+    units: List[Tuple[str, LessonPlanRequest]],
+    checkpoint: Checkpoint,
+    concurrency: int,
+    include_detailed: bool
+) -> Tuple[Report, int, int, float]:
+    report = Report()
+    semaphore = asyncio.Semaphore(concurrency)
+    pending_units = [(key, request) for key, request in units if not checkpoint.is_completed(key)]
+    skipped = len(units) - len(pending_units)
+    done = 0
+
+    print(f"▶️  {len(pending_units)} chapter runs to process ({skipped} already done per checkpoint), "
+          f"concurrency {concurrency}\n")
+
+    async def worker(unit_key: str, request: LessonPlanRequest) -> None:
+        nonlocal done
+        async with semaphore:
+            started = time.perf_counter()
+            result = await process_unit(request, unit_key, include_detailed, report)
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            checkpoint.mark(unit_key, result)
+            done += 1
+            status = f"❌ {result['error']}" if result.get("error") else (
+                f"✓ {result['sessions']} sessions, {result['summaries_generated']} summaries, "
+                f"{result['detailed_generated']} detailed generated"
+            )
+            print(f"  [{done}/{len(pending_units)}] chapter {unit_key} ({result['seconds']}s) {status}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(key, request) for key, request in pending_units))
+    # Let anything the pipeline started in the background finish before exiting
+    if background_tasks.pending():
+        await asyncio.gather(*background_tasks.pending(), return_exceptions=True)
+    return report, len(pending_units), skipped, time.perf_counter() - started
+
+
+def print_report(report: Report, processed: int, skipped: int, elapsed: float, checkpoint: Checkpoint) -> None:
+    failed = len(checkpoint.data["failed"])
+    print()
+    print("=" * 60)
+    print("📊 Pre-generation report")
+    print("=" * 60)
+    print(f"Chapter runs: {processed} processed, {skipped} skipped (checkpoint), {failed} failed")
+    print(f"Wall time: {elapsed:.1f}s, throughput: {processed / elapsed * 60 if elapsed else 0:.1f} chapter runs/min")
+    print()
+    print(f"{'stage':<10}{'calls':>8}{'cached':>8}{'errors':>8}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'calls/s':>9}")
+    for stage in STAGES:
+        latencies = report.latencies[stage]
+        print(
+            f"{stage:<10}{len(latencies):>8}{report.cached[stage]:>8}{report.errors[stage]:>8}"
+            f"{_percentile(latencies, 50):>9.2f}{_percentile(latencies, 95):>9.2f}"
+            f"{max(latencies, default=0.0):>9.2f}{len(latencies) / elapsed if elapsed else 0:>9.2f}"
+        )
+    db = SessionLocal()
+    try:
+        cache_stats = ai_cache_service.get_stats(db)
+    finally:
+        db.close()
+    print()
+    print(f"AI response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses this run")
+    if report.error_samples:
+        print()
+        print("Errors (first 10):")
+        for sample in report.error_samples:
+            print(f"  - {sample}")
+    print("=" * 60)
+
+
+def estimate(db, units: List[Tuple[str, LessonPlanRequest]], checkpoint: Checkpoint,
+             include_detailed: bool, cost_per_1k_tokens: float, assumed_latency: float, concurrency: int) -> None:
+    """
+    Dry run: count the AI calls still needed and estimate their prompt size, cost and duration.
+
+    Responses already in the AI response cache are not detected, so this is an upper bound.
+    """
+    calls = {stage: 0 for stage in STAGES}
+    prompt_chars = {stage: 0 for stage in STAGES}
+
+    for unit_key, request in units:
+        if checkpoint.is_completed(unit_key):
+            continue
+
+        key_points = key_point_service.get_key_points_by_chapter(db, request.chapter_id)
+        kp_chars = sum(len(kp.title or "") + len(_kp_description(kp)) for kp in key_points)
+        session_count = min(request.planned_sessions, len(key_points))
+
+        input_hash = generate_input_hash(
+            board_id=request.board_id,
+            class_id=request.class_id,
+            subject_id=request.subject_id,
+            chapter_id=request.chapter_id,
+            planned_sessions=request.planned_sessions,
+            grouping_mode=request.grouping_mode
+        )
+        lesson_input = db.query(LessonPlanInput).filter(LessonPlanInput.input_hash == input_hash).first()
+        session_maps = lesson_plan_service.get_session_maps_by_input_id(db, lesson_input.id) if lesson_input else []
+
+        if session_maps:
+            cached_sessions = lesson_plan_service._build_cached_sessions(db, session_maps)
+            missing_summaries = sum(1 for s in cached_sessions if s["summary"] is None)
+            missing_detailed = sum(1 for s in cached_sessions if not s["is_detailed_content_available"])
+            session_count = len(cached_sessions)
+        else:
+            if request.grouping_mode == "ai":
+                calls["grouping"] += 1
+                prompt_chars["grouping"] += PROMPT_OVERHEAD_CHARS + kp_chars
+            missing_summaries = missing_detailed = session_count
+
+        share = kp_chars / session_count if session_count else 0
+        calls["summary"] += missing_summaries
+        prompt_chars["summary"] += int(missing_summaries * (PROMPT_OVERHEAD_CHARS + share))
+        if include_detailed:
+            calls["detailed"] += missing_detailed
+            prompt_chars["detailed"] += int(missing_detailed * (PROMPT_OVERHEAD_CHARS + share))
+
+    total_calls = sum(calls.values())
+    # ~4 characters per token
+    total_tokens = sum(prompt_chars.values()) / 4
+
+    print("=" * 60)
+    print("🧮 Dry run: estimated AI work")
+    print("=" * 60)
+    for stage in STAGES:
+        print(f"  {stage:<10} {calls[stage]:>6} calls  ~{prompt_chars[stage] / 4:>10,.0f} prompt tokens")
+    print(f"  {'total':<10} {total_calls:>6} calls  ~{total_tokens:>10,.0f} prompt tokens")
+    if cost_per_1k_tokens:
+        print(f"  Estimated prompt cost: {total_tokens / 1000 * cost_per_1k_tokens:,.2f}")
+    print(f"  Estimated duration: ~{total_calls * assumed_latency / concurrency / 60:.1f} min "
+          f"at {assumed_latency:.0f}s per call and concurrency {concurrency}")
+    print("  (upper bound: responses already in the AI response cache are not counted out)")
+    print("=" * 60)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pre-generate lesson plans for every chapter of a board")
+    parser.add_argument("--board-id", type=int, required=True)
+    parser.add_argument("--class-id", type=int, help="Only this class (default: every class of the board)")
+    parser.add_argument("--subject-id", type=int, help="Only this subject")
+    parser.add_argument("--planned-sessions", type=int, nargs="+", required=True,
+                        help="Session counts to pre-generate for (each is a separately cached plan)")
+    parser.add_argument("--grouping-mode", choices=["ai", "local"], default="ai")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chapters processed at the same time")
+    parser.add_argument("--skip-detailed", action="store_true", help="Only generate groupings and summaries")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file (default: pregenerate_<board>_<class>.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Only estimate the AI calls and cost")
+    parser.add_argument("--cost-per-1k-tokens", type=float, default=0.0, help="Prompt price for the dry-run estimate")
+    parser.add_argument("--assumed-latency", type=float, default=20.0, help="Seconds per AI call for the dry-run estimate")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("🏭 Lesson plan pre-generation")
+    print("=" * 60)
+    print()
+
+    db = SessionLocal()
+    try:
+        board = db.query(Board).filter(Board.id == args.board_id).first()
+        if not board:
+            print(f"❌ Board {args.board_id} not found")
+            return 1
+
+        chapters = list_chapters(db, args.board_id, args.class_id, args.subject_id)
+        print(f"📚 {board.name}: {len(chapters)} chapters with key points")
+        for chapter in chapters:
+            print(f"  - [{chapter['chapter_id']}] {chapter['class_name']} / {chapter['subject_name']} / "
+                  f"{chapter['chapter_title']} ({chapter['kp_count']} key points)")
+        print()
+
+        scope = {
+            "board_id": args.board_id,
+            "class_id": args.class_id,
+            "subject_id": args.subject_id,
+            "grouping_mode": args.grouping_mode,
+            "include_detailed": not args.skip_detailed,
+        }
+        checkpoint_path = args.checkpoint or Path(
+            f"pregenerate_{args.board_id}_{args.class_id or 'all'}_{args.subject_id or 'all'}.json"
+        )
+        checkpoint = Checkpoint(checkpoint_path, scope, restart=args.restart)
+
+        units = [
+            (_unit_key(chapter, planned_sessions), _build_request(args.board_id, chapter, planned_sessions, args.grouping_mode))
+            for chapter in chapters
+            for planned_sessions in args.planned_sessions
+        ]
+
+        if args.dry_run:
+            estimate(db, units, checkpoint, not args.skip_detailed,
+                     args.cost_per_1k_tokens, args.assumed_latency, args.concurrency)
+            return 0
+    finally:
+        db.close()
+
+    # Every summary is requested explicitly below; speculative prefetch would only add load
+    settings.summary_prefetch_count = 0
+
+    report, processed, skipped, elapsed = asyncio.run(
+        run(units, checkpoint, args.concurrency, not args.skip_detailed)
+    )
+    print_report(report, processed, skipped, elapsed, checkpoint)
+    print(f"💾 Checkpoint: {checkpoint.path}")
+    return 1 if checkpoint.data["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())